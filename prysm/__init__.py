@@ -4,13 +4,13 @@
 from prysm.conf import config
 from prysm.extras import plot_fourier_chain
 from prysm.detector import Detector, OLPF, PixelAperture
-from prysm.pupil import Pupil
-from prysm.fringezernike import FringeZernike
-from prysm.standardzernike import StandardZernike
+from prysm.pupil import Pupil, PupilStack
+from prysm.fringezernike import FringeZernike, FringeZernikeStack
+from prysm.standardzernike import StandardZernike, StandardZernikeStack
 from prysm.seidel import Seidel
 from prysm.surfacefinish import SurfaceFinish
-from prysm.psf import PSF, MultispectralPSF, RGBPSF
-from prysm.otf import MTF
+from prysm.psf import PSF, PSFStack, MultispectralPSF, RGBPSF
+from prysm.otf import MTF, MTFStack
 from prysm.geometry import (
     gaussian,
     rotated_ellipse,
@@ -34,6 +34,7 @@ from prysm.objects import (
     Pinhole,
     SiemensStar,
     TiltedSquare,
+    TransferFunction,
 )
 
 from prysm.lens import Lens
@@ -45,14 +46,19 @@ __all__ = [
     'OLPF',
     'PixelAperture',
     'Pupil',
+    'PupilStack',
     'FringeZernike',
+    'FringeZernikeStack',
     'StandardZernike',
+    'StandardZernikeStack',
     'Seidel',
     'SurfaceFinish',
     'PSF',
+    'PSFStack',
     'MultispectralPSF',
     'RGBPSF',
     'MTF',
+    'MTFStack',
     'Lens',
     'gaussian',
     'rotated_ellipse',
@@ -73,4 +79,5 @@ __all__ = [
     'Pinhole',
     'SiemensStar',
     'TiltedSquare',
+    'TransferFunction',
 ]
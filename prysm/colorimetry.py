@@ -362,6 +362,48 @@ def normalize_spectrum(spectrum, to='peak vis'):
     }
 
 
+def spectrum_quadrature(spectrum, num_nodes, transmission=None, band=None):
+    ''' Computes Gauss-Legendre wavelength nodes and weights that integrate
+        a function against a spectrum.
+
+    Args:
+        spectrum (`dict`): spectrum with wvl and values keys, wavelengths in nm.
+
+        num_nodes (`int`): number of wavelengths.
+
+        transmission (`dict` or `iterable`): spectra with wvl and values keys,
+            e.g. filter transmission or detector QE, that multiply spectrum.
+
+        band (`tuple`): (low, high) wavelengths in nm to integrate over.
+            Defaults to the range of spectrum.
+
+    Returns:
+        `tuple` containing:
+
+            `numpy.ndarray`: wavelengths, in nm.
+
+            `numpy.ndarray`: weights.
+
+    Notes:
+        An N node rule is exact when the function times the spectrum is a
+            polynomial of degree up to 2N-1 across the band, so smooth
+            spectra need few nodes.
+
+    '''
+    if band is None:
+        band = (spectrum['wvl'][0], spectrum['wvl'][-1])
+    if isinstance(transmission, dict):
+        transmission = (transmission,)
+
+    nodes, weights = np.polynomial.legendre.leggauss(num_nodes)
+    low, high = band
+    wvl = (nodes + 1) * (high - low) / 2 + low
+    weights = weights * (high - low) / 2 * np.interp(wvl, spectrum['wvl'], spectrum['values'])
+    for spec in transmission or ():
+        weights *= np.interp(wvl, spec['wvl'], spec['values'])
+    return wvl, weights
+
+
 @lru_cache()
 def render_cie_1931_background(xlow, xhigh, ylow, yhigh, samples):
     ''' Prepares the background for a CIE 1931 plot.
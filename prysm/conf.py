@@ -1,12 +1,19 @@
 ''' Configuration for this instance of prysm
 '''
+from os import cpu_count
+
 import numpy as np
 
 _precision = 64
 _precision_complex = 128
 _parallel_rgb = True
+_rgb_workers = 3
 _backend = 'np'
 _zernike_base = 1
+_fft_backend = 'np'
+_fft_workers = cpu_count() or 1
+_cache_dir = None
+_cache_maxbytes = 2**32
 
 
 class Config(object):
@@ -15,8 +22,13 @@ class Config(object):
     def __init__(self,
                  precision=_precision,
                  parallel_rgb=_parallel_rgb,
+                 rgb_workers=_rgb_workers,
                  backend=_backend,
-                 zernike_base=_zernike_base):
+                 zernike_base=_zernike_base,
+                 fft_backend=_fft_backend,
+                 fft_workers=_fft_workers,
+                 cache_dir=_cache_dir,
+                 cache_maxbytes=_cache_maxbytes):
         '''Tells prysm to use a given precision
 
         Args:
@@ -24,14 +36,28 @@ class Config(object):
 
             parallel_rgb (`bool`): whether to parallelize RGB computations or
                 not.  This improves performance for large arrays, but may slow
-                things down if arrays are relatively small due to the spinup
-                time of new processes.
+                things down if arrays are relatively small due to the overhead
+                of dispatching work to threads.
+
+            rgb_workers (`int`): number of threads in the pool shared by
+                parallel RGB computations.
 
             backend (`string`): a supported backend.  Current options are only
                 "np" for numpy.
 
             zernike_base (`int`): base for zernikes; start at 0 or 1.
 
+            fft_backend (`string`): library used for FFTs.  One of "np" for
+                numpy, "scipy" for scipy.fft, or "fftw" for pyFFTW.
+
+            fft_workers (`int`): number of threads used by the scipy and
+                pyFFTW FFT backends.
+
+            cache_dir (`string` or `pathlib.Path`): directory of the on-disk
+                cache of PSFs and MTFs, or None to disable the cache.
+
+            cache_maxbytes (`int`): maximum size of the on-disk cache.
+
         Returns:
             new Config instance.
 
@@ -39,13 +65,23 @@ class Config(object):
         global _precision
         global _precision_complex
         global _parallel_rgb
+        global _rgb_workers
         global _backend
         global _zernike_base
+        global _fft_backend
+        global _fft_workers
+        global _cache_dir
+        global _cache_maxbytes
 
         self.set_precision(precision)
         self.set_parallel_rgb(parallel_rgb)
+        self.set_rgb_workers(rgb_workers)
         self.set_backend(backend)
         self.set_zernike_base(zernike_base)
+        self.set_fft_backend(fft_backend)
+        self.set_fft_workers(fft_workers)
+        self.set_cache_dir(cache_dir)
+        self.set_cache_maxbytes(cache_maxbytes)
 
     def set_precision(self, precision):
         global _precision
@@ -65,6 +101,13 @@ class Config(object):
         global _parallel_rgb
         _parallel_rgb = parallel
 
+    def set_rgb_workers(self, workers):
+        if int(workers) < 1:
+            raise ValueError('must use at least one RGB worker.')
+
+        global _rgb_workers
+        _rgb_workers = int(workers)
+
     def set_backend(self, backend):
         if backend.lower() not in ('np', 'numpy'):
             raise ValueError('Backend must be numpy')
@@ -79,6 +122,46 @@ class Config(object):
         global _zernike_base
         _zernike_base = base
 
+    def set_fft_backend(self, backend):
+        backend = backend.lower()
+        if backend in ('np', 'numpy'):
+            backend = 'np'
+        elif backend in ('scipy', 'scipy.fft'):
+            try:
+                import scipy.fft  # noqa
+            except ImportError:
+                raise ValueError('scipy.fft is not available, upgrade scipy to use it.')
+            backend = 'scipy'
+        elif backend in ('fftw', 'pyfftw'):
+            try:
+                import pyfftw  # noqa
+            except ImportError:
+                raise ValueError('pyFFTW is not installed.')
+            backend = 'fftw'
+        else:
+            raise ValueError('FFT backend must be np, scipy, or fftw')
+
+        global _fft_backend
+        _fft_backend = backend
+
+    def set_fft_workers(self, workers):
+        if int(workers) < 1:
+            raise ValueError('must use at least one FFT worker.')
+
+        global _fft_workers
+        _fft_workers = int(workers)
+
+    def set_cache_dir(self, path):
+        global _cache_dir
+        _cache_dir = None if path is None else str(path)
+
+    def set_cache_maxbytes(self, maxbytes):
+        if int(maxbytes) < 0:
+            raise ValueError('cache size must be nonnegative.')
+
+        global _cache_maxbytes
+        _cache_maxbytes = int(maxbytes)
+
     @property
     def precision(self):
         global _precision
@@ -94,6 +177,11 @@ class Config(object):
         global _parallel_rgb
         return _parallel_rgb
 
+    @property
+    def rgb_workers(self):
+        global _rgb_workers
+        return _rgb_workers
+
     @property
     def backend(self):
         global _backend
@@ -104,5 +192,25 @@ class Config(object):
         global _zernike_base
         return _zernike_base
 
+    @property
+    def fft_backend(self):
+        global _fft_backend
+        return _fft_backend
+
+    @property
+    def fft_workers(self):
+        global _fft_workers
+        return _fft_workers
+
+    @property
+    def cache_dir(self):
+        global _cache_dir
+        return _cache_dir
+
+    @property
+    def cache_maxbytes(self):
+        global _cache_maxbytes
+        return _cache_maxbytes
+
 
 config = Config()
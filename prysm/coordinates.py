@@ -1,5 +1,7 @@
 ''' Coordinate conversions
 '''
+from functools import lru_cache
+
 import numpy as np
 from scipy import interpolate
 
@@ -48,6 +50,70 @@ def polar_to_cart(rho, phi):
     return x, y
 
 
+@lru_cache(maxsize=16)
+def make_rho_phi_grid(samples, dtype=np.float64):
+    ''' Makes a normalized (rho,phi) grid over the square [-1,1] x [-1,1].
+
+    Args:
+        samples (`int`): number of samples per dimension.
+
+        dtype (`numpy.dtype`): data type of the grid.
+
+    Returns:
+        `tuple` containing:
+
+            `numpy.ndarray`: radial coordinate.
+
+            `numpy.ndarray`: azimuthal coordinate.
+
+    Notes:
+        angle is done via cart_to_polar(yv, xv) which yields angles w.r.t. the
+            y axis.  This is the convention of optics and not a typo.
+
+        The grids are cached and shared between callers, so they are returned
+            read-only.
+
+    '''
+    x = y = np.linspace(-1, 1, samples, dtype=dtype)
+    xv, yv = np.meshgrid(x, y)
+    rho, phi = cart_to_polar(yv, xv)
+    rho.flags.writeable = False
+    phi.flags.writeable = False
+    return rho, phi
+
+
+@lru_cache(maxsize=4)
+def make_polar_sample_grid(num_rho=65, num_phi=128, dtype=np.float64):
+    ''' Makes a sparse polar sampling of the unit disk, including its center
+        and edge, used to estimate extrema of functions over the disk.
+
+    Args:
+        num_rho (`int`): number of radial samples, from 0 to 1 inclusive.
+
+        num_phi (`int`): number of azimuthal samples.
+
+        dtype (`numpy.dtype`): data type of the grid.
+
+    Returns:
+        `tuple` containing:
+
+            `numpy.ndarray`: radial coordinate, shape (num_phi, num_rho).
+
+            `numpy.ndarray`: azimuthal coordinate, shape (num_phi, num_rho).
+
+    Notes:
+        The grids are cached and shared between callers, so they are returned
+            read-only.
+
+    '''
+    rho = np.linspace(0, 1, num_rho, dtype=dtype)
+    phi = np.linspace(0, 2 * pi, num_phi, endpoint=False, dtype=dtype)
+    rv, pv = np.meshgrid(rho, phi)
+    rv.flags.writeable = False
+    pv.flags.writeable = False
+    return rv, pv
+
+
 def uniform_cart_to_polar(x, y, data):
     ''' Interpolates data uniformly sampled in cartesian coordinates to polar
         coordinates.
@@ -132,4 +198,4 @@ def resample_2d_complex(array, sample_pts, query_pts):
     interp_mag = magfunc((yq, xq))
     interp_phase = phasefunc((yq, xq))
 
-    return interp_mag * exp(1j * interp_phase)
+    return (interp_mag * exp(1j * interp_phase)).astype(array.dtype, copy=False)
@@ -156,7 +156,7 @@ class OLPF(PSF):
         center_x = samples_x // 2
         center_y = samples_y // 2
 
-        data = np.zeros((samples_x, samples_y))
+        data = np.zeros((samples_x, samples_y), dtype=config.precision)
 
         data[center_y - shift_y, center_x - shift_x] = 1
         data[center_y - shift_y, center_x + shift_x] = 1
@@ -217,7 +217,7 @@ class PixelAperture(PSF):
         steps_x = int(half_width // sample_spacing)
         steps_y = int(half_height // sample_spacing)
 
-        pixel_aperture = np.zeros((samples_x, samples_y))
+        pixel_aperture = np.zeros((samples_x, samples_y), dtype=config.precision)
         pixel_aperture[self.center_y - steps_y:self.center_y + steps_y,
                        self.center_x - steps_x:self.center_x + steps_x] = 1
         super().__init__(data=pixel_aperture, sample_spacing=sample_spacing)
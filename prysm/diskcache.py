@@ -0,0 +1,256 @@
+''' A persistent, content-addressed cache of expensive results on disk
+'''
+import os
+import shutil
+from uuid import uuid4
+from pathlib import Path
+from hashlib import sha1
+from threading import Lock
+from collections import OrderedDict
+
+import numpy as np
+
+from prysm.conf import config
+
+
+class DiskCache(object):
+    ''' A least-recently-used cache of prysm objects on disk, bounded by the
+        total number of bytes it holds.
+
+    Properties:
+        nbytes: number of bytes currently held by the cache.
+
+    Instance Methods:
+        get: loads a value from the cache, or returns a default if it is absent.
+
+        put: saves a value into the cache, evicting old entries as needed.
+
+        clear: empties the cache.
+
+    Notes:
+        each entry is a directory named by its key, holding whatever the
+            value's save method writes.  Entries are written to a temporary
+            directory and renamed into place, so a reader never sees a partial
+            entry.  Recency is the modification time of the entry, so it
+            persists between sessions.
+
+    '''
+    def __init__(self, path, maxbytes=2**32):
+        ''' Creates a new DiskCache, indexing any entries already in path.
+
+        Args:
+            path (`string` or `pathlib.Path`): directory of the cache, created
+                if it does not exist.
+
+            maxbytes (`int`): maximum number of bytes to hold in the cache.
+
+        Returns:
+            `DiskCache`: a new cache.
+
+        '''
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.maxbytes = maxbytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = Lock()
+
+        entries = [entry for entry in self.path.iterdir()
+                   if entry.is_dir() and not entry.name.startswith('tmp-')]
+        entries.sort(key=lambda entry: entry.stat().st_mtime)
+        self._index = OrderedDict((entry.name, _dir_nbytes(entry)) for entry in entries)
+        self._nbytes = sum(self._index.values())
+
+    @property
+    def nbytes(self):
+        ''' Number of bytes held by the cache.
+        '''
+        return self._nbytes
+
+    def get(self, key, load, default=None):
+        ''' Loads a value from the cache.
+
+        Args:
+            key (`string`): key to look up, e.g. from digest.
+
+            load (`callable`): function of the entry's path that returns the
+                value, e.g. PSF.load.
+
+            default (`object`): value returned if key is not in the cache.
+
+        Returns:
+            `object`: the cached value, or default.
+
+        '''
+        entry = self.path / key
+        with self._lock:
+            if key not in self._index:
+                self.misses += 1
+                return default
+
+            try:
+                value = load(entry)
+                os.utime(entry)
+            except (IOError, OSError):
+                # removed by another process
+                self._forget(key)
+                self.misses += 1
+                return default
+
+            self._index.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        ''' Saves a value into the cache, evicting the least recently used
+            entries until it fits.
+
+        Args:
+            key (`string`): key to store the value under.
+
+            value (`object`): object with a save(path) method.
+
+        Returns:
+            `object`: value.
+
+        '''
+        tmp = self.path / f'tmp-{uuid4().hex}'
+        value.save(tmp)
+        size = _dir_nbytes(tmp)
+
+        with self._lock:
+            if size > self.maxbytes or key in self._index:
+                shutil.rmtree(tmp, ignore_errors=True)
+                return value
+
+            try:
+                os.replace(tmp, self.path / key)
+            except OSError:
+                # written concurrently by another process
+                shutil.rmtree(tmp, ignore_errors=True)
+                return value
+
+            self._index[key] = size
+            self._nbytes += size
+            while self._nbytes > self.maxbytes:
+                oldest = next(iter(self._index))
+                shutil.rmtree(self.path / oldest, ignore_errors=True)
+                self._forget(oldest)
+
+        return value
+
+    def clear(self):
+        ''' Removes every entry from the cache and resets its statistics.
+        '''
+        with self._lock:
+            for key in list(self._index):
+                shutil.rmtree(self.path / key, ignore_errors=True)
+            self._index.clear()
+            self._nbytes = 0
+            self.hits = 0
+            self.misses = 0
+
+    def _forget(self, key):
+        ''' Drops a key from the index.
+        '''
+        self._nbytes -= self._index.pop(key)
+
+    def __contains__(self, key):
+        return key in self._index
+
+    def __len__(self):
+        return len(self._index)
+
+
+def _dir_nbytes(path):
+    ''' Counts the bytes in the files of a directory.
+    '''
+    return sum(f.stat().st_size for f in Path(path).iterdir() if f.is_file())
+
+
+def digest(*parts):
+    ''' Computes a key from the content of arrays and other values.
+
+    Args:
+        parts: arrays, dicts, and values with a stable repr.
+
+    Returns:
+        `string`: hexadecimal digest.
+
+    '''
+    h = sha1()
+    for part in parts:
+        _update(h, part)
+    return h.hexdigest()
+
+
+def _update(h, part):
+    ''' Adds one part of a key to a hash.
+    '''
+    if isinstance(part, np.generic):
+        part = part.item()
+
+    if isinstance(part, np.ndarray):
+        h.update(f'{part.dtype.str}{part.shape}'.encode())
+        h.update(np.ascontiguousarray(part).data)
+    elif isinstance(part, dict):
+        for key in sorted(part):
+            _update(h, key)
+            _update(h, part[key])
+    elif isinstance(part, (list, tuple)):
+        h.update(f'{type(part).__name__}{len(part)}'.encode())
+        for item in part:
+            _update(h, item)
+    else:
+        h.update(repr(part).encode())
+    h.update(b'|')
+
+
+_cache = None
+
+
+def active_cache():
+    ''' Retrieves the cache in config.cache_dir.
+
+    Returns:
+        `DiskCache`: the cache, or None if caching is disabled.
+
+    '''
+    global _cache
+    if config.cache_dir is None:
+        return None
+
+    if _cache is None or _cache.path != Path(config.cache_dir):
+        _cache = DiskCache(config.cache_dir, config.cache_maxbytes)
+    _cache.maxbytes = config.cache_maxbytes
+    return _cache
+
+
+def cached(parts, compute, load):
+    ''' Retrieves a value from the active cache, computing and storing it if
+        it is not already cached.
+
+    Args:
+        parts (`tuple`): everything the value depends on, digested into its key.
+
+        compute (`callable`): function of no arguments that computes the value.
+
+        load (`callable`): function of an entry's path that loads the value.
+
+    Returns:
+        `object`: the value.  If caching is disabled, compute().
+
+    Notes:
+        the key is only digested when caching is enabled, so the cache costs
+            nothing while it is disabled.
+
+    '''
+    cache = active_cache()
+    if cache is None:
+        return compute()
+
+    key = digest(*parts)
+    value = cache.get(key, load)
+    if value is None:
+        value = cache.put(key, compute())
+    return value
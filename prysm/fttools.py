@@ -2,13 +2,17 @@
 '''
 import numpy as np
 
+from prysm.conf import config
 from prysm.mathops import (floor, exp, sqrt)
+from prysm.util import ArrayCache
+
 
 def pad2d(array, factor=1, value=0):
     ''' Symmetrically pads a 2D array with a value.
 
     Args:
-        array (`numpy.ndarray`): source array.
+        array (`numpy.ndarray`): source array.  If it has more than two
+            dimensions, only the last two are padded.
 
         factor (`number`): number of widths of source array to add to each side (L/R/U/D).
 
@@ -18,8 +22,9 @@ def pad2d(array, factor=1, value=0):
         `numpy.ndarray`: padded array.
 
     '''
-    x, y = array.shape
-    pad_shape = ((int(x * factor), int(x * factor)), (int(y * factor), int(y * factor)))
+    x, y = array.shape[-2:]
+    pad_shape = ((0, 0),) * (array.ndim - 2) + \
+                ((int(x * factor), int(x * factor)), (int(y * factor), int(y * factor)))
     return np.pad(array, pad_width=pad_shape, mode='constant', constant_values=value)
 
 
@@ -35,31 +40,128 @@ def forward_ft_unit(sample_spacing, samples):
         `numpy.ndarray`: array of sample frequencies in the output of an fft.
 
     '''
-    return np.fft.ifftshift(np.fft.fftfreq(samples, sample_spacing / 1e3))
+    return np.fft.ifftshift(np.fft.fftfreq(samples, sample_spacing / 1e3)).astype(config.precision)
 
 
 def matrix_dft(f, alpha, npix, shift=None, unitary=False):
     '''
     A technique shamelessly stolen from Andy Kee @ NASA JPL
     Is it magic or math?
+
+    Args:
+        f (`numpy.ndarray`): array to transform.  If it has more than two
+            dimensions, the transform is applied over the last two.
+
+        alpha (`float` or `iterable`): output sample spacing in units of the
+            input's fundamental frequency, (alpha_y, alpha_x) if iterable.
+
+        npix (`int` or `iterable`): number of output samples, (M, N) if iterable.
+
+        shift (`float` or `iterable`): shift of the sample grids, in samples,
+            (shift_y, shift_x) if iterable.
+
+        unitary (`bool`): if True, normalize to conserve energy.
+
+    Returns:
+        `numpy.ndarray`: complex array of shape npix.
+
     '''
-    if np.isscalar(alpha):
-        ax = ay = alpha
+    f = np.asarray(f)
+    m, n = f.shape[-2:]
+    ay, ax = _pair(alpha)
+    M, N = _pair(npix)
+    if shift is None:
+        sy = sx = 0
     else:
-        ax = ay = np.asarray(alpha)
+        sy, sx = _pair(shift)
 
-    f = np.asarray(f)
-    m, n = f.shape
+    dtype = np.result_type(f.dtype, np.complex64)
+    E1, E2 = mdft_kernels(m, n, M, N, (ay, ax), (sy, sx), dtype)
+
+    F = np.matmul(E1, np.matmul(f, E2))
 
-    if np.isscalar(npix):
-        M = N = npix
+    if unitary is True:
+        norm_coef = sqrt((ay * ax) / (m * n * M * N))
+        return F * norm_coef
     else:
-        M = N = np.asarray(npix)
+        return F
 
-    if shift is None:
-        sx = sy = 0
+
+def matrix_dft_stack(f, alpha, npix, shift=None, unitary=False):
+    ''' Applies the same matrix DFT to each array of a stack, reusing one
+        pair of kernels for the whole batch.
+
+    Args:
+        f (`numpy.ndarray`): stack of arrays of shape (k, m, n).
+
+        alpha (`float` or `iterable`): see :func:`matrix_dft`.
+
+        npix (`int` or `iterable`): see :func:`matrix_dft`.
+
+        shift (`float` or `iterable`): see :func:`matrix_dft`.
+
+        unitary (`bool`): see :func:`matrix_dft`.
+
+    Returns:
+        `numpy.ndarray`: complex array of shape (k, M, N).
+
+    '''
+    f = np.asarray(f)
+    if f.ndim != 3:
+        raise ValueError('matrix_dft_stack requires a 3D (k, m, n) array.')
+
+    return matrix_dft(f, alpha, npix, shift=shift, unitary=unitary)
+
+
+def _pair(value):
+    ''' Expands a scalar to a (y, x) pair; passes iterables through.
+    '''
+    if np.isscalar(value):
+        return value, value
     else:
-        sx = sy = np.asarray(shift)
+        return tuple(value)
+
+
+'''
+E1, E2 kernel pairs of matrix DFTs, keyed by the geometry of the transform.
+'''
+mdft_cache = ArrayCache(maxbytes=2**27)
+
+
+def mdft_kernels(m, n, M, N, alpha, shift, dtype=np.complex128):
+    ''' Retrieves the E1, E2 kernels of a matrix DFT, F = E1 . f . E2,
+        computing and caching them if they are not in the cache.
+
+    Args:
+        m (`int`): number of rows in the input.
+
+        n (`int`): number of columns in the input.
+
+        M (`int`): number of rows in the output.
+
+        N (`int`): number of columns in the output.
+
+        alpha (`tuple`): (alpha_y, alpha_x), see :func:`matrix_dft`.
+
+        shift (`tuple`): (shift_y, shift_x), see :func:`matrix_dft`.
+
+        dtype (`numpy.dtype`): complex dtype of the kernels.
+
+    Returns:
+        `tuple` containing:
+
+            `numpy.ndarray`: E1, of shape (M, m), read-only.
+
+            `numpy.ndarray`: E2, of shape (n, N), read-only.
+
+    '''
+    ay, ax = (float(a) for a in alpha)
+    sy, sx = (float(s) for s in shift)
+    dtype = np.dtype(dtype)
+    key = (int(m), int(n), int(M), int(N), (ay, ax), (sy, sx), dtype.str)
+    kernels = mdft_cache.get(key)
+    if kernels is not None:
+        return kernels
 
     # Y and X are (r,c) coordinates in the (m x n) input plane, f
     # V and U are (r,c) coordinates in the (M x N) output plane, F
@@ -68,13 +170,8 @@ def matrix_dft(f, alpha, npix, shift=None, unitary=False):
     U = np.arange(N) - floor(N / 2) - sx
     V = np.arange(M) - floor(M / 2) - sy
 
-    E1 = exp(1j * -2 * np.pi * (ay / m) * np.outer(Y, V).T)
-    E2 = exp(1j * -2 * np.pi * (ax / m) * np.outer(X, U))
-
-    F = E1.dot(f).dot(E2)
-
-    if unitary is True:
-        norm_coef = sqrt((ay * ax) / (m * n * M * N))
-        return F * norm_coef
-    else:
-        return F
+    E1 = exp(1j * -2 * np.pi * (ay / m) * np.outer(Y, V).T).astype(dtype)
+    E2 = exp(1j * -2 * np.pi * (ax / n) * np.outer(X, U)).astype(dtype)
+    E1.flags.writeable = False
+    E2.flags.writeable = False
+    return mdft_cache.put(key, (E1, E2))
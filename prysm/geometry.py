@@ -2,6 +2,7 @@
 '''
 import numpy as np
 
+from prysm.conf import config
 from prysm.mathops import (
     exp,
     log,
@@ -73,7 +74,7 @@ def rotated_ellipse(width_major, width_minor, major_axis_angle=0, samples=128):
     if width_minor > width_major:
         raise ValueError('By definition, major axis must be larger than minor.')
 
-    arr = np.ones((samples, samples))
+    arr = np.ones((samples, samples), dtype=config.precision)
     lim = width_major
     x, y = np.linspace(-lim, lim, samples), np.linspace(-lim, lim, samples)
     xv, yv = np.meshgrid(x, y)
@@ -218,7 +219,7 @@ def generate_mask(vertices, num_samples=128):
     vertices = np.asarray(vertices)
 
     # Initialize background and mask arrays
-    base_array = np.zeros(shape, dtype=float)
+    base_array = np.zeros(shape, dtype=config.precision)
     fill = np.ones(base_array.shape) * True
 
     # Create check array for each edge segment, combine into fill array
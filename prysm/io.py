@@ -1,8 +1,18 @@
-''' File readers (and someday, writers) for various commercial instruments
+''' File readers for various commercial instruments, and storage of prysm objects
 '''
+import json
+import struct
+from pathlib import Path
+from itertools import islice
+from collections import deque
+from os import cpu_count
+from concurrent.futures import Executor
+
 import numpy as np
 
 from prysm.conf import config
+from prysm.util import _pool_type
+from prysm.zerntools import ZernikeFitter
 
 
 def read_oceanoptics(file_path):
@@ -41,3 +51,349 @@ def read_oceanoptics(file_path):
             'wvl': wavelengths,
             'values': values,
         }
+
+
+'''
+Layout of the fields of a MetroPro header used by read_zygo_dat, as
+(name, struct format, byte offset).  All values are big-endian.
+'''
+_zygo_header_fields = (
+    ('magic_number', '>I', 0),
+    ('header_format', '>h', 4),
+    ('header_size', '>i', 6),
+    ('ac_org_x', '>h', 48),
+    ('ac_org_y', '>h', 50),
+    ('ac_width', '>H', 52),
+    ('ac_height', '>H', 54),
+    ('ac_n_buckets', '>H', 56),
+    ('ac_range', '>H', 58),
+    ('ac_n_bytes', '>I', 60),
+    ('cn_org_x', '>h', 64),
+    ('cn_org_y', '>h', 66),
+    ('cn_width', '>H', 68),
+    ('cn_height', '>H', 70),
+    ('cn_n_bytes', '>I', 72),
+    ('time_stamp', '>i', 76),
+    ('intf_scale_factor', '>f', 164),
+    ('wavelength_in', '>f', 168),
+    ('num_aperture', '>f', 172),
+    ('obliquity_factor', '>f', 176),
+    ('magnification', '>f', 180),
+    ('lateral_res', '>f', 184),
+    ('phase_res', '>h', 218),
+)
+
+_zygo_magic_numbers = (0x881B036F, 0x881B0370, 0x881B0371)
+
+'''
+Number of phase counts per wave for each value of the phase_res header field.
+'''
+_zygo_phase_res = {0: 4096, 1: 32768, 2: 131072}
+
+'''
+Connected phase values at or above this are invalid.
+'''
+_ZYGO_INVALID_PHASE = 2147483640
+
+
+def read_zygo_dat(file_path):
+    ''' Reads the phase and intensity data from a Zygo MetroPro .dat file.
+
+    Args:
+        file_path (`string` or `pathlib.Path`): path to a file.
+
+    Returns:
+        `dict` with keys:
+
+            phase: `numpy.ndarray` of shape (cn_height, cn_width), surface
+                height in nm, NaN where the data is invalid.
+
+            intensity: `numpy.ndarray` of shape (ac_n_buckets, ac_height,
+                ac_width), or None if the file holds no intensity data.
+
+            meta: `dict` of the header fields, with wavelength_in and
+                lateral_res in meters.
+
+    '''
+    with open(file_path, 'rb') as fid:
+        raw = fid.read()
+
+    meta = {name: struct.unpack_from(fmt, raw, offset)[0]
+            for name, fmt, offset in _zygo_header_fields}
+    if meta['magic_number'] not in _zygo_magic_numbers:
+        raise IOError('File does not begin with a MetroPro magic number and appears to be corrupt.')
+
+    offset = meta['header_size']
+    intensity = None
+    if meta['ac_n_bytes']:
+        shape = (meta['ac_n_buckets'], meta['ac_height'], meta['ac_width'])
+        intensity = np.frombuffer(raw, dtype='>u2', count=int(np.prod(shape)), offset=offset)
+        intensity = intensity.reshape(shape).astype(config.precision)
+        offset += meta['ac_n_bytes']
+
+    shape = (meta['cn_height'], meta['cn_width'])
+    counts = np.frombuffer(raw, dtype='>i4', count=shape[0] * shape[1], offset=offset).reshape(shape)
+
+    # counts -> waves -> nm
+    scale = meta['intf_scale_factor'] * meta['obliquity_factor'] / _zygo_phase_res[meta['phase_res']]
+    phase = counts.astype(config.precision) * (scale * meta['wavelength_in'] * 1e9)
+    phase[counts >= _ZYGO_INVALID_PHASE] = np.nan
+
+    return {
+        'phase': phase,
+        'intensity': intensity,
+        'meta': meta,
+    }
+
+
+def read_grid_txt(file_path, invalid=('nan', 'No Data')):
+    ''' Reads a phase map stored as a plain-text grid, one row per line with
+        values separated by whitespace or commas.
+
+    Args:
+        file_path (`string` or `pathlib.Path`): path to a file.
+
+        invalid (`iterable`): tokens that mark invalid data.  Lines beginning
+            with # are ignored.
+
+    Returns:
+        `numpy.ndarray`: 2D array of the values, NaN where the data is invalid.
+
+    '''
+    invalid = set(token.lower() for token in invalid)
+    rows = []
+    with open(file_path, 'r') as fid:
+        for line in fid:
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            tokens = line.replace(',', ' ').split()
+            rows.append([np.nan if token.lower() in invalid else float(token) for token in tokens])
+
+    if not rows or any(len(row) != len(rows[0]) for row in rows):
+        raise IOError('File does not hold a rectangular grid of values.')
+
+    return np.asarray(rows, dtype=config.precision)
+
+
+'''
+Readers used by read_phase_map, by file extension.
+'''
+_phase_map_readers = {
+    '.dat': lambda path: read_zygo_dat(path)['phase'],
+    '.txt': read_grid_txt,
+    '.csv': read_grid_txt,
+    '.asc': read_grid_txt,
+}
+
+
+def read_phase_map(file_path):
+    ''' Reads a phase map from any supported format, chosen by extension.
+
+    Args:
+        file_path (`string` or `pathlib.Path`): path to a file.
+
+    Returns:
+        `numpy.ndarray`: 2D phase map, NaN where the data is invalid.
+
+    '''
+    suffix = Path(file_path).suffix.lower()
+    try:
+        reader = _phase_map_readers[suffix]
+    except KeyError:
+        raise ValueError(f'no phase map reader for {suffix} files')
+    return reader(file_path)
+
+
+def iter_phase_maps(paths):
+    ''' Lazily reads a sequence of phase maps.
+
+    Args:
+        paths (`iterable` or `string` or `pathlib.Path`): paths to files, or a
+            directory whose supported files are read in sorted order.
+
+    Returns:
+        `generator` yielding (`pathlib.Path`, `numpy.ndarray`) pairs.
+
+    '''
+    for path in _phase_map_paths(paths):
+        yield path, read_phase_map(path)
+
+
+def decompose_phase_maps(paths, family='fringe', num_terms=16, rms_norm=False,
+                         chunksize=32, executor=None, workers=None):
+    ''' Fits zernike coefficients to a sequence of phase maps, reading and
+        fitting them in chunks so that memory use is bounded.
+
+    Args:
+        paths (`iterable` or `string` or `pathlib.Path`): paths to files, or a
+            directory whose supported files are read in sorted order.
+
+        family (`string`): name of the zernike family, "fringe" or "standard".
+
+        num_terms (`int`): number of terms to fit, fits terms 0~num_terms.
+
+        rms_norm (`bool`): if true, normalize coefficients to unit RMS value.
+
+        chunksize (`int`): number of maps read and fit together.
+
+        executor (`string` or `concurrent.futures.Executor`): "thread",
+            "process", an existing executor, or None to work serially.  See
+            util.parallel_map.
+
+        workers (`int`): number of workers in a new pool.  Defaults to the
+            number of CPUs.
+
+    Returns:
+        `generator` yielding (`pathlib.Path`, `numpy.ndarray`, `float`) rows
+            of the path, coefficients, and residual RMS of each map, in the
+            order of paths.
+
+    Notes:
+        at most one chunk per worker is in flight at a time.  Maps with the
+            same shape and valid points share one cached factorization; see
+            zerntools.ZernikeFitter.
+
+    '''
+    chunks = (
+        (chunk, family, num_terms, rms_norm)
+        for chunk in _chunked(_phase_map_paths(paths), chunksize))
+
+    if executor is None or workers == 1:
+        for args in chunks:
+            yield from _decompose_chunk(args)
+        return
+
+    if workers is None:
+        workers = cpu_count() or 1
+
+    if isinstance(executor, Executor):
+        yield from _bounded_map(executor, chunks, workers)
+    else:
+        with _pool_type(executor)(max_workers=workers) as ex:
+            yield from _bounded_map(ex, chunks, workers)
+
+
+def _bounded_map(executor, chunks, in_flight):
+    ''' Maps _decompose_chunk over chunks, keeping a limited number pending.
+    '''
+    pending = deque()
+    for args in chunks:
+        pending.append(executor.submit(_decompose_chunk, args))
+        if len(pending) >= in_flight:
+            yield from pending.popleft().result()
+
+    while pending:
+        yield from pending.popleft().result()
+
+
+def _decompose_chunk(args):
+    ''' Reads and fits a chunk of phase maps; module level so that it may be
+        sent to a process pool.
+    '''
+    paths, family, num_terms, rms_norm = args
+    fitter = ZernikeFitter(family, num_terms, rms_norm)
+
+    # maps of the same shape are fit as one stack
+    maps = [read_phase_map(path) for path in paths]
+    by_shape = {}
+    for idx, data in enumerate(maps):
+        by_shape.setdefault(data.shape, []).append(idx)
+
+    rows = [None] * len(maps)
+    for idxs in by_shape.values():
+        coefs, rms = fitter.fit(np.stack([maps[idx] for idx in idxs]), residual=True)
+        for idx, c, r in zip(idxs, coefs, rms):
+            rows[idx] = (paths[idx], c, float(r))
+
+    return rows
+
+
+def _phase_map_paths(paths):
+    ''' Expands a directory to its supported files, or passes paths through.
+    '''
+    if isinstance(paths, (str, Path)) and Path(paths).is_dir():
+        return (path for path in sorted(Path(paths).iterdir())
+                if path.suffix.lower() in _phase_map_readers)
+    return (Path(path) for path in paths)
+
+
+def _chunked(iterable, size):
+    ''' Groups an iterable into lists of at most size elements.
+    '''
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def save_bundle(path, arrays, meta):
+    ''' Saves a set of arrays and their metadata to a directory, one .npy file
+        per array and a meta.json sidecar, so that the arrays can later be
+        opened as memory maps.
+
+    Args:
+        path (`string` or `pathlib.Path`): directory to write, created if it
+            does not exist.
+
+        arrays (`dict`): arrays keyed by name.  Names must be valid file names.
+
+        meta (`dict`): JSON serializable metadata.
+
+    Returns:
+        `pathlib.Path`: path.
+
+    '''
+    path = Path(path)
+    path.mkdir(parents=True, exist_ok=True)
+    for name, array in arrays.items():
+        np.save(path / f'{name}.npy', np.asarray(array), allow_pickle=False)
+
+    meta = dict(meta, arrays=sorted(arrays))
+    with open(path / 'meta.json', 'w') as fid:
+        json.dump(meta, fid, indent=2)
+    return path
+
+
+def load_bundle(path, mmap_mode='r'):
+    ''' Loads a set of arrays and their metadata written by save_bundle.
+
+    Args:
+        path (`string` or `pathlib.Path`): directory to read.
+
+        mmap_mode (`string`): memory map mode passed to numpy.load; "r" to
+            open the arrays read-only without reading them, "r+" or "c" for
+            writable maps, or None to read them into memory.
+
+    Returns:
+        `tuple` containing:
+
+            `dict`: arrays keyed by name.
+
+            `dict`: metadata.
+
+    Notes:
+        memory maps of the same file opened by several processes share the
+            operating system's page cache, so workers given the path read the
+            data without copying it between processes.
+
+    '''
+    path = Path(path)
+    try:
+        with open(path / 'meta.json', 'r') as fid:
+            meta = json.load(fid)
+    except FileNotFoundError:
+        raise IOError(f'{path} does not contain a meta.json file and is not a saved bundle.')
+
+    arrays = {name: np.load(path / f'{name}.npy', mmap_mode=mmap_mode, allow_pickle=False)
+              for name in meta.pop('arrays')}
+    return arrays, meta
+
+
+def _check_bundle_type(meta, expected, path):
+    ''' Raises if a bundle was saved from a different kind of object.
+    '''
+    if meta.get('type') != expected:
+        raise IOError(f'{path} holds a {meta.get("type")}, not a {expected}.')
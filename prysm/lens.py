@@ -1,19 +1,26 @@
 ''' Model of optical systems
 '''
 import warnings
+from os import cpu_count
+from concurrent.futures import Executor
 from functools import partial
 from copy import deepcopy
 
 import numpy as np
-from scipy.optimize import minimize
+from scipy.optimize import least_squares
 
 from prysm.conf import config
-from prysm.seidel import Seidel
-from prysm.psf import PSF
-from prysm.otf import MTF
-from prysm.util import share_fig_ax
+from prysm.mathops import pi, fft2, fftshift, ifftshift
+from prysm.seidel import Seidel, seidel_phase_stack, seidel_rms_defocus, wexpr_to_powers
+from prysm.pupil import PupilStack
+from prysm.coordinates import make_rho_phi_grid
+from prysm.psf import PSF, PSFStack, _psf_from_pupil
+from prysm.otf import MTF, MTFStack, _mtf_from_psf
+from prysm.fttools import pad2d
+from prysm.util import share_fig_ax, parallel_map, pupil_sample_to_psf_sample, _pool_type
 from prysm.thinlens import image_displacement_to_defocus
 from prysm.mtf_utils import MTFvFvF
+from prysm.diskcache import cached
 
 
 class Lens(object):
@@ -106,60 +113,55 @@ class Lens(object):
     ####### analytically setting aberrations -----------------------------------
 
     def autofocus(self, field_index=0):
-        ''' Adjusts the W020 aberration coefficient to maximize the MTF at a
-            given field index.
+        ''' Adjusts the W020 aberration coefficient to minimize the RMS
+            wavefront error at a given field index.
 
         Args:
-            field_index (`int`): index of the field to maximize MTF at.
+            field_index (`int`): index of the field to minimize the RMS
+                wavefront error at.
 
         Returns:
-            `Lens`: self.
+            `Lens`: self, with W020 set to the defocus that minimizes the RMS
+                wavefront error at the field.
+
+        Notes:
+            phase is linear in W020, so the RMS-minimizing defocus is found in
+            closed form from the aberration coefficients, without building a
+            pupil.
+
         '''
         coefs = self.aberrations.copy()
-        try:
-            # try to access the W020 aberration
-            float(coefs['W020'])
-        except KeyError:
-            # if it is not set, make it 0
-            coefs['W020'] = 0.0
-
-        def opt_fcn(self, coefs, w020):
-            # shift the defocus term appropriately
-            abers = coefs.copy()
-            abers['W020'] += w020
-            pupil = Seidel(**abers, epd=self.epd, samples=self.samples, h=self.fields[field_index])
-
-            # cost value (to be minimized) is RMS wavefront
-            return pupil.rms
-
-        opt_fcn = partial(opt_fcn, self, coefs)
-
-        new_defocus = minimize(opt_fcn, x0=0, method='Powell')
-        coefs['W020'] += float(new_defocus['x'])
-        self.aberrations = coefs.copy()
+        coefs['W020'] = float(coefs.get('W020', 0.0))
+
+        powers = [wexpr_to_powers(key) for key in coefs]
+        coefs['W020'] += seidel_rms_defocus(powers, list(coefs.values()), self.fields[field_index])
+        self.aberrations = coefs
         return self
 
     ####### analytically setting aberrations -----------------------------------
 
     ####### data generation ----------------------------------------------------
 
-    def psf_vs_field(self, num_pts):
+    def psf_vs_field(self, num_pts, executor=None, workers=None):
         ''' Generates a list of PSFs as a function of field.
 
         Args:
             num_pts (`int`): number of points to generate a PSF for.
 
+            executor (`string` or `concurrent.futures.Executor`): "thread",
+                "process", or an executor to distribute fields over.  Serial
+                if None.
+
+            workers (`int`): number of workers for a new thread or process pool.
+
         Returns:
             `list` containing the PSF objects.
 
         '''
         self._uniformly_spaced_fields(num_pts)
-        psfs = []
-        for idx in range(num_pts):
-            psfs.append(self._make_psf(idx))
-        return psfs
+        return parallel_map(self._make_psf, range(num_pts), executor=executor, workers=workers)
 
-    def mtf_vs_field(self, num_pts, freqs=[10, 20, 30, 40, 50]):
+    def mtf_vs_field(self, num_pts, freqs=[10, 20, 30, 40, 50], executor=None, workers=None):
         ''' Generates a 2D array of MTF vs field values for the given spatial
             frequencies.
 
@@ -168,6 +170,12 @@ class Lens(object):
 
             freqs (`iterable`): set of frequencies to compute at.
 
+            executor (`string` or `concurrent.futures.Executor`): "thread",
+                "process", or an executor to distribute fields over.  Serial
+                if None.
+
+            workers (`int`): number of workers for a new thread or process pool.
+
         Returns:
             `tuple` containing:
 
@@ -181,17 +189,78 @@ class Lens(object):
 
         '''
         self._uniformly_spaced_fields(num_pts)
-        mtfs_t = np.empty((num_pts, len(freqs)))
-        mtfs_s = np.empty((num_pts, len(freqs)))
-        for idx in range(num_pts):
-            mtf = self._make_mtf(idx)
-            vals_t = mtf.exact_polar(freqs, 0)
-            vals_s = mtf.exact_polar(freqs, 90)
-            mtfs_t[idx, :] = vals_t
-            mtfs_s[idx, :] = vals_s
-
+        fcn = partial(_field_ts_mtf, self, freqs)
+        mtfs = np.asarray(parallel_map(fcn, range(num_pts), executor=executor, workers=workers))
+        mtfs_t, mtfs_s = mtfs[:, 0, :], mtfs[:, 1, :]
         return mtfs_s, mtfs_t
 
+    def mtf_vs_field_vs_focus(self, num_fields, focus_range, num_focus, freqs,
+                              memory_budget=2**28, executor=None, workers=None, progress=None):
+        ''' Computes cubes of the tangential and sagittal MTF vs field vs focus.
+
+        Args:
+            num_fields (`int`): number of evenly spaced fields to compute at.
+
+            focus_range (`float`): focus range, in microns.  Applied symmetrically.
+
+            num_focus (`int`): number of focus points to compute at.
+
+            freqs (`iterable`): frequencies to compute the MTF at, in cy/mm.
+
+            memory_budget (`int`): approximate number of bytes the batched
+                propagation of one chunk of (field, focus) pupils may use.
+
+            executor (`string` or `concurrent.futures.Executor`): "thread",
+                "process", or an executor to distribute chunks over.  Serial if
+                None.
+
+            workers (`int`): number of workers for a new thread or process pool.
+
+            progress (`callable`): if given, called as progress(done, total)
+                with the number of chunks completed.
+
+        Returns:
+            `tuple` containing:
+
+                `MTFvFvF`: tangential MTF, data of shape (focus, field, freq).
+
+                `MTFvFvF`: sagittal MTF, data of shape (focus, field, freq).
+
+        Notes:
+            the phase of every field is computed in one vectorized Seidel
+            evaluation, and defocus is added as a scaled rho^2 map.  The T and
+            S MTF are computed directly at freqs from the line spread functions
+            of each PSF, so no 2D MTFs are formed.
+
+        '''
+        freqs = np.asarray(freqs)
+        self._uniformly_spaced_fields(num_fields)
+        focus = np.linspace(-focus_range, focus_range, num_focus)
+        defocus_wvs = image_displacement_to_defocus(focus, self.fno, self.wavelength)
+
+        field_phases = seidel_phase_stack(self.aberrations, self.fields, self.samples)
+        rho, _ = make_rho_phi_grid(self.samples, config.precision)
+
+        # a chunk holds the padded wavefunction, its transform, and the PSF
+        # intensity for each pupil; padding=1 triples the width of the pupil
+        itemsize = np.dtype(config.precision_complex).itemsize
+        bytes_per_pupil = 3 * itemsize * (3 * self.samples) ** 2
+        chunksize = max(1, int(memory_budget // bytes_per_pupil))
+        num_pupils = num_fields * num_focus
+        chunks = [np.arange(start, min(start + chunksize, num_pupils))
+                  for start in range(0, num_pupils, chunksize)]
+
+        fcn = partial(_field_focus_ts_mtf_core, field_phases, rho ** 2, defocus_wvs,
+                      self.epd, self.wavelength, self.efl, freqs)
+        results = parallel_map(fcn, chunks, executor=executor, workers=workers, callback=progress)
+        t, s = (np.concatenate(r).reshape((num_fields, num_focus, len(freqs))).swapaxes(0, 1)
+                for r in zip(*results))
+
+        fields = (self.fields[-1] * self.fov_y) * np.linspace(0, 1, num_fields)
+        TCube = MTFvFvF(data=t, focus=focus, field=fields, freq=freqs, azimuth='Tan')
+        SCube = MTFvFvF(data=s, focus=focus, field=fields, freq=freqs, azimuth='Sag')
+        return TCube, SCube
+
     ####### data generation ----------------------------------------------------
 
     ####### plotting -----------------------------------------------------------
@@ -273,13 +342,7 @@ class Lens(object):
 
     def plot_mtf_thrufocus(self, field_index, focus_range, numpts, freqs, fig=None, ax=None):
         focus, mtfs = self._make_mtf_thrufocus(field_index, focus_range, numpts)
-        t = []
-        s = []
-        for mtf in mtfs:
-            t.append(mtf.exact_polar(freqs, 0))
-            s.append(mtf.exact_polar(freqs, 90))
-
-        t, s = np.asarray(t), np.asarray(s)
+        t, s = np.asarray([mtf.exact_polar(freqs, (0, 90), grid=True) for mtf in mtfs]).swapaxes(0, 1)
         fig, ax = share_fig_ax(fig, ax)
         for idx, freq in enumerate(freqs):
             l, = ax.plot(focus, t[:, idx], lw=2, label=freq)
@@ -320,9 +383,15 @@ class Lens(object):
 
         Returns:
             `PSF`: a psf object.
+
+        Notes:
+            when config.cache_dir is set, the PSF is cached on disk keyed by
+            the lens parameters, so a hit skips building the pupil.
         '''
-        p = self._make_pupil(field_index=field_index)
-        return PSF.from_pupil(p, self.efl)
+        parts = ('Lens._make_psf', *self._cache_parts(field_index))
+        return cached(parts,
+                      lambda: _psf_from_pupil(self._make_pupil(field_index), self.efl),
+                      partial(PSF.load, mmap_mode=None))
 
     def _make_mtf(self, field_index):
         ''' Generates the mtf for a given field
@@ -333,12 +402,28 @@ class Lens(object):
 
         Returns:
             `MTF`: an MTF object.
+
+        Notes:
+            when config.cache_dir is set, the MTF is cached on disk keyed by
+            the lens parameters.
+        '''
+        parts = ('Lens._make_mtf', *self._cache_parts(field_index))
+        return cached(parts,
+                      lambda: _mtf_from_psf(self._make_psf(field_index)),
+                      partial(MTF.load, mmap_mode=None))
+
+    def _cache_parts(self, field_index):
+        ''' Everything the pupil of a field depends on, used to key the disk
+            cache without building the pupil.  This includes the amplitude
+            mask, the unit circle the pupil is clipped to.
         '''
-        pp = self._make_psf(field_index=field_index)
-        return MTF.from_psf(pp)
+        rho, _ = make_rho_phi_grid(self.samples, config.precision)
+        aperture = np.packbits(rho <= 1)
+        return (self.aberrations, self.fields[field_index], self.efl, self.epd,
+                self.wavelength, self.samples, aperture, np.dtype(config.precision).str)
 
-    def _make_mtf_thrufocus(self, field_index, focus_range, num_pts):
-        ''' Makes a list of MTF objects corresponding to different focus shifts
+    def _make_mtf_thrufocus(self, field_index, focus_range, num_pts, executor=None, workers=None):
+        ''' Makes a stack of MTFs corresponding to different focus shifts
             for the lens.  Focusrange will be applied symmetrically.
 
         Args:
@@ -351,44 +436,46 @@ class Lens(object):
                 and even number of points, the zero defocus point will not be
                 sampled.
 
+            executor (`string` or `concurrent.futures.Executor`): "thread",
+                "process", or an executor to distribute chunks of focus over.
+                Serial if None.
+
+            workers (`int`): number of workers, and chunks of focus.
+
         Returns:
-            list of `MTF` objects.
+            `tuple` containing:
+
+                `numpy.ndarray`: focus shifts, in microns.
+
+                `MTFStack`: MTF at each focus shift.
+
+        Notes:
+            the pupil of the field is computed once, and each focus step adds
+            a scaled unit defocus map to its phase.  The steps are propagated
+            as batches of one FFT each.
 
         '''
-        # todo: parallelize
         focus_shifts = np.linspace(-focus_range, focus_range, num_pts)
         defocus_wvs = image_displacement_to_defocus(focus_shifts, self.fno, self.wavelength)
 
-        mtfs = []
         pupil = self._make_pupil(field_index)
-        for defocus in defocus_wvs:
-            defocus_p = Seidel(W020=defocus, epd=self.epd,
-                               samples=self.samples, wavelength=self.wavelength)
-            psf = PSF.from_pupil(pupil.merge(defocus_p), self.efl)
-            mtfs.append(MTF.from_psf(psf))
-        return focus_shifts, mtfs
-
-    def _make_mtf_vs_field_vs_focus(self, num_fields, focus_range, num_focus, freqs):
-        ''' TODO: docstring
-        '''
-        self._uniformly_spaced_fields(num_fields)
-        net_mtfs = [None] * num_fields
-        for idx in range(num_fields):
-            focus, net_mtfs[idx] = self._make_mtf_thrufocus(idx, focus_range, num_focus)
-
-        fields = (self.fields[-1] * self.fov_y) * np.linspace(0, 1, num_fields)
-        t_cube = np.empty((num_focus, num_fields, len(freqs)))
-        s_cube = np.empty((num_focus, num_fields, len(freqs)))
-        for idx, mtfs in enumerate(net_mtfs):
-            for idx2, submtf in enumerate(mtfs):
-                t = submtf.exact_polar(freqs, 0)
-                s = submtf.exact_polar(freqs, 90)
-                t_cube[idx2, idx, :] = t
-                s_cube[idx2, idx, :] = s
-
-        TCube = MTFvFvF(data=t_cube, focus=focus, field=fields, freq=freqs, azimuth='Tan')
-        SCube = MTFvFvF(data=s_cube, focus=focus, field=fields, freq=freqs, azimuth='Sag')
-        return TCube, SCube
+        if executor is None:
+            chunks = [defocus_wvs]
+        else:
+            chunks = np.array_split(defocus_wvs, min(workers or cpu_count() or 1, num_pts))
+
+        fcn = partial(_thrufocus_mtf_core, pupil.phase, pupil.rho ** 2, self.epd, self.wavelength, self.efl)
+        if len(chunks) == 1:
+            mtfs = [fcn(chunks[0])]
+        elif isinstance(executor, Executor):
+            mtfs = list(executor.map(fcn, chunks))
+        else:
+            # each chunk is already a batch of focus steps, so a pool pays off
+            # even for fewer chunks than parallel_map's serial threshold
+            with _pool_type(executor)(max_workers=len(chunks)) as ex:
+                mtfs = list(ex.map(fcn, chunks))
+        data = np.concatenate([mtf.data for mtf in mtfs])
+        return focus_shifts, MTFStack(data, mtfs[0].unit_x, mtfs[0].unit_y)
 
     def _uniformly_spaced_fields(self, num_pts):
         ''' Changes the `fields` property to n evenly spaced points from 0~1.
@@ -426,8 +513,17 @@ class Lens(object):
                 f'{str(self.aberrations)}')
 
 
-def _spherical_defocus_from_monochromatic_mtf(lens, frequencies, mtf_s, mtf_t):
-    ''' Uses nonlinear optimization to set the W020, W040, W060, and W080
+'''
+Initial guesses for the spherical and defocus fit, [W020, W040, W060, W080]
+in waves.  The MTF is stationary at zero aberration, so each is away from it;
+small and large magnitudes with either relative sign of defocus and spherical
+keep large aberrations out of the wrong basin.
+'''
+_SPHERICAL_STARTS = [a * np.array([s, 1, 0, 0]) for a in (0.05, 0.3, 1) for s in (1, -1)]
+
+
+def _spherical_defocus_from_monochromatic_mtf(lens, frequencies, mtf_s, mtf_t, starts=None):
+    ''' Uses nonlinear least squares to set the W020, W040, W060, and W080
         coefficients in a lens model based on MTF measurements taken on the
         optical axis.
 
@@ -443,18 +539,55 @@ def _spherical_defocus_from_monochromatic_mtf(lens, frequencies, mtf_s, mtf_t):
         mtf_t (`iterable`): A set of tangential MTF measurements of equal length
             to the frequencies argument.
 
+        starts (`iterable`): initial [W020, W040, W060, W080] guesses, the fit
+            with the smallest residual is kept.  Defaults to _SPHERICAL_STARTS.
+
     Returns:
         `Lens`: A new lens object with its aberrations field modified with new
             spherical coefficients.
 
+    Notes:
+        the Jacobian of the MTF with respect to the coefficients is computed
+        analytically alongside the MTF, so each iteration costs one batched
+        FFT of five pupils.
+
+        the MTF is unchanged when all four coefficients change sign, so the
+        solution whose W040 has the sign of the lens' W040 (positive if it
+        has none) is returned.
+
     '''
     work_lens = lens.clone()
+    truth = np.concatenate((mtf_s, mtf_t))
+    frequencies = np.asarray(frequencies)
+
+    cache = {}
+
+    def evaluate(abervalues):
+        key = tuple(abervalues)
+        if key not in cache:
+            cache.clear()
+            cache[key] = _spherical_mtf_and_jacobian(frequencies, work_lens, abervalues)
+        return cache[key]
+
+    def residuals(abervalues):
+        return evaluate(abervalues)[0] - truth
 
-    fcn = partial(_spherical_cost_fcn_raw, frequencies,
-                  mtf_s, mtf_t, work_lens)
+    def jacobian(abervalues):
+        return evaluate(abervalues)[1]
 
-    results = minimize(fcn, [0, 0, 0, 0], method='Powell')
-    W020, W040, W060, W080 = results['x']
+    if starts is None:
+        starts = _SPHERICAL_STARTS
+
+    best = None
+    for start in starts:
+        results = least_squares(residuals, np.asarray(start, dtype=float), jac=jacobian)
+        if best is None or results['cost'] < best['cost']:
+            best = results
+
+    coefs = best['x']
+    if np.sign(coefs[1]) == -np.sign(lens.aberrations.get('W040', 1) or 1):
+        coefs = -coefs
+    W020, W040, W060, W080 = coefs
     work_lens.aberrations['W020'] = W020
     work_lens.aberrations['W040'] = W040
     work_lens.aberrations['W060'] = W060
@@ -462,22 +595,171 @@ def _spherical_defocus_from_monochromatic_mtf(lens, frequencies, mtf_s, mtf_t):
     return work_lens
 
 
-def _spherical_cost_fcn_raw(frequencies, truth_s, truth_t, lens, abervalues):
-    ''' TODO - document.  partial() should be used on this and scipy.minimize'd
+def _spherical_mtf_and_jacobian(frequencies, lens, abervalues):
+    ''' Computes the on-axis sagittal and tangential MTF of a pupil with
+        W020, W040, W060, and W080 and its derivatives w.r.t. those
+        coefficients.
+
+    Args:
+        frequencies (`numpy.ndarray`): frequencies, in cy/mm.
+
+        lens (`Lens`): lens providing the epd, efl, and sampling.
+
+        abervalues (`iterable`): [W020, W040, W060, W080].
+
+    Returns:
+        `tuple` containing:
+
+            `numpy.ndarray`: MTF, sagittal then tangential, length 2 * len(frequencies).
+
+            `numpy.ndarray`: Jacobian, shape (2 * len(frequencies), 4).
+
+    Notes:
+        with P the pupil function and phase sum(c_k rho^(2k)), the derivative
+        of the pupil is dP/dc_k = i (2 pi / wavelength) rho^(2k) P.  The PSF
+        derivative is 2 Re(conj(E) E_k) with E, E_k the transforms of P and
+        dP/dc_k, and the OTF is linear in the PSF.
 
-        abervalues - array of [W020, W040, W060, W080]
     '''
     pupil = Seidel(epd=lens.epd, samples=lens.samples,
                    W020=abervalues[0],
                    W040=abervalues[1],
                    W060=abervalues[2],
                    W080=abervalues[3])
-    psf = PSF.from_pupil(pupil, efl=lens.efl)
-    mtf = MTF.from_psf(psf)
-    synth_t = mtf.exact_polar(frequencies, 0)
-    synth_s = mtf.exact_polar(frequencies, 90)
+    rho2 = pupil.rho ** 2
+    k = 1j * 2 * pi / pupil.wavelength
+    fcns = np.stack([pupil.fcn] + [k * rho2 ** (n + 1) * pupil.fcn for n in range(4)])
+
+    fields, sample_spacing = _propagate_pupil_field(pupil, fcns, lens.efl)
+    intensity = abs(fields[0]) ** 2
+    dintensity = 2 * (fields[0].conj() * fields[1:]).real
+    psf = PSF(intensity, sample_spacing)
+
+    total = intensity.sum()
+    otf_t, otf_s = _ts_otf(intensity, psf.unit_x, psf.unit_y, frequencies)
+    dotf_t, dotf_s = _ts_otf(dintensity, psf.unit_x, psf.unit_y, frequencies)
+    dtotal = dintensity.sum(axis=(-2, -1))[:, np.newaxis]
+
+    otf = np.concatenate((otf_s, otf_t)) / total
+    dotf = (np.concatenate((dotf_s, dotf_t), axis=-1) - otf * dtotal) / total
+    mtf = abs(otf)
+    dmtf = (otf.conj() * dotf).real / np.maximum(mtf, np.finfo(mtf.dtype).tiny)
+    return mtf, dmtf.T
+
+
+def _propagate_pupil_field(pupil, fcns, efl, padding=1):
+    ''' Propagates complex pupil functions sampled like pupil to the PSF plane,
+        returning the complex fields rather than their intensity.
+    '''
+    psf_samples = (pupil.samples * padding) * 2 + pupil.samples
+    sample_spacing = pupil_sample_to_psf_sample(pupil_sample=pupil.sample_spacing * 1000,
+                                                num_samples=psf_samples,
+                                                wavelength=pupil.wavelength,
+                                                efl=efl)
+    padded = pad2d(fcns, padding)
+    fields = ifftshift(fft2(fftshift(padded, axes=(-2, -1))), axes=(-2, -1))
+    return fields, sample_spacing
+
+
+def _thrufocus_mtf_core(phase, defocus_map, epd, wavelength, efl, defocus_wvs):
+    ''' Computes the MTF of a pupil at several amounts of defocus in one
+        batched transform.
 
-    truth = np.stack((truth_s, truth_t))
-    synth = np.stack((synth_s, synth_t))
+    Args:
+        phase (`numpy.ndarray`): phase of the pupil.
+
+        defocus_map (`numpy.ndarray`): phase of one wave of W020.
+
+        epd (`float`): diameter of the pupil, in mm.
+
+        wavelength (`float`): wavelength of light, in um.
+
+        efl (`float`): effective focal length, in mm.
+
+        defocus_wvs (`numpy.ndarray`): W020 of each focus step, in waves.
+
+    Returns:
+        `MTFStack`: MTF at each amount of defocus.
+
+    '''
+    defocus_wvs = np.asarray(defocus_wvs, dtype=phase.dtype)
+    phases = phase + defocus_wvs[:, np.newaxis, np.newaxis] * defocus_map
+    pupils = PupilStack(phases, epd=epd, wavelength=wavelength)
+    return MTFStack.from_pupil(pupils, efl)
+
+
+def _field_focus_ts_mtf_core(field_phases, defocus_map, defocus_wvs, epd, wavelength,
+                             efl, freqs, indices):
+    ''' Computes the tangential and sagittal MTF for a chunk of (field, focus)
+        pupils in one batched transform.
+
+    Args:
+        field_phases (`numpy.ndarray`): phase at each field, (fields, samples, samples).
 
-    return ((truth - synth) ** 2).sum()
+        defocus_map (`numpy.ndarray`): phase of one wave of W020.
+
+        defocus_wvs (`numpy.ndarray`): W020 of each focus step, in waves.
+
+        epd (`float`): diameter of the pupil, in mm.
+
+        wavelength (`float`): wavelength of light, in um.
+
+        efl (`float`): effective focal length, in mm.
+
+        freqs (`numpy.ndarray`): frequencies to compute the MTF at, in cy/mm.
+
+        indices (`numpy.ndarray`): flat (field, focus) indices of the chunk.
+
+    Returns:
+        `tuple` containing:
+
+            `numpy.ndarray`: tangential MTF, shape (len(indices), len(freqs)).
+
+            `numpy.ndarray`: sagittal MTF, shape (len(indices), len(freqs)).
+
+    '''
+    field_idx, focus_idx = np.divmod(indices, len(defocus_wvs))
+    defocus = np.asarray(defocus_wvs, dtype=field_phases.dtype)[focus_idx]
+    phases = field_phases[field_idx] + defocus[:, np.newaxis, np.newaxis] * defocus_map
+    psfs = PSFStack.from_pupil(PupilStack(phases, epd=epd, wavelength=wavelength), efl)
+
+    total = psfs.data.sum(axis=(-2, -1))[:, np.newaxis]
+    return tuple(abs(otf) / total for otf in _ts_otf(psfs.data, psfs.unit_x, psfs.unit_y, freqs))
+
+
+def _ts_otf(intensity, unit_x, unit_y, freqs):
+    ''' Computes the unnormalized tangential and sagittal OTF of PSFs at the
+        given frequencies, as transforms of their line spread functions.
+
+    Args:
+        intensity (`numpy.ndarray`): PSF(s), shape (..., samples_x, samples_y).
+
+        unit_x (`numpy.ndarray`): x coordinates of the PSF, in microns.
+
+        unit_y (`numpy.ndarray`): y coordinates of the PSF, in microns.
+
+        freqs (`numpy.ndarray`): frequencies, in cy/mm.
+
+    Returns:
+        `tuple` containing:
+
+            `numpy.ndarray`: tangential OTF, shape (..., len(freqs)).
+
+            `numpy.ndarray`: sagittal OTF, shape (..., len(freqs)).
+
+    '''
+    out = []
+    for axis, unit in ((-1, unit_x), (-2, unit_y)):
+        lsf = intensity.sum(axis=axis)
+        kernel = np.exp(-2j * pi * np.outer(unit / 1e3, freqs))
+        out.append(lsf @ kernel)
+    return tuple(out)
+
+
+def _field_ts_mtf(lens, freqs, field_index):
+    ''' Computes the tangential and sagittal MTF of a lens at one field,
+        returned as a (2, len(freqs)) array.  Module-level so that it can be
+        sent to a process pool.
+    '''
+    psf = lens._make_psf(field_index)
+    return MTF.at(psf, freqs, (0, 90), grid=True)
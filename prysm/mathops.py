@@ -4,6 +4,7 @@
     back to more widely available options in the case that they do not.
 '''
 
+from threading import Lock
 from math import (
     floor,
     ceil,
@@ -26,12 +27,16 @@ from numpy import (
 )
 from numpy.fft import fftshift, ifftshift
 
+from prysm.conf import config
+
 atan2 = arctan2
 
 # numba funcs, cuda
 try:
     from numba import jit, vectorize
+    numba_installed = True
 except ImportError:
+    numba_installed = False
     # if Numba is not installed, create the jit decorator and have it return the
     # original function.
     def jit(signature_or_function=None, locals={}, target='cpu', cache=False, **options):
@@ -44,17 +49,124 @@ except ImportError:
 
     vectorize = jit
 
+# FFT libraries, used when selected with config.set_fft_backend
+try:
+    import scipy.fft as scipy_fft
+except ImportError:
+    scipy_fft = None
+
+try:
+    import pyfftw
+    import pyfftw.builders
+except ImportError:
+    pyfftw = None
+
 
 # export control
 # thanks, ITAR
 
 
 def fft2(array):
-    return np.fft.fft2(array)
+    ''' Computes the 2D FFT over the last two axes of an array with the
+        configured FFT backend.
+    '''
+    backend = config.fft_backend
+    if backend == 'scipy':
+        return scipy_fft.fft2(array, workers=config.fft_workers)
+    elif backend == 'fftw':
+        return _fftw_execute(array, 'fft2')
+    else:
+        return _preserve_single(np.fft.fft2(array), array)
 
 
 def ifft2(array):
-    return np.fft.ifft2(array)
+    ''' Computes the 2D inverse FFT over the last two axes of an array with
+        the configured FFT backend.
+    '''
+    backend = config.fft_backend
+    if backend == 'scipy':
+        return scipy_fft.ifft2(array, workers=config.fft_workers)
+    elif backend == 'fftw':
+        return _fftw_execute(array, 'ifft2')
+    else:
+        return _preserve_single(np.fft.ifft2(array), array)
+
+
+def _preserve_single(result, array):
+    ''' Casts an FFT of single precision data back to complex64; older numpy
+        computes all FFTs in double precision.
+    '''
+    if np.asarray(array).dtype in (np.float32, np.complex64):
+        return result.astype(np.complex64, copy=False)
+    return result
+
+
+'''
+pyFFTW plans, keyed by (direction, shape, dtype, threads).  Each holds a lock
+because a plan executes on its own internal buffers.
+'''
+_fftw_plans = {}
+
+
+def _fftw_execute(array, direction):
+    ''' Executes a cached pyFFTW plan for the array, planning it on first use.
+    '''
+    array = np.asarray(array)
+    if array.dtype.kind != 'c':
+        array = array.astype(np.result_type(array.dtype, np.complex64))
+
+    key = (direction, array.shape, array.dtype.str, config.fft_workers)
+    try:
+        plan, lock = _fftw_plans[key]
+    except KeyError:
+        builder = getattr(pyfftw.builders, direction)
+        plan = builder(pyfftw.empty_aligned(array.shape, dtype=array.dtype),
+                       axes=(-2, -1),
+                       threads=config.fft_workers,
+                       planner_effort='FFTW_MEASURE')
+        plan, lock = _fftw_plans.setdefault(key, (plan, Lock()))
+
+    with lock:
+        return plan(array).copy()
+
+
+def clear_fft_plans():
+    ''' Discards all cached pyFFTW plans.
+    '''
+    _fftw_plans.clear()
+
+
+def save_wisdom(path):
+    ''' Saves the accumulated pyFFTW wisdom to disk, so that future sessions
+        can plan FFTs without measuring them again.
+
+    Args:
+        path (`string` or `pathlib.Path`): file to write.
+
+    Notes:
+        the wisdom is stored as plain byte arrays in an .npz archive, which
+            is read back without unpickling anything.
+
+    '''
+    wisdom = [np.frombuffer(w, dtype=np.uint8) for w in pyfftw.export_wisdom()]
+    with open(path, 'wb') as fid:
+        np.savez(fid, *wisdom)
+
+
+def load_wisdom(path):
+    ''' Loads pyFFTW wisdom previously saved with save_wisdom.
+
+    Args:
+        path (`string` or `pathlib.Path`): file to read.
+
+    Returns:
+        `tuple` of `bool`: whether the double, single, and long double
+            wisdom was imported successfully.
+
+    '''
+    with np.load(path, allow_pickle=False) as data:
+        wisdom = tuple(data[f'arr_{i}'].tobytes() for i in range(len(data.files)))
+    return pyfftw.import_wisdom(wisdom)
 
 
 # stop pyflakes import errors
@@ -192,8 +192,7 @@ class MTFvFvF(object):
 def mtf_ts_extractor(mtf, freqs):
     ''' Extracts the T and S MTF from a PSF object.
     '''
-    tan = mtf.exact_polar(freqs=freqs, azimuths=0)
-    sag = mtf.exact_polar(freqs=freqs, azimuths=90)
+    tan, sag = mtf.exact_polar(freqs=freqs, azimuths=(0, 90), grid=True)
     return tan, sag
 
 
@@ -1,24 +1,70 @@
 ''' Object to convolve lens PSFs with
 '''
 
-from multiprocessing import Pool
-
+import atexit
+from os import cpu_count
+from pathlib import Path
+from threading import Lock
 from functools import lru_cache
+from concurrent.futures import Executor, ThreadPoolExecutor
 
 import numpy as np
 
 from prysm.conf import config
 from prysm.mathops import (
     fft2,
+    ifft2,
     fftshift,
+    ifftshift,
     sin,
     cos,
     sqrt,
 )
 from prysm.coordinates import cart_to_polar
-from prysm.psf import PSF, _unequal_spacing_conv_core
+from prysm.psf import (
+    PSF,
+    RGBPSF,
+    _unequal_spacing_conv_core,
+    _resampled_transfer_function,
+    _resampled_kernel,
+    _fold_kernel,
+)
 from prysm.fttools import forward_ft_unit, pad2d
-from prysm.util import share_fig_ax, is_odd
+from prysm.util import share_fig_ax, is_odd, parallel_map
+from prysm.diskcache import digest
+
+'''
+Thread pool shared by RGB computations, created on first use with
+config.rgb_workers threads.  FFTs release the GIL, so threads convolve the
+channels concurrently without copying them to other processes.
+'''
+_rgb_pool = None
+_rgb_pool_lock = Lock()
+
+
+def _get_rgb_pool():
+    ''' Retrieves the shared RGB thread pool, (re)creating it if it does not
+        exist or config.rgb_workers has changed.
+    '''
+    global _rgb_pool
+    with _rgb_pool_lock:
+        if _rgb_pool is None or _rgb_pool._max_workers != config.rgb_workers:
+            if _rgb_pool is not None:
+                _rgb_pool.shutdown(wait=False)
+            _rgb_pool = ThreadPoolExecutor(max_workers=config.rgb_workers,
+                                           thread_name_prefix='prysm-rgb')
+        return _rgb_pool
+
+
+@atexit.register
+def shutdown_rgb_pool():
+    ''' Shuts down the shared RGB thread pool.  It is recreated if needed.
+    '''
+    global _rgb_pool
+    with _rgb_pool_lock:
+        if _rgb_pool is not None:
+            _rgb_pool.shutdown()
+            _rgb_pool = None
 
 
 class Image(object):
@@ -113,16 +159,52 @@ class Image(object):
         '''
         return PSF(self.data, self.sample_spacing)
 
-    def convpsf(self, psf):
+    def convpsf(self, psf, memory_budget=None, out=None, executor=None, workers=None,
+                kernel_size=None):
         ''' Convolves with a PSF for image simulation
 
         Args:
             psf (`PSF`): a PSF
 
+            memory_budget (`int`): if given, convolve the image in tiles whose
+                FFT working set fits in this many bytes, rather than all at once.
+
+            out (`string`, `pathlib.Path`, or `numpy.ndarray`): for a tiled
+                convolution, where to write the result; a path creates a .npy
+                memory map.  Defaults to a new array.
+
+            executor (`string` or `concurrent.futures.Executor`): for a tiled
+                convolution, "thread" or an executor to distribute tiles over.
+                Serial if None.
+
+            workers (`int`): number of workers for a new thread pool.  If
+                None, the size of executor when it is an Executor, else the
+                number of CPUs.  The memory budget is divided among them.
+
+            kernel_size (`int` or `tuple`): for a tiled convolution, size of
+                the kernel in pixels, (rows, cols) if a tuple.  Defaults to
+                the extent of the PSF, which holds the whole kernel.
+
         Returns:
             `Image`: A new, blurred image.
 
+        Notes:
+            the tiled convolution is overlap-save, wrapping at the image edges
+                like the full-frame FFT.  Both use the PSF resampled onto the
+                pixels of the image, which is confined to the extent of the
+                PSF, so with the default kernel_size they agree to rounding.
+                The image itself may be a memory map.
+
+            a ValueError is raised if memory_budget cannot hold the kernel
+                and one output pixel per worker.
+
         '''
+        if memory_budget is not None:
+            data = _tiled_conv(self, psf, memory_budget, out, executor, workers, kernel_size)
+            return Image(data=data,
+                         sample_spacing=self.sample_spacing,
+                         synthetic=self.synthetic)
+
         img_psf = self.as_psf()
         conved_image = _unequal_spacing_conv_core(img_psf, psf)
         # return conved_image
@@ -276,35 +358,48 @@ class RGBImage(object):
 
         imsave(path, dat)
 
-    def convpsf(self, rgbpsf):
+    def convpsf(self, rgbpsf, batched=False):
         ''' Convolves with a PSF for image simulation
 
         Args:
             rgbpsf (`RGBPSF`): an RGBPSF
 
+            batched (`bool`): if true, transform the three channels as one
+                (3, m, n) stack with a single FFT call in each direction.
+
         Returns:
             `RGBImage`: A new, blurred image.
 
+        Notes:
+            when config.parallel_rgb is true and batched is false, the
+                channels are convolved concurrently on a thread pool shared
+                between calls.  When batched is true, the transfer function is
+                built once per image size and kept on rgbpsf for reuse until its
+                channels change.
+
         '''
-        img_r = self.as_psf('r')
-        img_g = self.as_psf('g')
-        img_b = self.as_psf('b')
-
-        if config.parallel_rgb:
-            psf_r = rgbpsf.r_psf._renorm(to='total')
-            psf_g = rgbpsf.g_psf._renorm(to='total')
-            psf_b = rgbpsf.b_psf._renorm(to='total')
-
-            imgs = [img_r, img_g, img_b]
-            psfs = [psf_r, psf_g, psf_b]
-            with Pool(3) as pool:
-                r_conv, g_conv, b_conv = pool.map(_unequal_spacing_conv_core, imgs, psfs)
+        if batched:
+            # rebuilt whenever the PSF's channels have changed since it was cached
+            samples = self.R.shape
+            key = (samples, self.sample_spacing)
+            psf_key = digest(rgbpsf.R, rgbpsf.G, rgbpsf.B, rgbpsf.sample_spacing)
+            cached_key, tf = rgbpsf._transfer_functions.get(key, (None, None))
+            if cached_key != psf_key:
+                tf = TransferFunction(rgbpsf, samples, self.sample_spacing)
+                rgbpsf._transfer_functions[key] = (psf_key, tf)
+            r, g, b = tf.convolve(np.stack((self.R, self.G, self.B)))
         else:
-            r_conv = _unequal_spacing_conv_core(img_r, rgbpsf.r_psf._renorm(to='total'))
-            g_conv = _unequal_spacing_conv_core(img_g, rgbpsf.g_psf._renorm(to='total'))
-            b_conv = _unequal_spacing_conv_core(img_b, rgbpsf.b_psf._renorm(to='total'))
-
-        return RGBImage(r=r_conv.data, g=g_conv.data, b=b_conv.data,
+            imgs = [self.as_psf('r'), self.as_psf('g'), self.as_psf('b')]
+            psfs = [rgbpsf.r_psf._renorm(to='total'),
+                    rgbpsf.g_psf._renorm(to='total'),
+                    rgbpsf.b_psf._renorm(to='total')]
+            if config.parallel_rgb:
+                convs = _get_rgb_pool().map(_unequal_spacing_conv_core, imgs, psfs)
+            else:
+                convs = map(_unequal_spacing_conv_core, imgs, psfs)
+            r, g, b = (conv.data for conv in convs)
+
+        return RGBImage(r=r, g=g, b=b,
                         sample_spacing=self.sample_spacing,
                         synthetic=self.synthetic)
 
@@ -339,6 +434,207 @@ class RGBImage(object):
                         sample_spacing=scale, synthetic=False)
 
 
+def _tiled_conv(img, psf, memory_budget, out=None, executor=None, workers=None, kernel_size=None):
+    ''' Convolves an image with a PSF by overlap-save over tiles.
+
+    Args:
+        img (`Image`): image to blur.
+
+        psf (`PSF`): PSF to blur with.
+
+        memory_budget (`int`): bytes available to the FFTs of all workers.
+
+        out (`string`, `pathlib.Path`, or `numpy.ndarray`): destination of
+            the result, see Image.convpsf.
+
+        executor (`string` or `concurrent.futures.Executor`): see util.parallel_map.
+
+        workers (`int`): number of workers for a new pool.  If None, the
+            size of executor when it is an Executor, else the number of CPUs.
+
+        kernel_size (`int` or `tuple`): size of the kernel in pixels.
+
+    Returns:
+        `numpy.ndarray`: blurred image, normalized to unit peak.
+
+    '''
+    data = img.data
+    rows, cols = data.shape
+
+    # the kernel is confined to the extent of the PSF, see _resampled_kernel
+    kernel = _fold_kernel(_resampled_kernel(psf, img.sample_spacing), (rows, cols))
+    if kernel_size is not None:
+        if isinstance(kernel_size, int):
+            kernel_size = (kernel_size, kernel_size)
+        ky, kx = kernel.shape
+        cy, cx = max(0, (ky - kernel_size[0]) // 2), max(0, (kx - kernel_size[1]) // 2)
+        kernel = kernel[cy:ky - cy, cx:kx - cx]
+    ky, kx = kernel.shape
+    cy, cx = ky // 2, kx // 2
+
+    # about four complex arrays per tile are live at once
+    if workers is None:
+        workers = executor._max_workers if isinstance(executor, Executor) else cpu_count() or 1
+    nworkers = workers if executor is not None else 1
+    itemsize = np.dtype(config.precision_complex).itemsize
+    side = int(np.sqrt(memory_budget / (4 * itemsize * nworkers)))
+    if side < max(ky, kx):
+        raise ValueError(f'memory_budget of {memory_budget} bytes cannot hold a {ky}x{kx} kernel '
+                         'and one output pixel per worker; raise memory_budget or give a '
+                         'smaller kernel_size.')
+    tile_y = min(rows, side - ky + 1)
+    tile_x = min(cols, side - kx + 1)
+
+    if isinstance(out, (str, Path)):
+        out = np.lib.format.open_memmap(out, mode='w+', dtype=config.precision, shape=data.shape)
+    elif out is None:
+        out = np.empty(data.shape, dtype=config.precision)
+
+    tiles = [(y0, x0) for y0 in range(0, rows, tile_y) for x0 in range(0, cols, tile_x)]
+    kernel_fts = {}
+
+    def conv_tile(corner):
+        y0, x0 = corner
+        y1, x1 = min(y0 + tile_y, rows), min(x0 + tile_x, cols)
+
+        # input with halos, wrapped at the edges of the image
+        in_rows = np.arange(y0 - (ky - 1 - cy), y1 + cy) % rows
+        in_cols = np.arange(x0 - (kx - 1 - cx), x1 + cx) % cols
+        tile = data[in_rows[:, np.newaxis], in_cols]
+
+        shape = tile.shape
+        kernel_ft = kernel_fts.get(shape)
+        if kernel_ft is None:
+            padded = np.zeros(shape, dtype=kernel.dtype)
+            padded[:ky, :kx] = kernel
+            kernel_ft = kernel_fts.setdefault(shape, fft2(padded))
+
+        conv = ifft2(fft2(tile) * kernel_ft)
+        out[y0:y1, x0:x1] = abs(conv[ky - 1:, kx - 1:])
+
+    parallel_map(conv_tile, tiles, executor=executor, workers=workers)
+    out /= out.max()
+    if isinstance(out, np.memmap):
+        out.flush()
+    return out
+
+
+class TransferFunction(object):
+    ''' The transfer function of an optical system, resampled once onto the
+        frequency grid of images of a given size and sampling, for blurring
+        many frames with the same PSF.
+
+    Instance Methods:
+        convolve: blurs a frame or a stack of frames with one batched FFT.
+
+        stream: blurs frames from an iterable in batches, yielding each.
+
+    Notes:
+        a TransferFunction built from an RGBPSF blurs (3, m, n) frames, or
+            RGBImages; one built from a PSF blurs (m, n) frames, or Images.
+
+    '''
+    def __init__(self, psf, samples, sample_spacing, renorm=True):
+        ''' Creates a new TransferFunction.
+
+        Args:
+            psf (`PSF` or `RGBPSF`): PSF of the system.
+
+            samples (`int` or `iterable`): shape of the frames, (m, n) if
+                iterable.
+
+            sample_spacing (`float`): spacing between samples of the frames,
+                in microns.
+
+            renorm (`bool`): if true, normalize each blurred frame (and
+                channel) to unit peak, as convpsf does.  If false, the blur
+                conserves the total of each frame.
+
+        Returns:
+            `TransferFunction`: a new transfer function.
+
+        '''
+        if isinstance(samples, int):
+            samples = (samples, samples)
+        self.samples = tuple(samples)
+        self.sample_spacing = sample_spacing
+        self.renorm = renorm
+
+        ref = PSF(np.zeros(self.samples, dtype=config.precision), sample_spacing)
+        if isinstance(psf, RGBPSF):
+            psfs = (psf.r_psf, psf.g_psf, psf.b_psf)
+            tf = np.stack([_resampled_transfer_function(p, ref) for p in psfs])
+            self.rgb = True
+        else:
+            tf = _resampled_transfer_function(psf, ref)
+            self.rgb = False
+
+        # unit DC gain, so that the blur conserves the total of each frame
+        self.data = tf / tf[..., :1, :1]
+
+    def convolve(self, frames):
+        ''' Blurs frames with the transfer function.
+
+        Args:
+            frames (`numpy.ndarray`, `Image`, or `RGBImage`): a frame of shape
+                (m, n), or (3, m, n) for RGB, or a stack of them along a
+                leading axis.
+
+        Returns:
+            `numpy.ndarray`, `Image`, or `RGBImage`: blurred frames, of the
+                same type and shape as frames.
+
+        '''
+        if isinstance(frames, RGBImage):
+            r, g, b = self.convolve(np.stack((frames.R, frames.G, frames.B)))
+            return RGBImage(r=r, g=g, b=b, sample_spacing=frames.sample_spacing,
+                            synthetic=frames.synthetic)
+        elif isinstance(frames, Image):
+            return Image(data=self.convolve(frames.data), sample_spacing=frames.sample_spacing,
+                         synthetic=frames.synthetic)
+
+        ft = fft2(fftshift(frames, axes=(-2, -1)))
+        ft *= self.data
+        out = abs(ifftshift(ifft2(ft), axes=(-2, -1)))
+        if self.renorm:
+            out /= out.max(axis=(-2, -1), keepdims=True)
+        return out
+
+    def stream(self, frames, batch_size=8):
+        ''' Blurs a sequence of frames, transforming them in batches.
+
+        Args:
+            frames (`iterable`): frames, e.g. a generator or an array stack.
+                See convolve.
+
+            batch_size (`int`): number of frames transformed together.
+
+        Returns:
+            `generator` yielding blurred frames in order.
+
+        '''
+        batch = []
+        for frame in frames:
+            if isinstance(frame, (Image, RGBImage)):
+                yield from self._flush(batch)
+                batch = []
+                yield self.convolve(frame)
+                continue
+
+            batch.append(frame)
+            if len(batch) == batch_size:
+                yield from self._flush(batch)
+                batch = []
+
+        yield from self._flush(batch)
+
+    def _flush(self, batch):
+        ''' Blurs a list of array frames as one stack.
+        '''
+        if batch:
+            yield from self.convolve(np.stack(batch))
+
+
 def rgbimage_to_datacube(rgbimage):
     ''' Creates an mxnx3 array from an RGBImage
 
@@ -382,7 +678,7 @@ class Slit(Image):
         w = width / 2
 
         # produce the background
-        arr = np.zeros((samples, samples))
+        arr = np.zeros((samples, samples), dtype=config.precision)
 
         # paint in the slit
         if orientation.lower() in ('v', 'vert', 'vertical'):
@@ -423,7 +719,7 @@ class Pinhole(Image):
         w = width / 2
 
         # paint a circle on a black background
-        arr = np.zeros((samples, samples))
+        arr = np.zeros((samples, samples), dtype=config.precision)
         arr[sqrt(xv**2 + yv**2) < w] = 1
         super().__init__(data=arr, sample_spacing=sample_spacing, synthetic=True)
 
@@ -452,8 +748,8 @@ class SiemensStar(Image):
         self.num_spokes = num_spokes
 
         # generate a coordinate grid
-        x = np.linspace(-1, 1, samples)
-        y = np.linspace(-1, 1, samples)
+        x = np.linspace(-1, 1, samples, dtype=config.precision)
+        y = np.linspace(-1, 1, samples, dtype=config.precision)
         xx, yy = np.meshgrid(x, y)
         rv, pv = cart_to_polar(xx, yy)
 
@@ -498,10 +794,10 @@ class TiltedSquare(Image):
         '''
         radius = 0.3
         if background.lower() == 'white':
-            arr = np.ones((samples, samples))
+            arr = np.ones((samples, samples), dtype=config.precision)
             fill_with = 0
         else:
-            arr = np.zeros((samples, samples))
+            arr = np.zeros((samples, samples), dtype=config.precision)
             fill_with = 1
 
         # TODO: optimize by working with index numbers directly and avoid
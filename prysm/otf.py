@@ -7,10 +7,12 @@ from scipy import interpolate
 from matplotlib import pyplot as plt
 
 from prysm.mathops import fft2, fftshift, pi, sqrt, arccos
-from prysm.psf import PSF
+from prysm.psf import PSF, PSFStack
 from prysm.fttools import forward_ft_unit
 from prysm.util import correct_gamma, share_fig_ax
 from prysm.coordinates import polar_to_cart
+from prysm.io import save_bundle, load_bundle, _check_bundle_type
+from prysm.diskcache import cached
 
 
 class MTF(object):
@@ -24,24 +26,32 @@ class MTF(object):
     Instance Methods:
         exact_polar: returns the exact MTF at a given set of frequency, azimuth
             pairs.  A list of frequencies can be given to evaluate along the X
-            axis only.
+            axis only.  Returns an array of MTF values.
 
         exact_xy: returns the exact MTF at a given X,Y frequency pair.  Returns
-            a list of MTF values.
+            an array of MTF values.
 
         plot2d: Makes a 2D plot of the MTF.  Returns (fig, ax)
 
         plot_tan_sag: Makes a plot of the tan/sag (x/y) MTF.  Returns (fig, ax)
 
+        save: Saves the MTF to disk in a form that can be memory mapped.
+
     Private Instance Methods:
+        _interpolate: interpolates the MTF at many points with one call.
+
         _make_interp_function: generates an interpolation function for the MTF,
             and stores it in the class instance.
 
     Static Methods:
+        at: Computes the MTF of a PSF at given frequency, azimuth pairs only.
+
         from_psf: Generates an MTF object from a PSF.
 
         from_pupil: Generates an intermediate PSF object, and MTF from that PSF.
 
+        load: Loads an MTF saved with save, memory mapping its data.
+
     '''
     def __init__(self, data, unit_x, unit_y=None):
         '''Creates an MTF object
@@ -88,72 +98,61 @@ class MTF(object):
         '''
         return self.unit_y[self.center_y:], self.data[self.center_x, self.center_y:]
 
-    def exact_polar(self, freqs, azimuths=None):
+    def exact_polar(self, freqs, azimuths=None, grid=False):
         '''Retrieves the MTF at the specified frequency-azimuth pairs
 
         Args:
-            freqs (`iterable`): radial frequencies to retrieve MTF for.
+            freqs (`float` or `iterable`): radial frequencies to retrieve MTF for.
 
-            azimuths (`iterable`): corresponding azimuths to retrieve MTF for.
+            azimuths (`float` or `iterable`): corresponding azimuths to retrieve
+                MTF for, in degrees.  Broadcast against freqs; defaults to 0.
+
+            grid (`bool`): if True, evaluate every combination of freqs and
+                azimuths instead of pairs, returning an array of shape
+                (len(azimuths), len(freqs)).
 
         Returns:
-            list: MTF at the given points.
+            `numpy.ndarray`: MTF at the given points, or `float` if freqs and
+                azimuths are both scalars.
 
         '''
-        self._make_interp_function()
-
-        # handle user-unspecified azimuth
         if azimuths is None:
-            if type(freqs) in (int, float):
-                # single azimuth
-                azimuths = 0
-            else:
-                azimuths = [0] * len(freqs)
-        # handle single azimuth, multiple freqs
-        elif type(azimuths) in (int, float):
-            azimuths = [azimuths] * len(freqs)
-
-        azimuths = np.radians(azimuths)
-        # handle single value case
-        if type(freqs) in (int, float):
-            x, y = polar_to_cart(freqs, azimuths)
-            return float(self.interpf((x, y), method='linear'))
-
-        outs = []
-        for freq, az in zip(freqs, azimuths):
-            x, y = polar_to_cart(freq, az)
-            outs.append(float(self.interpf((x, y), method='linear')))
-        return outs
-
-    def exact_xy(self, x, y=None):
+            azimuths = 0
+
+        freqs = np.asarray(freqs, dtype=self.unit_x.dtype)
+        azimuths = np.radians(np.asarray(azimuths, dtype=self.unit_x.dtype))
+        if grid:
+            freqs, azimuths = freqs.ravel()[np.newaxis, :], azimuths.ravel()[:, np.newaxis]
+
+        x, y = polar_to_cart(*np.broadcast_arrays(freqs, azimuths))
+        return self._interpolate(x, y)
+
+    def exact_xy(self, x, y=None, grid=False):
         '''Retrieves the MTF at the specified X-Y frequency pairs
 
         Args:
-            x (iterable): X frequencies to retrieve the MTF at
-            y (iterable): Y frequencies to retrieve the MTF at
+            x (`float` or `iterable`): X frequencies to retrieve the MTF at.
+
+            y (`float` or `iterable`): Y frequencies to retrieve the MTF at.
+                Broadcast against x; defaults to 0.
+
+            grid (`bool`): if True, evaluate every combination of x and y
+                instead of pairs, returning an array of shape (len(y), len(x)).
 
         Returns:
-            list: MTF at the given points
+            `numpy.ndarray`: MTF at the given points, or `float` if x and y
+                are both scalars.
 
         '''
-        self._make_interp_function()
-
-        # handle user-unspecified azimuth
         if y is None:
-            if type(x) in (int, float):
-                # single azimuth
-                y = 0
-            else:
-                y = [0] * len(x)
-
-        # handle single value case
-        if type(x) in (int, float):
-            return float(self.interpf((x, y), method='linear'))
-
-        outs = []
-        for x, y in zip(x, y):
-            outs.append(float(self.interpf((x, y), method='linear')))
-        return outs
+            y = 0
+
+        x, y = np.asarray(x), np.asarray(y)
+        if grid:
+            x, y = x.ravel()[np.newaxis, :], y.ravel()[:, np.newaxis]
+
+        return self._interpolate(*np.broadcast_arrays(x, y))
+
     # quick-access slices ------------------------------------------------------
 
     # plotting -----------------------------------------------------------------
@@ -244,6 +243,27 @@ class MTF(object):
 
     # helpers ------------------------------------------------------------------
 
+    def _interpolate(self, x, y):
+        '''Interpolates the MTF at (x, y) frequencies of any, equal, shape in
+            a single call to the interpolator.
+
+        Args:
+            x (`numpy.ndarray`): X frequencies.
+
+            y (`numpy.ndarray`): Y frequencies.
+
+        Returns:
+            `numpy.ndarray`: MTF of the same shape as x and y, or `float` if
+                they are 0-dimensional.
+
+        '''
+        self._make_interp_function()
+        pts = np.stack((x.ravel(), y.ravel()), axis=-1)
+        values = self.interpf(pts, method='linear').reshape(x.shape)
+        if values.ndim == 0:
+            return float(values)
+        return values
+
     def _make_interp_function(self):
         '''Generates an interpolation function for this instance of MTF, used to
             procure MTF at exact frequencies.`
@@ -260,6 +280,19 @@ class MTF(object):
 
         return self
 
+    def save(self, path):
+        ''' Saves the MTF to a directory of .npy files with a JSON sidecar.
+
+        Args:
+            path (`string` or `pathlib.Path`): directory to write.
+
+        Returns:
+            `pathlib.Path`: path.
+
+        '''
+        arrays = {'data': self.data, 'unit_x': self.unit_x, 'unit_y': self.unit_y}
+        return save_bundle(path, arrays, {'type': 'MTF'})
+
     @staticmethod
     def from_psf(psf):
         ''' Generates an MTF from a PSF.
@@ -270,14 +303,65 @@ class MTF(object):
         Returns:
             :class:`MTF`: A new MTF instance.
 
+        Notes:
+            When config.cache_dir is set, MTFs are cached on disk keyed by the
+            PSF data and sampling.
+
+        '''
+        parts = ('MTF.from_psf', psf.data, psf.sample_spacing)
+        return cached(parts, lambda: _mtf_from_psf(psf), _load_cached)
+
+    @staticmethod
+    def at(psf, freqs, azimuths=None, grid=False):
+        ''' Computes the MTF of a PSF at exactly the requested frequencies with
+            a direct DFT, without computing or interpolating a full 2D MTF.
+
+        Args:
+            psf (:class:`PSF`): PSF to compute the MTF of.
+
+            freqs (`float` or `iterable`): radial frequencies, in cy/mm.
+
+            azimuths (`float` or `iterable`): corresponding azimuths, in degrees.
+                Broadcast against freqs; defaults to 0.
+
+            grid (`bool`): if True, evaluate every combination of freqs and
+                azimuths instead of pairs, returning an array of shape
+                (len(azimuths), len(freqs)).
+
+        Returns:
+            `numpy.ndarray`: MTF at the given points, or `float` if freqs and
+                azimuths are both scalars.
+
+        Notes:
+            The DFT kernel is separable in x and y, so each frequency costs one
+            pass over the PSF.  This is much cheaper than :meth:`from_psf` when
+            only a handful of frequencies are needed.
+
         '''
-        dat = abs(fftshift(fft2(psf.data)))
-        unit_x = forward_ft_unit(psf.sample_spacing, psf.samples_x)
-        unit_y = forward_ft_unit(psf.sample_spacing, psf.samples_y)
-        return MTF(dat / dat[psf.center_x, psf.center_y], unit_x, unit_y)
+        if azimuths is None:
+            azimuths = 0
+
+        freqs = np.asarray(freqs, dtype=psf.data.dtype)
+        azimuths = np.radians(np.asarray(azimuths, dtype=psf.data.dtype))
+        if grid:
+            freqs, azimuths = freqs.ravel()[np.newaxis, :], azimuths.ravel()[:, np.newaxis]
+
+        fx, fy = polar_to_cart(*np.broadcast_arrays(freqs, azimuths))
+        shape = fx.shape
+
+        # PSF units are microns, frequencies are cy/mm
+        x, y = psf.unit_x / 1e3, psf.unit_y / 1e3
+        dtype = np.result_type(psf.data.dtype, np.complex64)
+        kernel_x = np.exp(-2j * pi * np.outer(fx.ravel(), x)).astype(dtype, copy=False)
+        kernel_y = np.exp(-2j * pi * np.outer(fy.ravel(), y)).astype(dtype, copy=False)
+        otf = ((kernel_x @ psf.data) * kernel_y).sum(axis=-1)
+        mtf = (abs(otf) / psf.data.sum()).reshape(shape)
+        if mtf.ndim == 0:
+            return float(mtf)
+        return mtf
 
     @staticmethod
-    def from_pupil(pupil, efl, padding=1):
+    def from_pupil(pupil, efl, padding=1, sample_spacing=None, samples=None):
         ''' Generates an MTF from a pupil, given a focal length (propagation distance).
 
         Args:
@@ -287,13 +371,145 @@ class MTF(object):
 
             padding (`number`): Number of pupil widths to pad with on each side.
 
+            sample_spacing (`float`): if given, the intermediate PSF is computed
+                with a matrix DFT at this sample spacing, in microns.
+
+            samples (`int` or `iterable`): number of samples in the PSF computed
+                with a matrix DFT.
+
         Returns:
             :class:`MTF`: A new MTF instance.
 
         '''
-        psf = PSF.from_pupil(pupil, efl=efl, padding=padding)
+        psf = PSF.from_pupil(pupil, efl=efl, padding=padding,
+                             sample_spacing=sample_spacing, samples=samples)
         return MTF.from_psf(psf)
 
+    @staticmethod
+    def load(path, mmap_mode='r'):
+        ''' Loads an MTF written by MTF.save.
+
+        Args:
+            path (`string` or `pathlib.Path`): directory to read.
+
+            mmap_mode (`string`): memory map mode for the data, see
+                io.load_bundle.  Defaults to a read-only map, which reads data
+                only as it is used.
+
+        Returns:
+            `MTF`: a new MTF instance.
+
+        '''
+        arrays, meta = load_bundle(path, mmap_mode)
+        _check_bundle_type(meta, 'MTF', path)
+        return MTF(arrays['data'], arrays['unit_x'], arrays['unit_y'])
+
+
+def _mtf_from_psf(psf):
+    ''' Computes the MTF of a PSF without consulting the disk cache; see
+        MTF.from_psf.
+    '''
+    dat = abs(fftshift(fft2(psf.data)))
+    unit_x = forward_ft_unit(psf.sample_spacing, psf.samples_x)
+    unit_y = forward_ft_unit(psf.sample_spacing, psf.samples_y)
+    return MTF(dat / dat[psf.center_x, psf.center_y], unit_x, unit_y)
+
+
+def _load_cached(path):
+    ''' Loads a cached MTF into memory, so that eviction cannot pull the file
+        out from under it.
+    '''
+    return MTF.load(path, mmap_mode=None)
+
+
+class MTFStack(object):
+    ''' A stack of equally sampled MTFs, e.g. those of a :class:`PSFStack`.
+
+    Static Methods:
+        from_psf: Generates an MTFStack from a PSFStack.
+
+        from_pupil: Generates an intermediate PSFStack, and MTFStack from it.
+
+    Notes:
+        data is an array of shape (N, samples_y, samples_x).  Indexing or
+            iterating the stack yields :class:`MTF` instances that share
+            memory with the stack.
+
+    '''
+    def __init__(self, data, unit_x, unit_y=None):
+        '''Creates an MTFStack object
+
+        Args:
+            data (`numpy.ndarray`): MTF values on a stack of 2D grids.
+
+            unit_x (`numpy.ndarray`): array of x units, 1D.
+
+            unit_y (`numpy.ndarray`): array of y units, 1D.
+
+        Returns:
+            `MTFStack`: a new :class:`MTFStack` instance.
+
+        '''
+        if unit_y is None:
+            unit_y = unit_x
+        self.data = data
+        self.unit_x = unit_x
+        self.unit_y = unit_y
+        self.samples_y, self.samples_x = data.shape[-2:]
+        self.center_x = self.samples_x // 2
+        self.center_y = self.samples_y // 2
+
+    def __len__(self):
+        return self.data.shape[0]
+
+    def __getitem__(self, idx):
+        if idx >= len(self) or idx < -len(self):
+            raise IndexError('MTF index out of range')
+
+        return MTF(self.data[idx], self.unit_x, self.unit_y)
+
+    @staticmethod
+    def from_psf(psfs):
+        ''' Generates an MTF from each PSF of a stack with one batched transform.
+
+        Args:
+            psfs (:class:`PSFStack`): PSFs to compute MTFs from.
+
+        Returns:
+            :class:`MTFStack`: A new MTFStack instance.
+
+        '''
+        dat = abs(fftshift(fft2(psfs.data), axes=(-2, -1)))
+        dat /= dat[:, psfs.center_x, psfs.center_y][:, np.newaxis, np.newaxis]
+        unit_x = forward_ft_unit(psfs.sample_spacing, psfs.samples_x)
+        unit_y = forward_ft_unit(psfs.sample_spacing, psfs.samples_y)
+        return MTFStack(dat, unit_x, unit_y)
+
+    @staticmethod
+    def from_pupil(pupils, efl, padding=1, sample_spacing=None, samples=None):
+        ''' Generates MTFs from a stack of pupils, given a focal length.
+
+        Args:
+            pupils (:class:`PupilStack`): pupils to propagate to PSFs, and convert to MTFs.
+
+            efl (`float`): Effective focal length or propagation distance of the wavefunction.
+
+            padding (`number`): Number of pupil widths to pad with on each side.
+
+            sample_spacing (`float`): if given, the intermediate PSFs are
+                computed with a batched matrix DFT at this sample spacing, in microns.
+
+            samples (`int` or `iterable`): number of samples in the PSFs
+                computed with a matrix DFT.
+
+        Returns:
+            :class:`MTFStack`: A new MTFStack instance.
+
+        '''
+        psfs = PSFStack.from_pupil(pupils, efl=efl, padding=padding,
+                                   sample_spacing=sample_spacing, samples=samples)
+        return MTFStack.from_psf(psfs)
+
 
 def diffraction_limited_mtf(fno, wavelength, frequencies=None, num_pts=128):
     ''' Gives the diffraction limited MTF for a circular pupil and the given parameters.
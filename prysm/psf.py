@@ -1,5 +1,7 @@
 ''' A base point spread function interface
 '''
+import warnings
+
 import numpy as np
 
 from scipy import interpolate
@@ -10,9 +12,12 @@ from mpl_toolkits.axes_grid1.axes_rgb import make_rgb_axes
 
 from prysm.conf import config
 from prysm.mathops import pi, fft2, ifft2, fftshift, ifftshift, floor
-from prysm.fttools import pad2d, forward_ft_unit
-from prysm.coordinates import uniform_cart_to_polar, resample_2d_complex
+from prysm.fttools import pad2d, forward_ft_unit, matrix_dft
+from prysm.coordinates import uniform_cart_to_polar
 from prysm.util import pupil_sample_to_psf_sample, correct_gamma, share_fig_ax
+from prysm.io import save_bundle, load_bundle, _check_bundle_type
+from prysm.diskcache import cached
+from prysm.colorimetry import prepare_illuminant_spectrum, spectrum_quadrature
 
 
 class PSF(object):
@@ -40,12 +45,16 @@ class PSF(object):
         conv: convolves this PSF with another.  Returns a new PSF object that is
             sampled at the same points as this PSF.
 
+        save: saves the PSF to disk in a form that can be memory mapped.
+
     Private Instance Methods:
         _renorm: renormalizes the PSF to unit peak intensity.
 
     Static Methods:
         from_pupil: given a pupil and a focal length, returns a PSF.
 
+        load: loads a PSF saved with save, memory mapping its data.
+
     Notes:
         Subclasses must implement an analyic_ft method with signature
             a_ft(unit_x, unit_y).
@@ -305,10 +314,26 @@ class PSF(object):
             self.data /= ttl
         return self
 
+    def save(self, path):
+        ''' Saves the PSF to a directory of .npy files with a JSON sidecar.
+
+        Args:
+            path (`string` or `pathlib.Path`): directory to write.
+
+        Returns:
+            `pathlib.Path`: path.
+
+        '''
+        meta = {
+            'type': 'PSF',
+            'sample_spacing': float(self.sample_spacing),
+        }
+        return save_bundle(path, {'data': self.data}, meta)
+
     # helpers ------------------------------------------------------------------
 
     @staticmethod
-    def from_pupil(pupil, efl, padding=1):
+    def from_pupil(pupil, efl, padding=1, sample_spacing=None, samples=None):
         ''' Uses scalar diffraction propogation to generate a PSF from a pupil.
 
         Args:
@@ -319,24 +344,166 @@ class PSF(object):
             padding (number): number of pupil widths to pad each side of the
                 pupil with during computation.
 
+            sample_spacing (float): if given, the PSF is computed with a matrix
+                DFT at this sample spacing, in microns, instead of a padded FFT.
+
+            samples (int or iterable): number of samples in the PSF computed
+                with a matrix DFT, (x, y) if iterable.  Defaults to the size
+                of the padded FFT.
+
         Returns:
             PSF.  A new PSF instance.
 
+        Notes:
+            The matrix DFT only computes the samples in the output window, so
+            a finely sampled PSF core costs a fraction of an equivalently
+            padded FFT.  The PSF is normalized to the peak within the window.
+
+            When config.cache_dir is set, PSFs are cached on disk keyed by the
+            complex pupil function, so amplitude masks are part of the key, and
+            the arguments.
+
+        '''
+        parts = ('PSF.from_pupil', pupil.fcn, pupil.wavelength, pupil.epd,
+                 efl, padding, sample_spacing, samples, np.dtype(config.precision).str)
+        return cached(parts,
+                      lambda: _psf_from_pupil(pupil, efl, padding, sample_spacing, samples),
+                      _load_cached)
+
+    @staticmethod
+    def load(path, mmap_mode='r'):
+        ''' Loads a PSF written by PSF.save.
+
+        Args:
+            path (`string` or `pathlib.Path`): directory to read.
+
+            mmap_mode (`string`): memory map mode for the data, see
+                io.load_bundle.  Defaults to a read-only map, which reads data
+                only as it is used.
+
+        Returns:
+            `PSF`: a new PSF instance.
+
+        '''
+        arrays, meta = load_bundle(path, mmap_mode)
+        _check_bundle_type(meta, 'PSF', path)
+        return PSF(arrays['data'], meta['sample_spacing'])
+
+
+def _psf_from_pupil(pupil, efl, padding=1, sample_spacing=None, samples=None):
+    ''' Computes the PSF of a pupil without consulting the disk cache; see
+        PSF.from_pupil.
+    '''
+    if sample_spacing is None:
+        psf, sample_spacing = _propagate_pupil(pupil, efl, padding)
+    else:
+        if samples is None:
+            samples = (pupil.samples * padding) * 2 + pupil.samples
+        psf = _propagate_pupil_mdft(pupil, efl, sample_spacing, samples)
+    return PSF(psf / np.max(psf), sample_spacing)
+
+
+def _load_cached(path):
+    ''' Loads a cached PSF into memory, so that eviction cannot pull the file
+        out from under it.
+    '''
+    return PSF.load(path, mmap_mode=None)
+
+
+class PSFStack(object):
+    ''' A stack of equally sampled PSFs, e.g. those of a :class:`PupilStack`.
+
+    Instance Methods:
+        none
+
+    Static Methods:
+        from_pupil: given a stack of pupils and a focal length, returns a PSFStack.
+
+    Notes:
+        data is an array of shape (N, samples_x, samples_y).  Indexing or
+            iterating the stack yields :class:`PSF` instances that share
+            memory with the stack.
+
+    '''
+    def __init__(self, data, sample_spacing):
+        ''' Creates a PSFStack object.
+
+        Args:
+            data (`numpy.ndarray`): intensity data for the PSFs, shape
+                (N, samples_x, samples_y).
+
+            sample_spacing (`float`): center-to-center spacing of samples,
+                expressed in microns.
+
+        Returns:
+            `PSFStack`: a new PSFStack instance.
+
         '''
-        # padded pupil contains 1 pupil width on each side for a width of 3
-        psf_samples = (pupil.samples * padding) * 2 + pupil.samples
-        sample_spacing = pupil_sample_to_psf_sample(pupil_sample=pupil.sample_spacing * 1000,
-                                                    num_samples=psf_samples,
-                                                    wavelength=pupil.wavelength,
-                                                    efl=efl)
-        padded_wavefront = pad2d(pupil.fcn, padding)
-        impulse_response = ifftshift(fft2(fftshift(padded_wavefront)))
-        psf = abs(impulse_response)**2
-        return PSF(psf / np.max(psf), sample_spacing)
+        self.data = data
+        self.sample_spacing = sample_spacing
+        self.samples_x, self.samples_y = data.shape[-2:]
+        self.center_x = self.samples_x // 2
+        self.center_y = self.samples_y // 2
+
+        # compute ordinate axis
+        ext_x = self.sample_spacing * self.samples_x / 2
+        ext_y = self.sample_spacing * self.samples_y / 2
+        self.unit_x = np.linspace(-ext_x, ext_x - sample_spacing,
+                                  self.samples_x, dtype=config.precision)
+        self.unit_y = np.linspace(-ext_y, ext_y - sample_spacing,
+                                  self.samples_y, dtype=config.precision)
+
+    def __len__(self):
+        return self.data.shape[0]
+
+    def __getitem__(self, idx):
+        if idx >= len(self) or idx < -len(self):
+            raise IndexError('PSF index out of range')
+
+        return PSF(self.data[idx], self.sample_spacing)
+
+    @staticmethod
+    def from_pupil(pupils, efl, padding=1, sample_spacing=None, samples=None):
+        ''' Uses scalar diffraction propogation to generate a PSF from each
+            pupil of a stack with one batched transform.
+
+        Args:
+            pupils (`PupilStack`): stack of pupils, with OPD data and wavefunctions.
+
+            efl (`float`): effective focal length of the optical system.
+
+            padding (`number`): number of pupil widths to pad each side of the
+                pupil with during computation.
+
+            sample_spacing (`float`): if given, the PSFs are computed with a
+                batched matrix DFT at this sample spacing, in microns.
+
+            samples (`int` or `iterable`): number of samples in the PSFs
+                computed with a matrix DFT, (x, y) if iterable.
+
+        Returns:
+            `PSFStack`: a new PSFStack instance, each PSF normalized to unit peak.
+
+        '''
+        if sample_spacing is None:
+            psfs, sample_spacing = _propagate_pupil(pupils, efl, padding)
+        else:
+            if samples is None:
+                samples = (pupils.samples * padding) * 2 + pupils.samples
+            psfs = _propagate_pupil_mdft(pupils, efl, sample_spacing, samples)
+        psfs /= psfs.max(axis=(-2, -1), keepdims=True)
+        return PSFStack(psfs, sample_spacing)
 
 
 class MultispectralPSF(PSF):
     ''' A PSF which includes multiple wavelength components.
+
+    Static Methods:
+        from_pupils: propagates pupils at several wavelengths directly to a
+            common grid and sums them.
+
+        from_spectrum: integrates the PSF over an illuminant spectrum with
+            adaptively chosen wavelengths.
     '''
     def __init__(self, psfs, weights=None):
         ''' Creates a new :class:`MultispectralPSF` instance.
@@ -354,35 +521,165 @@ class MultispectralPSF(PSF):
             weights = [1] * len(psfs)
 
         # find the most densely sampled PSF
-        min_spacing = 1e99
-        ref_idx = None
-        ref_unit_x = None
-        ref_unit_y = None
-        ref_samples_x = None
-        ref_samples_y = None
-        for idx, psf in enumerate(psfs):
-            if psf.sample_spacing < min_spacing:
-                min_spacing = psf.sample_spacing
-                ref_idx = idx
-                ref_unit_x = psf.unit_x
-                ref_unit_y = psf.unit_y
-                ref_samples_x = psf.samples_x
-                ref_samples_y = psf.samples_y
-
-        merge_data = np.zeros((ref_samples_x, ref_samples_y, len(psfs)))
+        ref_idx = min(range(len(psfs)), key=lambda idx: psfs[idx].sample_spacing)
+        ref = psfs[ref_idx]
+        xv, yv = np.meshgrid(ref.unit_x, ref.unit_y)
+
+        # accumulate the weighted sum in place, rather than stacking a cube
+        merge_data = np.zeros((ref.samples_x, ref.samples_y), dtype=config.precision)
         for idx, psf in enumerate(psfs):
             # don't do anything to our reference PSF
-            if idx is ref_idx:
-                merge_data[:, :, idx] = psf.data * weights[idx]
+            if idx == ref_idx:
+                merge_data += psf.data * weights[idx]
             else:
-                xv, yv = np.meshgrid(ref_unit_x, ref_unit_y)
                 interpf = interpolate.RegularGridInterpolator((psf.unit_x, psf.unit_y), psf.data)
-                merge_data[:, :, idx] = interpf((xv, yv), method='linear') * weights[idx]
+                merge_data += interpf((xv, yv), method='linear') * weights[idx]
 
         self.weights = weights
-        super().__init__(merge_data.sum(axis=2), min_spacing)
+        super().__init__(merge_data, ref.sample_spacing)
         self._renorm()
 
+    @staticmethod
+    def from_pupils(pupils, efl, weights=None, sample_spacing=None, samples=None, padding=1):
+        ''' Propagates pupils at several wavelengths to one PSF.  Each
+            wavelength is computed with a matrix DFT directly on the output
+            grid, so no PSF is interpolated.
+
+        Args:
+            pupils (`iterable`): pupils, one per wavelength.
+
+            efl (`float`): effective focal length of the optical system.
+
+            weights (`iterable`): weight of each pupil.  Defaults to equal weights.
+
+            sample_spacing (`float`): sample spacing of the PSF, in microns.
+                Defaults to that of a padded FFT of the shortest wavelength.
+
+            samples (`int` or `iterable`): number of samples in the PSF, (x, y)
+                if iterable.  Defaults to the size of a padded FFT.
+
+            padding (`number`): padding used for the default sampling.
+
+        Returns:
+            `MultispectralPSF`: a new MultispectralPSF, normalized to unit peak.
+
+        Notes:
+            the intensity of each wavelength is added into a single 2D
+                accumulator, so memory does not grow with the number of
+                wavelengths.
+
+        '''
+        pupils = list(pupils)
+        if weights is None:
+            weights = [1] * len(pupils)
+
+        ref = min(pupils, key=lambda pupil: pupil.wavelength)
+        psf_samples = (ref.samples * padding) * 2 + ref.samples
+        if sample_spacing is None:
+            sample_spacing = pupil_sample_to_psf_sample(pupil_sample=ref.sample_spacing * 1000,
+                                                        num_samples=psf_samples,
+                                                        wavelength=ref.wavelength,
+                                                        efl=efl)
+        if samples is None:
+            samples = psf_samples
+
+        data = None
+        for pupil, weight in zip(pupils, weights):
+            intensity = _propagate_pupil_mdft(pupil, efl, sample_spacing, samples)
+            intensity *= weight
+            if data is None:
+                data = intensity
+            else:
+                data += intensity
+
+        psf = MultispectralPSF.__new__(MultispectralPSF)
+        psf.weights = weights
+        PSF.__init__(psf, data.astype(config.precision, copy=False), sample_spacing)
+        return psf._renorm()
+
+    @staticmethod
+    def from_spectrum(pupil_fcn, efl, spectrum='D65', transmission=None, band=None,
+                      tol=1e-3, max_nodes=64, sample_spacing=None, samples=None, padding=1):
+        ''' Computes the PSF of a pupil integrated over a spectrum, choosing
+            the number of wavelengths adaptively.
+
+        Args:
+            pupil_fcn (`callable`): function of a wavelength in microns that
+                returns the pupil at that wavelength.
+
+            efl (`float`): effective focal length of the optical system.
+
+            spectrum (`dict` or `string`): spectrum with wvl and values keys,
+                wavelengths in nm, or the name of an illuminant understood by
+                colorimetry.prepare_illuminant_spectrum.
+
+            transmission (`dict` or `iterable`): spectra that multiply the
+                illuminant, e.g. filter transmission or detector QE.
+
+            band (`tuple`): (low, high) wavelengths in nm.  Defaults to the
+                range of spectrum.
+
+            tol (`float`): largest change in the peak-normalized PSF between
+                successive quadrature orders to accept.
+
+            max_nodes (`int`): largest number of wavelengths to use.
+
+            sample_spacing (`float`): sample spacing of the PSF, in microns.
+                Defaults to that of a padded FFT at the short end of the band.
+
+            samples (`int` or `iterable`): number of samples in the PSF.
+
+            padding (`number`): padding used for the default sampling.
+
+        Returns:
+            `MultispectralPSF`: a new MultispectralPSF, with the wavelengths
+                used in microns in its wavelengths attribute and the change
+                from the previous quadrature order in its error attribute.
+
+        Notes:
+            the spectrum is integrated with Gauss-Legendre rules of 2, 4, 8,
+                ... nodes until two successive rules agree to tol, see
+                colorimetry.spectrum_quadrature.  All rules share one output
+                grid, so they are directly comparable.  If max_nodes is reached
+                first, a warning is issued and the last rule is returned.
+
+        '''
+        if isinstance(spectrum, str):
+            spectrum = prepare_illuminant_spectrum(spectrum)
+        if band is None:
+            band = (spectrum['wvl'][0], spectrum['wvl'][-1])
+
+        if sample_spacing is None or samples is None:
+            ref = pupil_fcn(band[0] / 1e3)
+            psf_samples = (ref.samples * padding) * 2 + ref.samples
+            if sample_spacing is None:
+                sample_spacing = pupil_sample_to_psf_sample(pupil_sample=ref.sample_spacing * 1000,
+                                                            num_samples=psf_samples,
+                                                            wavelength=ref.wavelength,
+                                                            efl=efl)
+            if samples is None:
+                samples = psf_samples
+
+        prev, num_nodes, error = None, 2, np.inf
+        while True:
+            wvl, weights = spectrum_quadrature(spectrum, num_nodes, transmission, band)
+            pupils = (pupil_fcn(w) for w in wvl / 1e3)
+            psf = MultispectralPSF.from_pupils(pupils, efl, weights, sample_spacing, samples)
+            if prev is not None:
+                error = abs(psf.data - prev.data).max()
+                if error <= tol:
+                    break
+            if num_nodes * 2 > max_nodes:
+                warnings.warn(f'spectral integration did not converge to tol={tol} with '
+                              f'{num_nodes} wavelengths, the last change was {error}; '
+                              'raise max_nodes or tol.')
+                break
+            prev, num_nodes = psf, num_nodes * 2
+
+        psf.wavelengths = wvl / 1e3
+        psf.error = error
+        return psf
+
 
 class RGBPSF(object):
     ''' Trichromatic PSF, intended to show chromatic aberrations.
@@ -428,6 +725,10 @@ class RGBPSF(object):
         self.center_x = b_psf.center_x
         self.center_y = b_psf.center_y
 
+        # (digest of the channels, transfer function) for batched convolution,
+        # keyed by image shape and spacing
+        self._transfer_functions = {}
+
     def _renorm(self, to='peak'):
         ''' Renormalizes the PSF to unit peak intensity.
 
@@ -659,8 +960,8 @@ def _unequal_spacing_conv_core(psf1, psf2):
     Args:
         psf1 (prysm.PSF): PSF.  This one defines the sampling of the output.
 
-        psf2 (prysm.PSF): PSF.  This one will have its frequency response
-            truncated.
+        psf2 (prysm.PSF): PSF.  This one will be resampled onto the grid of
+            psf1.
 
     Returns:
         PSF: a new `PSF` that is the convolution of psf1 and psf2.
@@ -668,18 +969,156 @@ def _unequal_spacing_conv_core(psf1, psf2):
     '''
     # map psf1 into the fourier domain
     ft1 = fft2(fftshift(psf1.data))
-    unit1x = forward_ft_unit(psf1.sample_spacing, psf1.samples_x)
-    unit1y = forward_ft_unit(psf1.sample_spacing, psf1.samples_y)
-    # map psf2 into the fourier domain
-    ft2 = fft2(fftshift(psf2.data))
-    unit2x = forward_ft_unit(psf2.sample_spacing, psf2.samples_x)
-    unit2y = forward_ft_unit(psf2.sample_spacing, psf2.samples_y)
-    ft3 = ifftshift(resample_2d_complex(fftshift(ft2), (unit2y, unit2x), (unit1y, unit1x)))
+    ft3 = _resampled_transfer_function(psf2, psf1)
     psf3 = PSF(data=abs(ifftshift(ifft2(ft1 * ft3))),
                sample_spacing=psf1.sample_spacing)
     return psf3._renorm()
 
 
+def _resampled_transfer_function(psf, ref):
+    ''' Computes the transfer function of a PSF, resampled onto the frequency
+        grid of a reference PSF.
+
+    Args:
+        psf (prysm.PSF): PSF to transform.
+
+        ref (prysm.PSF): PSF whose sampling defines the frequency grid.
+
+    Returns:
+        numpy.ndarray: transfer function, in FFT (unshifted) order, with unit
+            DC gain.
+
+    Notes:
+        the transfer function is that of _resampled_kernel, so its kernel is
+            confined to the extent of the PSF.
+
+    '''
+    rows, cols = ref.data.shape
+    kernel = _fold_kernel(_resampled_kernel(psf, ref.sample_spacing), (rows, cols))
+    ky, kx = kernel.shape
+    full = np.zeros((rows, cols), dtype=kernel.dtype)
+    y0, x0 = rows // 2 - ky // 2, cols // 2 - kx // 2
+    full[y0:y0 + ky, x0:x0 + kx] = kernel
+    return fft2(ifftshift(full))
+
+
+def _resampled_kernel(psf, sample_spacing):
+    ''' Resamples a PSF onto a grid of another sample spacing by trigonometric
+        interpolation, keeping only the samples within the extent of the PSF.
+
+    Args:
+        psf (prysm.PSF): PSF to resample.
+
+        sample_spacing (`float`): spacing of the new grid, in microns.
+
+    Returns:
+        numpy.ndarray: kernel of odd shape, centered, with unit sum.
+
+    Notes:
+        the interpolation is a partial inverse DFT of the PSF's own spectrum
+            evaluated at the new sample positions, so no samples exist outside
+            the PSF and there is no resampling halo.
+
+    '''
+    data = psf.data
+    ft = fftshift(fft2(ifftshift(data)))
+    mats = []
+    for n in data.shape:
+        half = int(((n - 1) // 2) * psf.sample_spacing / sample_spacing)
+        x = np.arange(-half, half + 1) * sample_spacing
+        f = forward_ft_unit(psf.sample_spacing, n) / 1e3
+        mats.append(np.exp(2j * pi * np.outer(x, f)) / n)
+
+    ey, ex = mats
+    kernel = (ey @ ft @ ex.T).real.astype(config.precision, copy=False)
+    return kernel / kernel.sum()
+
+
+def _fold_kernel(kernel, shape):
+    ''' Wraps a centered kernel larger than shape onto a periodic grid of that
+        shape, as a circular convolution of that size sees it.
+
+    Args:
+        kernel (`numpy.ndarray`): centered kernel.
+
+        shape (`tuple`): (rows, cols) of the periodic grid.
+
+    Returns:
+        numpy.ndarray: centered kernel no larger than shape.
+
+    '''
+    ky, kx = kernel.shape
+    rows, cols = min(ky, shape[0]), min(kx, shape[1])
+    if (rows, cols) == (ky, kx):
+        return kernel
+
+    iy = (np.arange(ky) - ky // 2 + rows // 2) % rows
+    ix = (np.arange(kx) - kx // 2 + cols // 2) % cols
+    out = np.zeros((rows, cols), dtype=kernel.dtype)
+    np.add.at(out, (iy[:, np.newaxis], ix[np.newaxis, :]), kernel)
+    return out
+
+
+def _propagate_pupil(pupil, efl, padding):
+    ''' Propagates the wavefunction(s) of a pupil or pupil stack to the PSF
+        plane with an FFT over the last two axes.
+
+    Args:
+        pupil (`Pupil` or `PupilStack`): pupil(s) to propagate.
+
+        efl (`float`): effective focal length of the optical system.
+
+        padding (`number`): number of pupil widths to pad each side of the
+            pupil with during computation.
+
+    Returns:
+        `tuple` containing:
+
+            `numpy.ndarray`: unnormalized intensity, same leading shape as pupil.fcn.
+
+            `float`: sample spacing of the PSF, in microns.
+
+    '''
+    # padded pupil contains 1 pupil width on each side for a width of 3
+    psf_samples = (pupil.samples * padding) * 2 + pupil.samples
+    sample_spacing = pupil_sample_to_psf_sample(pupil_sample=pupil.sample_spacing * 1000,
+                                                num_samples=psf_samples,
+                                                wavelength=pupil.wavelength,
+                                                efl=efl)
+    padded_wavefront = pad2d(pupil.fcn, padding)
+    impulse_response = ifftshift(fft2(fftshift(padded_wavefront, axes=(-2, -1))), axes=(-2, -1))
+    return impulse_response.real ** 2 + impulse_response.imag ** 2, sample_spacing
+
+
+def _propagate_pupil_mdft(pupil, efl, sample_spacing, samples):
+    ''' Propagates the wavefunction(s) of a pupil or pupil stack to the PSF
+        plane with a matrix DFT, computing only the requested window of the PSF.
+
+    Args:
+        pupil (`Pupil` or `PupilStack`): pupil(s) to propagate.
+
+        efl (`float`): effective focal length of the optical system.
+
+        sample_spacing (`float`): sample spacing of the PSF, in microns.
+
+        samples (`int` or `iterable`): number of samples in the PSF, (x, y) if
+            iterable.
+
+    Returns:
+        `numpy.ndarray`: unnormalized intensity, same leading shape as pupil.fcn.
+
+    '''
+    # alpha is the PSF sample spacing in units of the pupil's fundamental
+    # frequency; a padded FFT of Q pupil widths is alpha = 1 / Q
+    pupil_sample = pupil.sample_spacing * 1000
+    alpha = sample_spacing / pupil_sample_to_psf_sample(pupil_sample=pupil_sample,
+                                                        num_samples=pupil.samples,
+                                                        wavelength=pupil.wavelength,
+                                                        efl=efl)
+    impulse_response = matrix_dft(pupil.fcn, alpha, samples)
+    return impulse_response.real ** 2 + impulse_response.imag ** 2
+
+
 def airydisk(unit_r, fno, wavelength):
     ''' Computes the airy disk function over a given spatial distance.
 
@@ -4,15 +4,18 @@ from copy import deepcopy
 
 from numpy import (
     empty, zeros,
-    linspace, meshgrid,
+    linspace,
     isfinite,
+    nanmax, nanmin, nanmean,
+    generic,
 )
 
 from matplotlib import pyplot as plt
 
 from prysm.conf import config
 from prysm.util import share_fig_ax, rms
-from prysm.coordinates import cart_to_polar
+from prysm.coordinates import make_rho_phi_grid
+from prysm.io import save_bundle, load_bundle, _check_bundle_type
 from prysm.units import (
     waves_to_microns, waves_to_nanometers,
     microns_to_waves, nanometers_to_waves,
@@ -20,7 +23,8 @@ from prysm.units import (
 from prysm.mathops import (
     nan, pi,
     exp,
-    sin
+    sin,
+    sqrt,
 )
 
 
@@ -36,8 +40,15 @@ class Pupil(object):
 
         pv: Peak-To-Valley wavefront error.
 
+        pv_estimate: Peak-To-Valley wavefront error, estimated from the
+            coefficients where possible.
+
         rms: Root Mean Square wavefront error.
 
+        Subclasses described by coefficients compute rms and pv_estimate from
+        them without the phase array until the phase is assigned or modified
+        by e.g. mask, clip, or merge.
+
     Instance Methods:
         plot2d: Makes a 2D plot of the phase of the pupil.  Returns (fig, ax).
 
@@ -53,19 +64,30 @@ class Pupil(object):
         merge: Merges this pupil with another, combining their OPD.  The two
             must be equally sampled.
 
+        save: Saves the pupil to disk in a form that can be memory mapped.
+
     Private Instance Methods:
         _gengrid: generates the (x,y) and (rho,phi).
 
         _correct_phase_units: converts opd expressed in a given unit to waves.
 
     Static Methods:
-        none
+        load: Loads a pupil saved with save, memory mapping its arrays.
 
     Notes:
         subclasses should implement a build() method and their own way of
             expressing OPD.
 
     '''
+    # subclasses which can compute rms and pv from their coefficients set this
+    # after building, and implement _analytic_rms and _analytic_pv.  Assigning
+    # the phase, or anything else that changes it, clears it.
+    _analytic_stats = False
+
+    # attributes besides the arrays and sampling that save writes to the
+    # metadata, so that load can restore the subclass
+    _saved_attrs = ()
+
     def __init__(self, samples=128, epd=1.0, wavelength=0.55, opd_unit=r'$\lambda$'):
         ''' Creates a new Pupil instance.
 
@@ -93,18 +115,7 @@ class Pupil(object):
         self.sample_spacing = self.unit[-1] - self.unit[-2]
         self.rho = self.phi = empty((samples, samples), dtype=config.precision)
         self.center = samples // 2
-
-        if opd_unit.lower() in ('$\lambda$', 'waves'):
-            self._opd_unit = 'waves'
-            self._opd_str = '$\lambda$'
-        elif opd_unit.lower() in ('$\mu m$', 'microns', 'micrometers', 'um'):
-            self._opd_unit = 'microns'
-            self._opd_str = '$\mu m$'
-        elif opd_unit.lower() in ('nm', 'nanometers'):
-            self._opd_unit = 'nanometers'
-            self._opd_str = 'nm'
-        else:
-            raise ValueError('OPD must be expressed in waves, microns, or nm')
+        self._opd_unit, self._opd_str = parse_opd_unit(opd_unit)
 
         self.build()
         self.clip()
@@ -123,17 +134,44 @@ class Pupil(object):
         '''
         return self.unit, self.phase[:, self.center]
 
+    @property
+    def phase(self):
+        ''' Phase of the pupil.  Assigning it, including by in-place
+            arithmetic such as +=, falls back to numeric rms and pv_estimate.
+        '''
+        return self._phase
+
+    @phase.setter
+    def phase(self, phase):
+        self._analytic_stats = False
+        self._phase = phase
+
     @property
     def pv(self):
-        ''' Returns the peak-to-valley wavefront error
+        ''' Returns the peak-to-valley wavefront error over the sampled phase
         '''
         non_nan = isfinite(self.phase)
         return convert_phase((self.phase[non_nan].max() - self.phase[non_nan].min()), self)
 
+    @property
+    def pv_estimate(self):
+        ''' Estimates the peak-to-valley wavefront error from the coefficients,
+            on a 65 x 128 polar sampling of the unit disk, without touching the
+            phase grid.  Differs slightly from pv, which is exact for the
+            sampled phase; equal to pv for pupils without coefficients.
+        '''
+        if self._analytic_stats:
+            return self._analytic_pv()
+
+        return self.pv
+
     @property
     def rms(self):
         ''' Returns the RMS wavefront error in the given OPD units
         '''
+        if self._analytic_stats:
+            return self._analytic_rms()
+
         return convert_phase(rms(self.phase), self)
 
     # quick-access slices, properties ------------------------------------------
@@ -247,7 +285,7 @@ class Pupil(object):
     def _phase_to_wavefunction(self):
         ''' Computes the wavefunction from the phase
         '''
-        self.fcn = exp(1j * 2 * pi / self.wavelength * self.phase)
+        self.fcn = exp(1j * 2 * pi / self.wavelength * self.phase).astype(config.precision_complex, copy=False)
         return self
 
     def clip(self, normalized_radius=1):
@@ -264,6 +302,9 @@ class Pupil(object):
                 `numpy.ndarray`: complex representation of the pupil.
 
         '''
+        if normalized_radius < 1:
+            self._analytic_stats = False
+
         self.phase[self.rho > normalized_radius] = nan
         self.fcn[self.rho > normalized_radius] = 0
         return self.phase, self.fcn
@@ -280,6 +321,7 @@ class Pupil(object):
             Pupil: self, the pupil instance.
 
         '''
+        self._analytic_stats = False
         self.phase *= mask
         self.fcn *= mask
         return self
@@ -300,10 +342,71 @@ class Pupil(object):
         ''' Creates a copy of this pupil.
         '''
         props = deepcopy(self.__dict__)
+        props['_analytic_stats'] = False
         retpupil = Pupil()
         retpupil.__dict__ = props
         return retpupil
 
+    def save(self, path):
+        ''' Saves the pupil to a directory of .npy files with a JSON sidecar.
+
+        Args:
+            path (`string` or `pathlib.Path`): directory to write.
+
+        Returns:
+            `pathlib.Path`: path.
+
+        '''
+        meta = {
+            'type': 'Pupil',
+            'samples': int(self.samples),
+            'epd': float(self.epd),
+            'wavelength': float(self.wavelength),
+            'opd_unit': self.opd_unit,
+            'class': type(self).__name__,
+            'attrs': {name: _to_json(getattr(self, name)) for name in self._saved_attrs},
+            'analytic_stats': bool(self._analytic_stats),
+        }
+        return save_bundle(path, {'phase': self.phase, 'fcn': self.fcn}, meta)
+
+    @staticmethod
+    def load(path, mmap_mode='r'):
+        ''' Loads a pupil written by Pupil.save.
+
+        Args:
+            path (`string` or `pathlib.Path`): directory to read.
+
+            mmap_mode (`string`): memory map mode for the phase and wavefunction,
+                see io.load_bundle.  Defaults to a read-only map, which reads
+                data only as it is used.
+
+        Returns:
+            `Pupil`: a new instance of the class that was saved, e.g. a
+                FringeZernike with its coefficients.
+
+        '''
+        arrays, meta = load_bundle(path, mmap_mode)
+        _check_bundle_type(meta, 'Pupil', path)
+
+        # the pupil is restored from its saved phase, not rebuilt
+        cls = _pupil_classes().get(meta.get('class'), Pupil)
+        pupil = cls.__new__(cls)
+        for name, value in meta.get('attrs', {}).items():
+            setattr(pupil, name, value)
+        pupil.samples = meta['samples']
+        pupil.epd = meta['epd']
+        pupil.wavelength = meta['wavelength']
+        pupil.opd_unit = meta['opd_unit']
+        pupil.unit = linspace(-pupil.epd / 2, pupil.epd / 2, pupil.samples, dtype=config.precision)
+        pupil.sample_spacing = pupil.unit[-1] - pupil.unit[-2]
+        pupil.center = pupil.samples // 2
+        pupil._opd_unit, pupil._opd_str = parse_opd_unit(pupil.opd_unit)
+        pupil._gengrid()
+        pupil.phase = arrays['phase']
+        pupil.fcn = arrays['fcn']
+        pupil._analytic_stats = cls is not Pupil and meta.get('analytic_stats', False)
+        return pupil
+
     def _gengrid(self):
         ''' Generates a uniform (x,y) grid and maps it to (rho,phi) coordinates
             for radial polynomials.
@@ -312,10 +415,11 @@ class Pupil(object):
                 angle is done via cart_to_polar(yv, xv) which yields angles
                 w.r.t. the y axis.  This is the convention of optics and not a
                 typo.
+
+                The grid is shared between pupils of equal sampling and is
+                read-only.
         '''
-        x = y = linspace(-1, 1, self.samples, dtype=config.precision)
-        xv, yv = meshgrid(x, y)
-        self.rho, self.phi = cart_to_polar(yv, xv)
+        self.rho, self.phi = make_rho_phi_grid(self.samples, config.precision)
         return self.rho, self.phi
 
     def _correct_phase_units(self):
@@ -389,6 +493,163 @@ class Pupil(object):
     # meat 'n potatoes ---------------------------------------------------------
 
 
+class PupilStack(object):
+    ''' A stack of pupils of an optical system which share one sampling grid,
+        e.g. the realizations of a Monte Carlo tolerance analysis.
+
+    Properties:
+        pv: Peak-To-Valley wavefront error of each pupil.
+
+        rms: Root Mean Square wavefront error of each pupil.
+
+    Instance Methods:
+        clip: Clips the pupils to a circular boundary.
+
+    Notes:
+        phase and fcn are arrays of shape (N, samples, samples).  Indexing or
+            iterating the stack yields :class:`Pupil` instances that share
+            memory with the stack.
+
+        subclasses compute the phase stack from their own way of expressing
+            OPD and pass it to this class' constructor.
+
+    '''
+    def __init__(self, phase, epd=1.0, wavelength=0.55, opd_unit=r'$\lambda$'):
+        ''' Creates a new PupilStack instance.
+
+        Args:
+            phase (`numpy.ndarray`): array of shape (N, samples, samples)
+                containing the OPD of each pupil.
+
+            epd: (`float`): diameter of the pupils, in mm.
+
+            wavelength (`float`): wavelength of light, in um.
+
+            opd_unit (`string`): unit OPD is expressed in.  One of:
+                ($\lambda$, waves, $\mu m$, microns, um, nm , nanometers).
+
+        Returns:
+            `PupilStack`: a new PupilStack instance.
+
+        '''
+        samples = phase.shape[-1]
+        self.samples = samples
+        self.epd = epd
+        self.wavelength = wavelength
+        self.opd_unit = opd_unit
+        self.unit = linspace(-epd / 2, epd / 2, samples, dtype=config.precision)
+        self.sample_spacing = self.unit[-1] - self.unit[-2]
+        self.center = samples // 2
+        self._opd_unit, self._opd_str = parse_opd_unit(opd_unit)
+        self.rho, self.phi = make_rho_phi_grid(samples, config.precision)
+
+        # the stack borrows the pupil's unit handling; both only touch phase
+        self.phase = phase
+        Pupil._correct_phase_units(self)
+        Pupil._phase_to_wavefunction(self)
+        self.clip()
+
+    @property
+    def pv(self):
+        ''' Returns the peak-to-valley wavefront error of each pupil
+        '''
+        pv = nanmax(self.phase, axis=(1, 2)) - nanmin(self.phase, axis=(1, 2))
+        return convert_phase(pv, self)
+
+    @property
+    def rms(self):
+        ''' Returns the RMS wavefront error of each pupil in the given OPD units
+        '''
+        return convert_phase(sqrt(nanmean(self.phase ** 2, axis=(1, 2))), self)
+
+    def clip(self, normalized_radius=1):
+        ''' Clips outside the circular boundary of the pupils.
+
+        Args:
+            normalized_radius (`float`): normalized_radius to clip at.
+
+        Returns:
+            `tuple` containing:
+
+                `numpy.ndarray`: phase of the pupils.
+
+                `numpy.ndarray`: complex representation of the pupils.
+
+        '''
+        outside = self.rho > normalized_radius
+        self.phase[:, outside] = nan
+        self.fcn[:, outside] = 0
+        return self.phase, self.fcn
+
+    def __len__(self):
+        return self.phase.shape[0]
+
+    def __getitem__(self, idx):
+        ''' Retrieves a single pupil from the stack.
+
+        Args:
+            idx (`int`): index of the pupil.
+
+        Returns:
+            `Pupil`: pupil whose phase and fcn are views into the stack.
+
+        '''
+        if idx >= len(self) or idx < -len(self):
+            raise IndexError('pupil index out of range')
+
+        pupil = Pupil.__new__(Pupil)
+        pupil.__dict__.update(self.__dict__)
+        pupil.phase = self.phase[idx]
+        pupil.fcn = self.fcn[idx]
+        return pupil
+
+
+def _pupil_classes():
+    ''' Maps the name of Pupil and each of its subclasses to the class.
+    '''
+    classes, todo = {}, [Pupil]
+    while todo:
+        cls = todo.pop()
+        classes[cls.__name__] = cls
+        todo.extend(cls.__subclasses__())
+    return classes
+
+
+def _to_json(value):
+    ''' Converts lists, tuples, and numpy scalars to JSON serializable types.
+    '''
+    if isinstance(value, (list, tuple)):
+        return [_to_json(v) for v in value]
+    elif isinstance(value, generic):
+        return value.item()
+    return value
+
+
+def parse_opd_unit(opd_unit):
+    ''' Parses a string describing a unit of OPD.
+
+    Args:
+        opd_unit (`string`): unit OPD is expressed in.  One of:
+            ($\lambda$, waves, $\mu m$, microns, um, nm , nanometers).
+
+    Returns:
+        `tuple` containing:
+
+            `string`: canonical name of the unit.
+
+            `string`: label used for the unit in plots.
+
+    '''
+    if opd_unit.lower() in ('$\lambda$', 'waves'):
+        return 'waves', '$\lambda$'
+    elif opd_unit.lower() in ('$\mu m$', 'microns', 'micrometers', 'um'):
+        return 'microns', '$\mu m$'
+    elif opd_unit.lower() in ('nm', 'nanometers'):
+        return 'nanometers', 'nm'
+    else:
+        raise ValueError('OPD must be expressed in waves, microns, or nm')
+
+
 def convert_phase(array, pupil):
     '''Converts an OPD/phase map to have the same unit of expression as a pupil
 
@@ -1,13 +1,15 @@
 ''' A repository of seidel aberration descriptions used to model pupils of
 optical systems.
 '''
+from math import factorial
 from functools import lru_cache
 
 import numpy as np
 
 from prysm.conf import config
 from prysm.pupil import Pupil
-from prysm.mathops import cos
+from prysm.mathops import cos, jit, numba_installed
+from prysm.coordinates import make_rho_phi_grid, make_polar_sample_grid
 
 
 class Seidel(Pupil):
@@ -29,6 +31,8 @@ class Seidel(Pupil):
 
     '''
 
+    _saved_attrs = ('eqns', 'powers', 'coefs', 'field')
+
     def __init__(self, *args, **kwargs):
         '''Initializes a new :class:`Seidel` :class:`Pupil`
 
@@ -51,6 +55,7 @@ class Seidel(Pupil):
         '''
 
         self.eqns = []
+        self.powers = []
         self.coefs = []
         pass_args = {}
         self.field = 1
@@ -58,6 +63,7 @@ class Seidel(Pupil):
             for key, value in kwargs.items():
                 if key[0].lower() == 'w' and len(key) == 4:
                     self.eqns.append(wexpr_to_opd_expr(key))
+                    self.powers.append(wexpr_to_powers(key))
                     self.coefs.append(value)
                 elif key.lower() in ('field', 'relative_field', 'h'):
                     self.field = value
@@ -80,21 +86,20 @@ class Seidel(Pupil):
                 :class:`~numpy.ndarray` wavefunction for the pupil
 
         '''
-        mathexprs = ['np.zeros((self.samples, self.samples))']
-        for term, coef in zip(self.eqns, self.coefs):
-            mathexprs.append(str(coef) + '*(' + term + ')')
-
-        # pull the field point into the namespace our expression wants
-        self._gengrid()
-        H = self.field
-        rho, phi = self.rho, self.phi
-
         # compute the pupil phase and wave function
-        self.phase = eval('+'.join(mathexprs)).astype(config.precision)
+        self._gengrid()
+        self.phase = seidel_phase(self.powers, self.coefs, self.rho, self.phi, self.field)
         self._correct_phase_units()
         self._phase_to_wavefunction()
+        self._analytic_stats = True
         return self.phase, self.fcn
 
+    def _analytic_rms(self):
+        return seidel_rms(self.powers, self.coefs, self.field)
+
+    def _analytic_pv(self):
+        return seidel_pv(self.powers, self.coefs, self.field)
+
     def __repr__(self):
         return str(self.__dict__)
 
@@ -116,3 +121,214 @@ def wexpr_to_opd_expr(Wxxx):
     H, rho, phi = _[0], _[1], _[2]
     # .format converts to bytecode, f-strings do not.  Micro-optimization here
     return 'H**{0} * rho**{1} * cos(phi)**{2}'.format(H, rho, phi)
+
+
+@lru_cache()
+def wexpr_to_powers(Wxxx):
+    '''Converts a W notation to the powers of H, rho, and cos(phi) of the term.
+
+    Args:
+        Wxxx (`string`): A string of the form "W000," "W131", etc.
+
+    Returns:
+        `tuple`: (H, rho, cos(phi)) powers as integers.
+
+    '''
+    return tuple(int(power) for power in Wxxx[1:])
+
+
+def seidel_phase(powers, coefs, rho, phi, H=1):
+    '''Computes the phase of a set of Seidel terms without parsing or
+        evaluating expressions.
+
+    Args:
+        powers (`iterable`): (H, rho, cos(phi)) powers of each term.
+
+        coefs (`iterable`): coefficient of each term.
+
+        rho (`numpy.ndarray`): radial coordinate of the pupil grid.
+
+        phi (`numpy.ndarray`): azimuthal coordinate of the pupil grid.
+
+        H (`float` or `numpy.ndarray`): relative field point, or 1D array of
+            field points to compute a stack of phases for.
+
+    Returns:
+        `numpy.ndarray`: phase of shape rho.shape, or (len(H), \*rho.shape)
+            if H is an array.
+
+    Notes:
+        terms which share powers of rho and cos(phi) are merged, each needed
+        power is computed once by repeated multiplication, and terms are
+        accumulated in place.  If numba is installed, a single field is
+        evaluated by a compiled kernel in one pass over the grid.
+
+    '''
+    H = np.asarray(H, dtype=rho.dtype)
+    weights = _merge_field_dependence(powers, coefs, H)
+
+    out = np.zeros(H.shape + rho.shape, dtype=rho.dtype)
+    if not weights:
+        return out
+
+    if numba_installed and H.ndim == 0:
+        rpow, ppow = (np.asarray(pows, dtype=np.int64) for pows in zip(*weights.keys()))
+        w = np.asarray(list(weights.values()), dtype=rho.dtype)
+        _seidel_kernel(rho, cos(phi), rpow, ppow, w, out)
+        return out
+
+    rho_pows = _incremental_powers(rho, {r for r, _ in weights})
+    cos_pows = _incremental_powers(cos(phi), {p for _, p in weights})
+    term = np.empty_like(rho)
+    for (r, p), w in weights.items():
+        np.multiply(rho_pows[r], cos_pows[p], out=term)
+        if H.ndim == 0:
+            term *= w
+            out += term
+        else:
+            for field_out, field_w in zip(out, w):
+                field_out += field_w * term
+    return out
+
+
+def _merge_field_dependence(powers, coefs, H):
+    '''Merges the field dependence of Seidel terms into one weight per
+        (rho, cos(phi)) power pair.
+    '''
+    weights = {}
+    for (h, r, p), coef in zip(powers, coefs):
+        weights[(r, p)] = weights.get((r, p), 0) + coef * H ** h
+    return weights
+
+
+def seidel_rms(powers, coefs, H=1):
+    '''Computes the RMS over the unit disk of a set of Seidel terms from
+        their coefficients, without evaluating them on a grid.
+
+    Args:
+        powers (`iterable`): (H, rho, cos(phi)) powers of each term.
+
+        coefs (`iterable`): coefficient of each term.
+
+        H (`float`): relative field point.
+
+    Returns:
+        `float`: RMS of the phase, including its mean.
+
+    Notes:
+        the mean square is the sum over pairs of terms of the products of
+        their weights and the disk average of rho^(a+b) cos(phi)^(c+d),
+        which is known in closed form.
+
+    '''
+    weights = list(_merge_field_dependence(powers, coefs, H).items())
+    total = 0
+    for (r1, p1), w1 in weights:
+        for (r2, p2), w2 in weights:
+            total += w1 * w2 * _disk_mean(r1 + r2, p1 + p2)
+    return float(np.sqrt(max(total, 0)))
+
+
+def seidel_rms_defocus(powers, coefs, H=1):
+    '''Computes the change in W020 which minimizes the RMS of a set of Seidel
+        terms over the unit disk.
+
+    Args:
+        powers (`iterable`): (H, rho, cos(phi)) powers of each term.
+
+        coefs (`iterable`): coefficient of each term.
+
+        H (`float`): relative field point.
+
+    Returns:
+        `float`: W020 to add to the terms.
+
+    Notes:
+        the phase is linear in W020, so the optimum is -<W rho^2> / <rho^4>
+        with <> the average over the disk.
+
+    '''
+    weights = _merge_field_dependence(powers, coefs, H)
+    overlap = sum(w * _disk_mean(r + 2, p) for (r, p), w in weights.items())
+    return float(-overlap / _disk_mean(4, 0))
+
+
+def _disk_mean(r, p):
+    '''Average of rho^r cos(phi)^p over the unit disk.
+    '''
+    if p % 2:
+        return 0
+    # (1/pi) * int rho^(r+1) drho * int cos^p dphi
+    return 2 / (r + 2) * factorial(p) / (2 ** p * factorial(p // 2) ** 2)
+
+
+def seidel_pv(powers, coefs, H=1):
+    '''Estimates the peak-to-valley over the unit disk of a set of Seidel
+        terms on a sparse polar sampling, without building a pupil grid.
+
+    Args:
+        powers (`iterable`): (H, rho, cos(phi)) powers of each term.
+
+        coefs (`iterable`): coefficient of each term.
+
+        H (`float`): relative field point.
+
+    Returns:
+        `float`: PV of the phase.
+
+    '''
+    rho, phi = make_polar_sample_grid()
+    values = seidel_phase(powers, coefs, rho, phi, H)
+    return float(values.max() - values.min())
+
+
+def _incremental_powers(base, powers):
+    '''Computes the requested integer powers of an array by repeated
+        multiplication, keeping only those requested.
+    '''
+    out = {}
+    if 0 in powers:
+        out[0] = np.ones_like(base)
+    current = base
+    for power in range(1, max(powers) + 1):
+        if power > 1:
+            current = current * base
+        if power in powers:
+            out[power] = current
+    return out
+
+
+@jit(nopython=True, cache=True)
+def _seidel_kernel(rho, cosphi, rpow, ppow, weights, out):
+    '''Accumulates weighted rho**r * cos(phi)**p terms into out in one pass.
+    '''
+    for i in range(rho.shape[0]):
+        for j in range(rho.shape[1]):
+            r = rho[i, j]
+            c = cosphi[i, j]
+            acc = 0.0
+            for k in range(weights.shape[0]):
+                acc += weights[k] * r ** rpow[k] * c ** ppow[k]
+            out[i, j] = acc
+
+
+def seidel_phase_stack(aberrations, fields, samples):
+    '''Computes the phase of a set of Seidel aberrations at many field points
+        in one vectorized evaluation.
+
+    Args:
+        aberrations (`dict`): W coefficients, e.g. {'W040': 1, 'W131': 0.5}.
+
+        fields (`iterable`): relative field points, H.
+
+        samples (`int`): number of samples across the pupil diameter.
+
+    Returns:
+        `numpy.ndarray`: array of shape (len(fields), samples, samples), the
+            unclipped phase at each field point.
+
+    '''
+    rho, phi = make_rho_phi_grid(samples, config.precision)
+    powers = [wexpr_to_powers(key) for key in aberrations]
+    fields = np.atleast_1d(np.asarray(fields, dtype=config.precision))
+    return seidel_phase(powers, list(aberrations.values()), rho, phi, fields)
@@ -7,12 +7,19 @@ from prysm.conf import config
 from prysm.mathops import (
     jit,
     vectorize,
-    atan2,
     cos,
     sin,
-    sqrt,
 )
-from prysm.pupil import Pupil
+from prysm.pupil import Pupil, PupilStack
+from prysm.zerntools import (
+    basis_stack,
+    contract_basis,
+    zernike_stack,
+    zernike_rms,
+    zernike_pv,
+    ZernikeFitter,
+    standard_to_nm,
+)
 
 _names = (
     'Z0  - Piston / Bias',
@@ -168,7 +175,7 @@ def Z19(rho, phi):
 
 @vectorize
 def Z20(rho, phi):
-    return rho**5 * cos(5 * phi)
+    return rho**5 * sin(5 * phi)
 
 
 @vectorize
@@ -208,7 +215,7 @@ def Z27(rho, phi):
 
 @vectorize
 def Z28(rho, phi):
-    return rho**6 * cos(7 * phi)
+    return rho**7 * cos(7 * phi)
 
 
 @vectorize
@@ -268,12 +275,12 @@ def Z39(rho, phi):
 
 @vectorize
 def Z40(rho, phi):
-    return 70 * rho**8 - 140 * rho**7 + 90 * rho**4 - 20 * rho**2 + 1
+    return 70 * rho**8 - 140 * rho**6 + 90 * rho**4 - 20 * rho**2 + 1
 
 
 @vectorize
 def Z41(rho, phi):
-    return (56 * rho**8 - 105 * rho**6 + 60 * rho**4 - 10 * rho**2) * cos(2 * phi)
+    return (56 * rho**8 - 105 * rho**6 + 60 * rho**4 - 10 * rho**2) * sin(2 * phi)
 
 
 @vectorize
@@ -358,10 +365,11 @@ zernfcns = {
 }
 
 
-def zernwrapper(term, rho, phi):
-    ''' Wraps the Z0..Z48 functions.
+def zernwrapper(term, rho, phi, rms_norm=False):
+    ''' Evaluates a single standard zernike term of any order, optionally
+        normalized to unit RMS.
     '''
-    return zernfcns[term](rho, phi)
+    return zernike_stack([standard_to_nm(term)], rho, phi, rms_norm)[0]
 
 
 class StandardZernike(Pupil):
@@ -382,6 +390,8 @@ class StandardZernike(Pupil):
         none
 
     '''
+    _saved_attrs = ('coefs', 'normalize', 'base')
+
     def __init__(self, *args, **kwargs):
         ''' Creates a StandardZernike Pupil object.
 
@@ -398,7 +408,10 @@ class StandardZernike(Pupil):
             base (`int`): 0 or 1, adjusts the base index of the polynomial
                 expansion.
 
-            Zx (float): xth standard zernike coefficient, in range [0,47], 0-base.
+            Zx (float): xth standard zernike coefficient, 0-base or 1-base.
+                Terms of any order are supported.
+
+            rms_norm (`bool`): if true, coefficients have unit rms value.
 
         Returns:
             StandardZernike.  A new :class:`StandardZernike` pupil instance.
@@ -426,6 +439,7 @@ class StandardZernike(Pupil):
         else:
             self.coefs = [0] * len(zernfcns)
 
+        self.normalize = False
         pass_args = {}
 
         self.base = config.zernike_base
@@ -441,8 +455,12 @@ class StandardZernike(Pupil):
         if kwargs is not None:
             for key, value in kwargs.items():
                 if key[0].lower() == 'z':
-                    idx = int(key[1:])  # strip 'Z' from index
-                    self.coefs[idx - self.base] = value
+                    idx = int(key[1:]) - self.base  # strip 'Z' from index
+                    if idx >= len(self.coefs):
+                        self.coefs.extend([0] * (idx + 1 - len(self.coefs)))
+                    self.coefs[idx] = value
+                elif key == 'rms_norm':
+                    self.normalize = bool(value)
                 elif key.lower() == 'base':
                     self.base = value
                 else:
@@ -454,26 +472,36 @@ class StandardZernike(Pupil):
         # construct an equation for the phase of the pupil
         # build a coordinate system over which to evaluate this function
         self._gengrid()
-        self.phase = np.zeros((self.samples, self.samples), dtype=config.precision)
-        for term, coef in enumerate(self.coefs):
-            # short circuit for speed
-            if coef == 0:
-                continue
-            self.phase += coef * zernwrapper(term=term,
-                                             rho=self.rho,
-                                             phi=self.phi)
+
+        # short circuit zero terms for speed, the rest come from the cache
+        terms = [term for term, coef in enumerate(self.coefs) if coef != 0]
+        if terms:
+            stack = basis_stack('standard', terms, self.samples, self.normalize)
+            self.phase = contract_basis([self.coefs[term] for term in terms], stack)
+        else:
+            self.phase = np.zeros((self.samples, self.samples), dtype=config.precision)
 
         self._correct_phase_units()
         self._phase_to_wavefunction()
+        self._analytic_stats = True
         return self.phase, self.fcn
 
+    def _analytic_rms(self):
+        return zernike_rms('standard', self.coefs, self.normalize)
+
+    def _analytic_pv(self):
+        return zernike_pv('standard', self.coefs, self.normalize)
+
     def __repr__(self):
         '''Pretty-print pupil description
         '''
-        header = 'Standard Zernike description with:\n\t'
+        if self.normalize is True:
+            header = 'rms normalized Standard Zernike description with:\n\t'
+        else:
+            header = 'Standard Zernike description with:\n\t'
 
         strs = []
-        for number, (coef, name) in enumerate(zip(self.coefs, _names)):
+        for number, coef in enumerate(self.coefs):
             # skip 0 terms
             if coef == 0:
                 continue
@@ -486,7 +514,11 @@ class StandardZernike(Pupil):
                 _ = f'{coef:.3f}'
 
             # adjust term numbers
-            if self.base is 1:
+            if number >= len(_names):
+                n, m = standard_to_nm(number)
+                name_lcl = f'Z{number + self.base} - n={n}, m={m}'
+            elif self.base is 1:
+                name = _names[number]
                 if number > 9:  # two-digit term
                     name_lcl = ''.join([name[0],
                                         str(int(name[1:3]) + 1),
@@ -496,7 +528,7 @@ class StandardZernike(Pupil):
                                         str(int(name[1]) + 1),
                                         name[2:]])
             else:
-                name_lcl = name
+                name_lcl = _names[number]
 
             strs.append(' '.join([_, name_lcl]))
         body = '\n\t'.join(strs)
@@ -505,6 +537,46 @@ class StandardZernike(Pupil):
         return f'{header}{body}{footer}'
 
 
+class StandardZernikeStack(PupilStack):
+    ''' A stack of StandardZernike pupils sharing one sampling grid, built in a single
+        vectorized step from a matrix of coefficients.
+
+    Properties:
+        Inherited from :class:`PupilStack`, please see that class.
+
+    '''
+    def __init__(self, coefs, samples=128, rms_norm=False, **kwargs):
+        ''' Creates a new StandardZernikeStack.
+
+        Args:
+            coefs (`numpy.ndarray`): array of shape (N, nterms); each row holds
+                the coefficients of one pupil, starting from piston.
+
+            samples (`int`): number of samples across pupil diameter.
+
+            rms_norm (`bool`): if true, coefficients have unit rms value.
+
+            epd, wavelength, opd_unit: see :class:`PupilStack`.
+
+        Returns:
+            `StandardZernikeStack`: a new stack of pupils.
+
+        '''
+        coefs = np.atleast_2d(np.asarray(coefs, dtype=config.precision))
+        self.coefs = coefs
+        self.normalize = bool(rms_norm)
+
+        # terms which are zero in every pupil contribute nothing
+        terms = np.flatnonzero(np.any(coefs != 0, axis=0))
+        if len(terms):
+            stack = basis_stack('standard', terms.tolist(), samples, self.normalize)
+            phase = contract_basis(coefs[:, terms], stack)
+        else:
+            phase = np.zeros((coefs.shape[0], samples, samples), dtype=config.precision)
+
+        super().__init__(phase, **kwargs)
+
+
 def fit(data, num_terms=16, rms_norm=False, round_at=6):
     ''' Fits a number of zernike coefficients to provided data by minimizing
         the root sum square between each coefficient and the given data.  The
@@ -514,7 +586,8 @@ def fit(data, num_terms=16, rms_norm=False, round_at=6):
 
         data (`numpy.ndarray`): data to fit to.
 
-        num_terms (`int`): number of terms to fit, fits terms 0~num_terms.
+        num_terms (`int`): number of terms to fit, fits terms 0~num_terms.  Any
+            number of terms may be fit.
 
         rms_norm (`bool`): if true, normalize coefficients to unit RMS value.
 
@@ -523,25 +596,10 @@ def fit(data, num_terms=16, rms_norm=False, round_at=6):
     Returns:
         numpy.ndarray: an array of coefficients matching the input data.
 
+    Notes:
+        repeated fits of data with the same shape and valid points reuse a
+            cached factorization; see zerntools.ZernikeFitter.
+
     '''
-    if num_terms > len(zernfcns):
-        raise ValueError(f'number of terms must be less than {len(zernfcns)}')
-
-    # precompute the valid indexes in the original data
-    pts = np.isfinite(data)
-
-    # set up an x/y rho/phi grid to evaluate zernikes on
-    x, y = np.linspace(-1, 1, data.shape[1]), np.linspace(-1, 1, data.shape[0])
-    xv, yv = np.meshgrid(x, y)
-    rho = sqrt(xv**2 + yv**2)[pts].flatten()
-    phi = atan2(xv, yv)[pts].flatten()
-
-    # compute each zernike term
-    zernikes = []
-    for i in range(num_terms):
-        zernikes.append(zernwrapper(i, rms_norm, rho, phi))
-    zerns = np.asarray(zernikes).T
-
-    # use least squares to compute the coefficients
-    coefs = np.linalg.lstsq(zerns, data[pts].flatten())[0]
+    coefs = ZernikeFitter('standard', num_terms, rms_norm).fit(data)
     return coefs.round(round_at)
@@ -2,6 +2,10 @@
 '''
 from copy import copy
 from operator import itemgetter
+from collections import OrderedDict
+from threading import Lock
+from os import cpu_count
+from concurrent.futures import Executor, ThreadPoolExecutor, ProcessPoolExecutor
 
 import numpy as np
 from matplotlib import pyplot as plt
@@ -276,10 +280,202 @@ def smooth(x, window_len=3, window='flat'):
     y = np.convolve(w / w.sum(), s, mode='valid')
     return y[(int(np.floor(window_len / 2)) - 1):-(int(np.ceil(window_len / 2)))]
 
+
+class ArrayCache(object):
+    ''' A least-recently-used cache of numpy arrays, bounded by the total
+        number of bytes it holds rather than the number of entries.
+
+    Properties:
+        nbytes: number of bytes currently held by the cache.
+
+    Instance Methods:
+        get: retrieves a value from the cache, or a default if it is absent.
+
+        put: inserts a value into the cache, evicting old entries as needed.
+
+        clear: empties the cache.
+
+    Notes:
+        values may be arrays or tuples of arrays.  Values larger than the
+            capacity of the cache are returned to the user but not stored.
+
+    '''
+    def __init__(self, maxbytes=2**28):
+        ''' Creates a new ArrayCache.
+
+        Args:
+            maxbytes (`int`): maximum number of bytes to hold in the cache.
+
+        Returns:
+            `ArrayCache`: a new, empty cache.
+
+        '''
+        self.maxbytes = maxbytes
+        self.hits = 0
+        self.misses = 0
+        self._store = OrderedDict()
+        self._nbytes = 0
+        self._lock = Lock()
+
+    @property
+    def nbytes(self):
+        ''' Number of bytes held by the cache.
+        '''
+        return self._nbytes
+
+    def get(self, key, default=None):
+        ''' Retrieves a value from the cache.
+
+        Args:
+            key (`hashable`): key to look up.
+
+            default (`object`): value returned if key is not in the cache.
+
+        Returns:
+            `object`: the cached value, or default.
+
+        '''
+        with self._lock:
+            try:
+                value = self._store[key]
+            except KeyError:
+                self.misses += 1
+                return default
+
+            self._store.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        ''' Inserts a value into the cache, evicting the least recently used
+            entries until it fits.
+
+        Args:
+            key (`hashable`): key to store the value under.
+
+            value (`numpy.ndarray` or `tuple`): array(s) to store.
+
+        Returns:
+            `object`: value.
+
+        '''
+        size = _nbytes(value)
+        if size > self.maxbytes:
+            return value
+
+        with self._lock:
+            if key in self._store:
+                self._nbytes -= _nbytes(self._store.pop(key))
+
+            while self._store and self._nbytes + size > self.maxbytes:
+                _, old = self._store.popitem(last=False)
+                self._nbytes -= _nbytes(old)
+
+            self._store[key] = value
+            self._nbytes += size
+        return value
+
+    def clear(self):
+        ''' Empties the cache and resets its statistics.
+        '''
+        with self._lock:
+            self._store.clear()
+            self._nbytes = 0
+            self.hits = 0
+            self.misses = 0
+
+    def __contains__(self, key):
+        return key in self._store
+
+    def __len__(self):
+        return len(self._store)
+
+
+def _nbytes(value):
+    ''' Counts the bytes in an array or tuple of arrays.
+    '''
+    if isinstance(value, tuple):
+        return sum(_nbytes(v) for v in value)
+    else:
+        return value.nbytes
+
 # for make_segments and colorline, see this SO answer:
 # https://stackoverflow.com/a/25941474/4999812
 
 
+def parallel_map(fcn, iterable, executor=None, workers=None, callback=None):
+    ''' Maps a function over an iterable, optionally in parallel, returning
+        the results in the order of the input.
+
+    Args:
+        fcn (`callable`): function of one argument.  Must be picklable to use
+            a process pool.
+
+        iterable (`iterable`): arguments to map fcn over.
+
+        executor (`string` or `concurrent.futures.Executor`): "thread" for a
+            thread pool, suited to work dominated by FFTs that release the
+            GIL; "process" for a process pool; an existing executor to use it;
+            or None to run serially.
+
+        workers (`int`): number of workers in a new pool.  Defaults to the
+            number of CPUs.
+
+        callback (`callable`): if given, called as callback(done, total) in
+            the calling process after each result is collected, e.g. to
+            report progress.
+
+    Returns:
+        `list`: fcn applied to each element of iterable.
+
+    Notes:
+        problems with fewer items than _PARALLEL_MIN_ITEMS, or a single
+            worker, are run serially since pool startup would dominate.
+
+    '''
+    items = list(iterable)
+    if workers is None:
+        workers = cpu_count() or 1
+
+    if executor is None or workers == 1 or len(items) < _PARALLEL_MIN_ITEMS:
+        return _collect(map(fcn, items), len(items), callback)
+
+    if isinstance(executor, Executor):
+        return _collect(executor.map(fcn, items), len(items), callback)
+
+    pool = _pool_type(executor)
+    with pool(max_workers=min(workers, len(items))) as ex:
+        return _collect(ex.map(fcn, items), len(items), callback)
+
+
+def _pool_type(executor):
+    ''' Looks up the executor class named by "thread" or "process".
+    '''
+    executor = executor.lower()
+    if executor in ('thread', 'threads'):
+        return ThreadPoolExecutor
+    elif executor in ('process', 'processes'):
+        return ProcessPoolExecutor
+    else:
+        raise ValueError('executor must be thread, process, or an Executor.')
+
+
+def _collect(results, total, callback):
+    ''' Gathers an iterator of results into a list, reporting each to callback.
+    '''
+    if callback is None:
+        return list(results)
+
+    out = []
+    for result in results:
+        out.append(result)
+        callback(len(out), total)
+    return out
+
+
+_PARALLEL_MIN_ITEMS = 4
+
+
 def make_segments(x, y):
     '''
     Create list of line segments from x and y coordinates, in the correct format for LineCollection:
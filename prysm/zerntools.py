@@ -1,5 +1,28 @@
 ''' Tools for manipulating zernike polynomials
 '''
+import warnings
+from hashlib import sha1
+
+import numpy as np
+from scipy.linalg import qr, solve_triangular
+
+from prysm.conf import config
+from prysm.util import ArrayCache, _nbytes
+from prysm.coordinates import make_rho_phi_grid, make_polar_sample_grid
+
+'''
+Cache of zernike basis stacks shared by all zernike pupils.  Bounded by the
+total number of bytes held; raise or lower zcache.maxbytes as memory allows.
+'''
+zcache = ArrayCache(maxbytes=2**28)
+
+'''
+Cache of the pseudo-inverses used by ZernikeFitter, keyed by family, shape,
+mask, number of terms, normalization, and weights.  An entry is about
+8 * num_terms bytes per valid point, ~105 MB for 16 terms over a 1024x1024
+circular aperture.
+'''
+fitcache = ArrayCache(maxbytes=2**29)
 
 '''
 Map between standard and fringe zernike polynomials
@@ -42,3 +65,430 @@ std_to_fr_map = [
     (50, 34),
     (60, 35),
 ]
+
+
+def fringe_to_nm(idx):
+    ''' Converts a 0-based fringe zernike index to the radial order and
+        azimuthal frequency of the term.
+
+    Args:
+        idx (`int`): fringe index, starting from 0 (piston).
+
+    Returns:
+        `tuple` of (`int`, `int`): n, m.  Negative m denotes a sine term.
+
+    Notes:
+        fringe terms are grouped by k = (n + |m|) / 2.  Within a group |m|
+            descends from k to 0, each nonzero |m| contributes a cosine then
+            a sine term.
+
+    '''
+    k = int(np.floor(np.sqrt(idx)))
+    offset = idx - k * k
+    abs_m = k - offset // 2
+    n = 2 * k - abs_m
+    if abs_m != 0 and offset % 2 == 1:
+        return n, -abs_m
+    return n, abs_m
+
+
+def standard_to_nm(idx):
+    ''' Converts a 0-based standard zernike index to the radial order and
+        azimuthal frequency of the term.
+
+    Args:
+        idx (`int`): standard index, starting from 0 (piston).
+
+    Returns:
+        `tuple` of (`int`, `int`): n, m.  Negative m denotes a sine term.
+
+    Notes:
+        standard terms are ordered by n, then by m descending from n to -n.
+
+    '''
+    n = int(np.ceil((-3 + np.sqrt(9 + 8 * idx)) / 2))
+    m = n - 2 * (idx - n * (n + 1) // 2)
+    return n, m
+
+
+_nm_fcns = {
+    'fringe': fringe_to_nm,
+    'standard': standard_to_nm,
+}
+
+
+def zernike_norm(n, m):
+    ''' Computes the factor that normalizes a zernike term to unit RMS over
+        the unit disk.
+
+    Args:
+        n (`int`): radial order.
+
+        m (`int`): azimuthal frequency.
+
+    Returns:
+        `float`: normalization factor.
+
+    '''
+    if m == 0:
+        return np.sqrt(n + 1)
+    else:
+        return np.sqrt(2 * (n + 1))
+
+
+def zernike_stack(nms, rho, phi, rms_norm=False, dtype=None):
+    ''' Evaluates a set of zernike terms over the given coordinates in a
+        single pass.
+
+    Args:
+        nms (`iterable`): (n, m) pairs of the terms to evaluate.  Negative m
+            denotes a sine term.
+
+        rho (`numpy.ndarray`): radial coordinate.
+
+        phi (`numpy.ndarray`): azimuthal coordinate.
+
+        rms_norm (`bool`): if true, normalize each term to unit RMS.
+
+        dtype (`numpy.dtype`): data type of the output.  Defaults to the
+            configured precision.
+
+    Returns:
+        `numpy.ndarray`: array of shape (len(nms), *rho.shape).
+
+    Notes:
+        Radial polynomials are computed with Kintner's recurrence in n for
+            each m, which avoids forming large powers of rho and remains
+            stable at high order.  Azimuthal terms are computed with the
+            Chebyshev recurrence in m from cos(phi) and sin(phi).  Both share
+            their intermediate arrays across all requested terms.
+
+    '''
+    if dtype is None:
+        dtype = config.precision
+    rho = np.asarray(rho, dtype=dtype)
+    phi = np.asarray(phi, dtype=dtype)
+    nms = list(nms)
+    out = np.empty((len(nms), *rho.shape), dtype=dtype)
+
+    # group the requested terms by |m|, and find the highest n in each group
+    wanted = {}
+    for idx, (n, m) in enumerate(nms):
+        if n < 0 or abs(m) > n or (n - abs(m)) % 2:
+            raise ValueError(f'({n}, {m}) is not a valid zernike term')
+        wanted.setdefault(abs(m), {}).setdefault(n, []).append(idx)
+
+    rho2 = rho * rho
+    rho_m = np.ones_like(rho)
+    last_m = 0
+    for abs_m in sorted(wanted):
+        # rho**m is built up incrementally over the m values in use
+        for _ in range(abs_m - last_m):
+            rho_m *= rho
+        last_m = abs_m
+
+        by_n = wanted[abs_m]
+        max_n = max(by_n)
+        prev2, prev = None, rho_m
+        for n in range(abs_m, max_n + 1, 2):
+            if n == abs_m:
+                current = rho_m
+            elif n == abs_m + 2:
+                current = rho_m * ((abs_m + 2) * rho2 - (abs_m + 1))
+            else:
+                k1 = (n + abs_m) * (n - abs_m) * (n - 2) / 2
+                k2 = 2 * n * (n - 1) * (n - 2)
+                k3 = -abs_m ** 2 * (n - 1) - n * (n - 1) * (n - 2)
+                k4 = -n * (n + abs_m - 2) * (n - abs_m - 2) / 2
+                current = ((k2 * rho2 + k3) * prev + k4 * prev2) / k1
+
+            for idx in by_n.get(n, ()):
+                out[idx] = current
+
+            if n != abs_m:
+                prev2, prev = prev, current
+
+    # azimuthal terms by the Chebyshev recurrence
+    max_m = max(wanted) if wanted else 0
+    cos1, sin1 = np.cos(phi), np.sin(phi)
+    cosines, sines = [np.ones_like(phi), cos1], [np.zeros_like(phi), sin1]
+    for m in range(2, max_m + 1):
+        cosines.append(2 * cos1 * cosines[m - 1] - cosines[m - 2])
+        sines.append(2 * cos1 * sines[m - 1] - sines[m - 2])
+
+    for idx, (n, m) in enumerate(nms):
+        if m > 0:
+            out[idx] *= cosines[m]
+        elif m < 0:
+            out[idx] *= sines[-m]
+
+        if rms_norm:
+            out[idx] *= zernike_norm(n, m)
+
+    return out
+
+
+def basis_stack(family, terms, samples, rms_norm=False):
+    ''' Retrieves a stack of zernike terms evaluated over a pupil grid,
+        computing and caching it if it is not already cached.
+
+    Args:
+        family (`string`): name of the zernike family, "fringe" or "standard".
+
+        terms (`iterable`): 0-based indices of the terms to include in the stack.
+
+        samples (`int`): number of samples across the pupil.
+
+        rms_norm (`bool`): whether the terms are normalized to unit RMS.
+
+    Returns:
+        `numpy.ndarray`: read-only array of shape (len(terms), samples, samples).
+
+    '''
+    dtype = config.precision
+    terms = tuple(terms)
+    key = (family, samples, np.dtype(dtype).str, rms_norm, terms)
+    stack = zcache.get(key)
+    if stack is None:
+        rho, phi = make_rho_phi_grid(samples, dtype)
+        to_nm = _nm_fcns[family]
+        stack = zernike_stack([to_nm(term) for term in terms], rho, phi, rms_norm, dtype)
+        stack.flags.writeable = False
+        zcache.put(key, stack)
+    return stack
+
+
+def contract_basis(coefs, stack):
+    ''' Computes the weighted sum of a stack of terms in one contraction.
+
+    Args:
+        coefs (`iterable`): coefficients, one per term or an array of shape
+            (N, nterms) for N sets of coefficients.
+
+        stack (`numpy.ndarray`): stack of terms, shape (nterms, m, n).
+
+    Returns:
+        `numpy.ndarray`: array of shape (m, n), or (N, m, n).
+
+    '''
+    coefs = np.asarray(coefs, dtype=stack.dtype)
+    return np.tensordot(coefs, stack, axes=1)
+
+
+def zernike_rms(family, coefs, rms_norm=False):
+    ''' Computes the RMS over the unit disk of a sum of zernike terms from
+        its coefficients, without evaluating the terms.
+
+    Args:
+        family (`string`): name of the zernike family, "fringe" or "standard".
+
+        coefs (`iterable`): coefficients, indexed from 0 (piston).
+
+        rms_norm (`bool`): whether the terms are normalized to unit RMS.
+
+    Returns:
+        `float`: RMS of the sum, including piston.
+
+    Notes:
+        the terms are orthogonal over the disk, so the mean square is the sum
+        of the squared coefficients, each divided by the squared
+        normalization of its term if the terms are not normalized.
+
+    '''
+    to_nm = _nm_fcns[family]
+    total = 0
+    for idx, coef in enumerate(coefs):
+        if coef == 0:
+            continue
+        if rms_norm:
+            total += coef ** 2
+        else:
+            total += (coef / zernike_norm(*to_nm(idx))) ** 2
+    return float(np.sqrt(total))
+
+
+def zernike_pv(family, coefs, rms_norm=False):
+    ''' Estimates the peak-to-valley over the unit disk of a sum of zernike
+        terms on a sparse polar sampling, without building a pupil grid.
+
+    Args:
+        family (`string`): name of the zernike family, "fringe" or "standard".
+
+        coefs (`iterable`): coefficients, indexed from 0 (piston).
+
+        rms_norm (`bool`): whether the terms are normalized to unit RMS.
+
+    Returns:
+        `float`: PV of the sum.
+
+    '''
+    to_nm = _nm_fcns[family]
+    terms = [(to_nm(idx), coef) for idx, coef in enumerate(coefs) if coef != 0]
+    if not terms:
+        return 0.0
+
+    rho, phi = make_polar_sample_grid()
+    nms, weights = zip(*terms)
+    values = contract_basis(weights, zernike_stack(nms, rho, phi, rms_norm))
+    return float(values.max() - values.min())
+
+
+class ZernikeFitter(object):
+    ''' Fits zernike coefficients to data sampled on a uniform x,y grid by
+        weighted least squares.
+
+    Properties:
+        family: name of the zernike family, "fringe" or "standard".
+
+        num_terms: number of terms fit, 0~num_terms.
+
+        rms_norm: whether the terms are normalized to unit RMS.
+
+    Instance Methods:
+        fit: fits coefficients to a map or a stack of maps.
+
+    Notes:
+        the pseudo-inverse of the design matrix is computed once for each
+            combination of shape, mask of valid points, and weights, and is
+            shared by all fitters through fitcache.  Fitting a stream of maps
+            with the same aperture costs one matrix product per map, or one
+            for a whole stack.
+
+    '''
+    def __init__(self, family='fringe', num_terms=16, rms_norm=False):
+        ''' Creates a new ZernikeFitter.
+
+        Args:
+            family (`string`): name of the zernike family, "fringe" or "standard".
+
+            num_terms (`int`): number of terms to fit, fits terms 0~num_terms.
+
+            rms_norm (`bool`): if true, normalize coefficients to unit RMS value.
+
+        Returns:
+            `ZernikeFitter`: a new fitter.
+
+        '''
+        if family not in _nm_fcns:
+            raise ValueError('family must be fringe or standard')
+        self.family = family
+        self.num_terms = num_terms
+        self.rms_norm = rms_norm
+
+    def fit(self, data, weights=None, residual=False):
+        ''' Fits zernike coefficients to data.
+
+        Args:
+            data (`numpy.ndarray`): map of shape (m, n), or stack of maps of
+                shape (N, m, n).  Non-finite values are excluded from the fit.
+
+            weights (`numpy.ndarray`): nonnegative weight of each sample, shape
+                (m, n).  If None, all samples are weighted equally.
+
+            residual (`bool`): if true, also return the RMS of the fit residual.
+
+        Returns:
+            `numpy.ndarray`: coefficients, shape (num_terms,) or (N, num_terms).
+                if residual is true, a tuple of the coefficients and the
+                residual RMS over the valid points, a `float` or an array of
+                shape (N,).  For weighted fits the RMS is weighted likewise.
+
+        '''
+        data = np.asarray(data, dtype=np.float64)
+        single = data.ndim == 2
+        stack = data[np.newaxis] if single else data
+
+        coefs = np.empty((stack.shape[0], self.num_terms))
+        rms = np.empty(stack.shape[0])
+
+        # maps that share a mask are solved together
+        groups = {}
+        valid = np.isfinite(stack)
+        for idx, mask in enumerate(valid):
+            groups.setdefault(mask.tobytes(), []).append(idx)
+
+        for idxs in groups.values():
+            mask = valid[idxs[0]]
+            pinv, gram, w = self._factorization(mask, weights)
+            pts = stack[idxs][:, mask]
+            coefs[idxs] = pts @ pinv.T
+
+            if residual:
+                # by the normal equations W A = P^T (A^T W A), so w * fit = (Hc) P
+                wfit = (coefs[idxs] @ gram) @ pinv
+                if w is None:
+                    ss, total = ((pts - wfit) ** 2).sum(axis=1), pts.shape[1]
+                else:
+                    pos = w > 0
+                    wres = (pts * w - wfit)[:, pos]
+                    ss, total = (wres ** 2 / w[pos]).sum(axis=1), w.sum()
+                rms[idxs] = np.sqrt(ss / total)
+
+        if single:
+            coefs, rms = coefs[0], float(rms[0])
+        if residual:
+            return coefs, rms
+        return coefs
+
+    def _factorization(self, mask, weights):
+        ''' Retrieves the pseudo-inverse, weighted Gram matrix, and weights
+            over the valid points, computing and caching them if they are not
+            already cached.
+
+        Returns:
+            `tuple` containing:
+
+                `numpy.ndarray`: P, shape (num_terms, npts), such that the
+                    coefficients are P @ b.
+
+                `numpy.ndarray`: A^T W A, shape (num_terms, num_terms).
+
+                `numpy.ndarray`: weights of the valid points, or None.
+
+        '''
+        if weights is not None:
+            weights = np.asarray(weights, dtype=np.float64)
+            weight_key = sha1(weights.tobytes()).hexdigest()
+        else:
+            weight_key = None
+
+        key = (self.family, mask.shape, sha1(np.packbits(mask)).hexdigest(),
+               self.num_terms, self.rms_norm, weight_key)
+        value = fitcache.get(key)
+        if value is not None:
+            pinv, gram, w = value
+            return pinv, gram, (w if weight_key else None)
+
+        # set up an x/y rho/phi grid to evaluate zernikes on
+        x, y = np.linspace(-1, 1, mask.shape[1]), np.linspace(-1, 1, mask.shape[0])
+        xv, yv = np.meshgrid(x, y)
+        rho = np.sqrt(xv ** 2 + yv ** 2)[mask]
+        phi = np.arctan2(xv, yv)[mask]
+
+        to_nm = _nm_fcns[self.family]
+        nms = [to_nm(i) for i in range(self.num_terms)]
+        design = zernike_stack(nms, rho, phi, self.rms_norm, np.float64).T
+
+        if weight_key:
+            w = weights[mask]
+            sqrt_w = np.sqrt(w)
+            design *= sqrt_w[:, np.newaxis]
+        else:
+            w = np.empty(0)
+
+        # A = QR, so the least squares solution is R^-1 Q^T b, and A^T A = R^T R
+        q, r = qr(design, mode='economic')
+        del design
+        pinv = solve_triangular(r, q.T)
+        if weight_key:
+            # fold the weights in, so that P applies to unweighted data
+            pinv *= sqrt_w
+        gram = r.T @ r
+
+        value = (pinv, gram, w)
+        if _nbytes(value) > fitcache.maxbytes:
+            warnings.warn(f'factorization of {_nbytes(value)} bytes is larger than fitcache '
+                          f'({fitcache.maxbytes} bytes) and will be recomputed for each fit; '
+                          'raise zerntools.fitcache.maxbytes to cache it.')
+        fitcache.put(key, value)
+        return pinv, gram, (w if weight_key else None)
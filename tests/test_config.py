@@ -62,6 +62,35 @@ def test_set_parallel_rgb(bool):
     assert config.parallel_rgb == bool
 
 
+def test_set_rgb_workers():
+    config.set_rgb_workers(2)
+    assert config.rgb_workers == 2
+    config.set_rgb_workers(3)
+    with pytest.raises(ValueError):
+        config.set_rgb_workers(0)
+
+
 def test__foce_nonparallel_test_env():
     config.set_parallel_rgb(False)
     assert config
+
+
+@pytest.mark.parametrize('backend', ['scipy', 'np'])
+def test_set_fft_backend(backend):
+    config.set_fft_backend(backend)
+    assert config.fft_backend == backend
+
+
+def test_rejects_bad_fft_backend():
+    with pytest.raises(ValueError):
+        config.set_fft_backend('foo')
+
+
+def test_set_fft_workers():
+    config.set_fft_workers(2)
+    assert config.fft_workers == 2
+
+
+def test_rejects_bad_fft_workers():
+    with pytest.raises(ValueError):
+        config.set_fft_workers(0)
@@ -0,0 +1,89 @@
+''' Tests for the on-disk result cache.
+'''
+import pytest
+
+import numpy as np
+
+from prysm import config, FringeZernike, PSF, MTF, Lens
+from prysm.diskcache import DiskCache, digest, active_cache
+
+
+@pytest.fixture
+def cache_dir(tmp_path):
+    config.set_cache_dir(tmp_path / 'cache')
+    yield tmp_path / 'cache'
+    config.set_cache_dir(None)
+
+
+class Saveable(object):
+    def __init__(self, size):
+        self.data = np.zeros(size, dtype=np.uint8)
+
+    def save(self, path):
+        path.mkdir()
+        np.save(path / 'data.npy', self.data)
+
+    @staticmethod
+    def load(path):
+        return np.load(path / 'data.npy')
+
+
+def test_digest_depends_on_content():
+    a = np.arange(4.)
+    assert digest(a, 1) == digest(a.copy(), 1)
+    assert digest(a, 1) != digest(a + 1, 1)
+    assert digest({'W040': 1.0}) == digest({'W040': np.float64(1.0)})
+
+
+def test_disk_cache_evicts_least_recently_used(tmp_path):
+    cache = DiskCache(tmp_path, maxbytes=2500)
+    cache.put('a', Saveable(1000))
+    cache.put('b', Saveable(1000))
+    assert cache.get('a', Saveable.load) is not None
+    cache.put('c', Saveable(1000))
+    assert 'a' in cache and 'c' in cache and 'b' not in cache
+    assert cache.get('b', Saveable.load) is None
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert cache.nbytes <= cache.maxbytes
+
+
+def test_disk_cache_reindexes_existing_entries(tmp_path):
+    DiskCache(tmp_path).put('a', Saveable(10))
+    assert 'a' in DiskCache(tmp_path)
+
+
+def test_psf_and_mtf_constructors_hit_cache(cache_dir):
+    pupil = FringeZernike(Z8=0.5, samples=32)
+    psf = PSF.from_pupil(pupil, efl=2)
+    mtf = MTF.from_psf(psf)
+    cache = active_cache()
+    assert (cache.hits, len(cache)) == (0, 2)
+
+    psf2 = PSF.from_pupil(pupil, efl=2)
+    mtf2 = MTF.from_psf(psf2)
+    assert cache.hits == 2
+    assert np.array_equal(psf2.data, psf.data)
+    assert np.array_equal(mtf2.data, mtf.data)
+
+
+def test_masked_pupil_misses_unmasked_entry(cache_dir):
+    pupil = FringeZernike(Z8=0.5, samples=32)
+    psf = PSF.from_pupil(pupil, efl=2)
+
+    # same phase, with a central obscuration in the amplitude only
+    obscured = FringeZernike(Z8=0.5, samples=32)
+    obscured.fcn = obscured.fcn * (obscured.rho > 0.4)
+    assert np.array_equal(obscured.phase, pupil.phase, equal_nan=True)
+    psf2 = PSF.from_pupil(obscured, efl=2)
+    assert active_cache().hits == 0
+    assert not np.allclose(psf2.data, psf.data)
+
+
+def test_lens_hit_skips_pupil(cache_dir, monkeypatch):
+    lens = Lens(efl=50, fno=4, samples=32, aberrations={'W040': 0.5})
+    psf = lens._make_psf(0)
+
+    def fail(field_index):
+        raise AssertionError('pupil was rebuilt')
+    monkeypatch.setattr(lens, '_make_pupil', fail)
+    assert np.array_equal(lens._make_psf(0).data, psf.data)
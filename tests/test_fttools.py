@@ -0,0 +1,72 @@
+''' Unit tests for fourier transform tools.
+'''
+import pytest
+
+import numpy as np
+
+from prysm import fttools
+
+SAMPLES = 32
+
+
+@pytest.fixture
+def sample_data_2d():
+    return np.random.rand(SAMPLES, SAMPLES)
+
+
+def test_matrix_dft_matches_fft_at_critical_sampling(sample_data_2d):
+    ref = np.fft.fftshift(np.fft.fft2(np.fft.ifftshift(sample_data_2d)))
+    result = fttools.matrix_dft(sample_data_2d, 1, SAMPLES)
+    assert np.allclose(result, ref)
+
+
+def test_matrix_dft_handles_rectangular_input():
+    data = np.random.rand(SAMPLES, SAMPLES // 2)
+    ref = np.fft.fftshift(np.fft.fft2(np.fft.ifftshift(data)))
+    result = fttools.matrix_dft(data, 1, data.shape)
+    assert np.allclose(result, ref)
+
+
+def test_matrix_dft_reuses_cached_kernels(sample_data_2d):
+    fttools.mdft_cache.clear()
+    fttools.matrix_dft(sample_data_2d, 0.5, 16)
+    hits = fttools.mdft_cache.hits
+    fttools.matrix_dft(sample_data_2d, 0.5, 16)
+    assert fttools.mdft_cache.hits == hits + 1
+    assert len(fttools.mdft_cache) == 1
+
+
+def test_mdft_kernels_are_read_only():
+    E1, E2 = fttools.mdft_kernels(8, 8, 4, 4, (0.5, 0.5), (0, 0))
+    with pytest.raises(ValueError):
+        E1[0, 0] = 0
+    with pytest.raises(ValueError):
+        E2[0, 0] = 0
+
+
+def test_mdft_cache_respects_memory_cap():
+    cache = fttools.mdft_cache
+    maxbytes = cache.maxbytes
+    cache.clear()
+    try:
+        cache.maxbytes = 2 * 16 * 16 * 16  # two complex128 16x16 kernels
+        for alpha in (0.25, 0.5, 0.75):
+            fttools.mdft_kernels(16, 16, 16, 16, (alpha, alpha), (0, 0))
+        assert cache.nbytes <= cache.maxbytes
+        assert len(cache) == 1
+    finally:
+        cache.maxbytes = maxbytes
+        cache.clear()
+
+
+def test_matrix_dft_stack_matches_individual_transforms():
+    stack = np.random.rand(4, SAMPLES, SAMPLES)
+    result = fttools.matrix_dft_stack(stack, 0.3, (24, 20))
+    assert result.shape == (4, 24, 20)
+    for member, ref in zip(stack, result):
+        assert np.allclose(fttools.matrix_dft(member, 0.3, (24, 20)), ref)
+
+
+def test_matrix_dft_stack_rejects_2d_input(sample_data_2d):
+    with pytest.raises(ValueError):
+        fttools.matrix_dft_stack(sample_data_2d, 1, SAMPLES)
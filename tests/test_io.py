@@ -1,10 +1,20 @@
 ''' Tests the io functions of prysm.
 '''
+import struct
 from pathlib import Path
 
 import pytest
 
-from prysm.io import read_oceanoptics
+import numpy as np
+
+from prysm.io import (
+    read_oceanoptics,
+    read_zygo_dat,
+    read_grid_txt,
+    decompose_phase_maps,
+)
+from prysm.zerntools import basis_stack
+from prysm import FringeZernike, StandardZernike, Seidel, Pupil, PSF, MTF
 
 
 def test_read_oceanoptics_functions():
@@ -32,3 +42,107 @@ def test_read_oceanoptics_raises_for_invalid():
     p = Path(__file__).parent / 'io_files' / 'invalid_sample_oceanoptics.txt'
     with pytest.raises(IOError):
         read_oceanoptics(p)
+
+
+def write_zygo_dat(path, counts, intensity=None, wavelength=632.8e-9):
+    header = bytearray(834)
+    struct.pack_into('>I', header, 0, 0x881B036F)
+    struct.pack_into('>h', header, 4, 1)
+    struct.pack_into('>i', header, 6, 834)
+    if intensity is not None:
+        struct.pack_into('>HHHHI', header, 52, intensity.shape[2], intensity.shape[1],
+                         intensity.shape[0], 65535, intensity.nbytes)
+    struct.pack_into('>HHI', header, 68, counts.shape[1], counts.shape[0], counts.nbytes)
+    struct.pack_into('>ff', header, 164, 0.5, wavelength)
+    struct.pack_into('>f', header, 176, 1)
+    struct.pack_into('>h', header, 218, 1)
+    with open(path, 'wb') as fid:
+        fid.write(bytes(header))
+        if intensity is not None:
+            fid.write(intensity.astype('>u2').tobytes())
+        fid.write(counts.astype('>i4').tobytes())
+
+
+def test_read_zygo_dat_scales_phase_and_masks_invalid(tmp_path):
+    counts = np.arange(12, dtype=np.int32).reshape(3, 4) * 1000
+    counts[0, 0] = 2147483640
+    intensity = np.ones((1, 3, 4), dtype=np.uint16)
+    p = tmp_path / 'map.dat'
+    write_zygo_dat(p, counts, intensity)
+
+    data = read_zygo_dat(p)
+    assert data['intensity'].shape == (1, 3, 4)
+    assert np.isnan(data['phase'][0, 0])
+    # 0.5 scale, 32768 counts per wave
+    assert data['phase'][2, 3] == pytest.approx(11000 * 0.5 / 32768 * 632.8, rel=1e-5)
+
+
+def test_read_grid_txt_handles_invalid_tokens(tmp_path):
+    p = tmp_path / 'map.txt'
+    p.write_text('# header\n1, 2, nan\n4 5 NoData\n')
+    data = read_grid_txt(p, invalid=('nan', 'NoData'))
+    assert data.shape == (2, 3)
+    assert np.isnan(data[:, 2]).all()
+    assert data[1, 1] == 5
+
+
+@pytest.mark.parametrize('executor', [None, 'thread'])
+def test_decompose_phase_maps_recovers_coefficients(tmp_path, executor):
+    stack = basis_stack('fringe', range(9), 32)
+    truth = np.random.rand(5, 9)
+    for idx, coefs in enumerate(truth):
+        data = np.tensordot(coefs, stack, axes=1)
+        np.savetxt(tmp_path / f'{idx}.txt', data)
+
+    rows = list(decompose_phase_maps(tmp_path, num_terms=9, chunksize=2, executor=executor, workers=2))
+    assert [path.name for path, _, _ in rows] == [f'{idx}.txt' for idx in range(5)]
+    for (_, coefs, rms), expected in zip(rows, truth):
+        assert np.allclose(coefs, expected, atol=1e-6)
+        assert rms < 1e-6
+
+
+def test_pupil_save_load_round_trip(tmp_path):
+    pupil = FringeZernike(Z8=1, samples=32)
+    pupil.save(tmp_path / 'pupil')
+    loaded = Pupil.load(tmp_path / 'pupil')
+    assert isinstance(loaded.phase, np.memmap)
+    assert np.array_equal(loaded.phase, pupil.phase, equal_nan=True)
+    assert np.array_equal(loaded.fcn, pupil.fcn)
+    assert loaded.rms == pytest.approx(pupil.rms, rel=5e-2)
+    assert loaded.epd == pupil.epd
+
+
+@pytest.mark.parametrize('pupil', [
+    lambda: FringeZernike(Z4=0.3, Z9=0.2, rms_norm=True, samples=32),
+    lambda: StandardZernike(Z4=0.3, Z11=-0.1, samples=32),
+    lambda: Seidel(W020=-1, W040=1, W131=0.5, field=0.7, samples=32),
+])
+def test_pupil_load_restores_subclass(tmp_path, pupil):
+    pupil = pupil()
+    pupil.save(tmp_path / 'pupil')
+    loaded = Pupil.load(tmp_path / 'pupil')
+    assert type(loaded) is type(pupil)
+    assert loaded.coefs == pytest.approx(pupil.coefs)
+    assert loaded._analytic_stats
+    assert loaded.rms == pytest.approx(pupil.rms)
+    assert loaded.pv_estimate == pytest.approx(pupil.pv_estimate)
+
+
+def test_psf_and_mtf_save_load_round_trip(tmp_path):
+    psf = PSF.from_pupil(FringeZernike(samples=32), efl=2)
+    mtf = MTF.from_psf(psf)
+    psf.save(tmp_path / 'psf')
+    mtf.save(tmp_path / 'mtf')
+
+    psf2 = PSF.load(tmp_path / 'psf', mmap_mode=None)
+    mtf2 = MTF.load(tmp_path / 'mtf')
+    assert np.array_equal(psf2.data, psf.data)
+    assert np.allclose(psf2.unit_x, psf.unit_x)
+    assert np.array_equal(mtf2.data, mtf.data)
+    assert np.array_equal(mtf2.unit_y, mtf.unit_y)
+
+
+def test_load_rejects_other_types(tmp_path):
+    MTF.from_psf(PSF.from_pupil(FringeZernike(samples=32), efl=2)).save(tmp_path / 'mtf')
+    with pytest.raises(IOError):
+        PSF.load(tmp_path / 'mtf')
@@ -0,0 +1,103 @@
+''' Unit tests for the Lens model.
+'''
+import pytest
+
+import numpy as np
+
+from prysm import Seidel, PSF, MTF
+from prysm.lens import Lens
+from prysm.thinlens import image_displacement_to_defocus
+
+SAMPLES = 32
+
+
+@pytest.fixture
+def lens():
+    lens = Lens(aberrations={'W040': 0.5, 'W131': 0.3}, efl=50, fno=4, samples=SAMPLES)
+    return lens._uniformly_spaced_fields(3)
+
+
+@pytest.mark.parametrize('executor', [None, 'thread'])
+def test_thrufocus_matches_merged_pupils(lens, executor):
+    focus, mtfs = lens._make_mtf_thrufocus(2, 50, 5, executor=executor, workers=2)
+    defocus = image_displacement_to_defocus(focus, lens.fno, lens.wavelength)
+    pupil = lens._make_pupil(2)
+    assert len(mtfs) == 5
+    for w020, mtf in zip(defocus, mtfs):
+        dp = Seidel(W020=w020, epd=lens.epd, samples=SAMPLES, wavelength=lens.wavelength)
+        ref = MTF.from_psf(PSF.from_pupil(pupil.merge(dp), lens.efl))
+        assert np.allclose(mtf.data, ref.data)
+
+
+@pytest.mark.parametrize('executor', [None, 'thread'])
+def test_mtf_vs_field_vs_focus_matches_individual_mtfs(lens, executor):
+    freqs = [10, 25, 50]
+    calls = []
+    budget = 4 * 16 * 3 * (3 * SAMPLES) ** 2  # 4 pupils per chunk
+    t, s = lens.mtf_vs_field_vs_focus(3, 50, 5, freqs, memory_budget=budget,
+                                      executor=executor, workers=2,
+                                      progress=lambda done, total: calls.append((done, total)))
+    assert t.data.shape == s.data.shape == (5, 3, 3)
+    assert calls[-1] == (4, 4)
+
+    defocus = image_displacement_to_defocus(t.focus, lens.fno, lens.wavelength)
+    for field_idx in range(3):
+        pupil = lens._make_pupil(field_idx)
+        for focus_idx, w020 in enumerate(defocus):
+            dp = Seidel(W020=w020, epd=lens.epd, samples=SAMPLES, wavelength=lens.wavelength)
+            psf = PSF.from_pupil(pupil.merge(dp), lens.efl)
+            ref_t, ref_s = MTF.at(psf, freqs, (0, 90), grid=True)
+            assert np.allclose(t.data[focus_idx, field_idx], ref_t)
+            assert np.allclose(s.data[focus_idx, field_idx], ref_s)
+
+
+def test_autofocus_minimizes_rms(lens):
+    focused = lens.clone().autofocus(2)
+    w020 = focused.aberrations['W020']
+
+    def rms(delta):
+        abers = dict(focused.aberrations, W020=w020 + delta)
+        return Seidel(**abers, epd=lens.epd, samples=SAMPLES, h=lens.fields[2]).rms
+
+    assert rms(0) < rms(1e-3)
+    assert rms(0) < rms(-1e-3)
+
+
+def test_spherical_mtf_jacobian_matches_finite_differences(lens):
+    from prysm.lens import _spherical_mtf_and_jacobian
+
+    freqs = np.asarray([10, 20, 40, 80])
+    coefs = np.asarray([0.1, 0.3, -0.1, 0.05])
+    mtf, jac = _spherical_mtf_and_jacobian(freqs, lens, coefs)
+    eps = 1e-6
+    for idx in range(4):
+        step = np.zeros(4)
+        step[idx] = eps
+        fd = (_spherical_mtf_and_jacobian(freqs, lens, coefs + step)[0] - mtf) / eps
+        assert np.allclose(jac[:, idx], fd, atol=1e-4)
+
+
+def test_spherical_fit_reproduces_mtf(lens):
+    from prysm.lens import _spherical_mtf_and_jacobian, _spherical_defocus_from_monochromatic_mtf
+
+    freqs = np.asarray([10, 20, 40, 60, 80, 100])
+    truth, _ = _spherical_mtf_and_jacobian(freqs, lens, [0.1, 0.3, -0.1, 0.05])
+    fit = _spherical_defocus_from_monochromatic_mtf(lens, freqs, truth[:6], truth[6:])
+    ab = fit.aberrations
+    result, _ = _spherical_mtf_and_jacobian(freqs, lens, [ab['W020'], ab['W040'], ab['W060'], ab['W080']])
+    assert np.allclose(result, truth, atol=1e-6)
+
+
+def test_spherical_fit_recovers_large_coefficients():
+    from prysm.lens import _spherical_mtf_and_jacobian, _spherical_defocus_from_monochromatic_mtf
+
+    lens = Lens(efl=50, fno=4, samples=SAMPLES)
+    freqs = np.linspace(5, 240, 24)
+    coefs = [1, -1, 0, 0]
+    truth, _ = _spherical_mtf_and_jacobian(freqs, lens, coefs)
+    fit = _spherical_defocus_from_monochromatic_mtf(lens.clone(), freqs, truth[:24], truth[24:])
+    ab = fit.aberrations
+    # MTF cannot tell the coefficients from their negatives
+    assert np.allclose(np.abs([ab['W020'], ab['W040'], ab['W060'], ab['W080']]),
+                       np.abs(coefs), atol=1e-4)
+    assert np.sign(ab['W020']) == -np.sign(ab['W040'])
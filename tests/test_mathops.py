@@ -44,3 +44,56 @@ def test_fft2(sample_data_2d):
 def test_ifft2(sample_data_2d):
     result = mathops.ifft2(sample_data_2d)
     assert type(result) is np.ndarray
+
+
+@pytest.mark.parametrize('fcn', ['fft2', 'ifft2'])
+def test_scipy_fft_backend_matches_numpy(sample_data_2d, fcn):
+    from prysm import config
+    pytest.importorskip('scipy.fft')
+    ref = getattr(np.fft, fcn)(sample_data_2d)
+    config.set_fft_backend('scipy')
+    try:
+        result = getattr(mathops, fcn)(sample_data_2d)
+    finally:
+        config.set_fft_backend('np')
+    assert np.allclose(result, ref)
+
+
+def test_scipy_fft_backend_transforms_last_two_axes():
+    from prysm import config
+    pytest.importorskip('scipy.fft')
+    stack = np.random.rand(3, TEST_ARR_SIZE, TEST_ARR_SIZE)
+    config.set_fft_backend('scipy')
+    try:
+        result = mathops.fft2(stack)
+    finally:
+        config.set_fft_backend('np')
+    assert np.allclose(result, np.fft.fft2(stack))
+
+
+def test_fftw_fft_backend_matches_numpy_and_reuses_plans(sample_data_2d):
+    from prysm import config
+    pytest.importorskip('pyfftw')
+    mathops.clear_fft_plans()
+    config.set_fft_backend('fftw')
+    try:
+        first = mathops.fft2(sample_data_2d)
+        second = mathops.fft2(sample_data_2d)
+        inverse = mathops.ifft2(first)
+    finally:
+        config.set_fft_backend('np')
+    assert np.allclose(first, np.fft.fft2(sample_data_2d))
+    assert np.allclose(second, first)
+    assert np.allclose(inverse.real, sample_data_2d)
+    assert len(mathops._fftw_plans) == 2
+
+
+def test_wisdom_round_trips_without_pickle(sample_data_2d, tmp_path):
+    pytest.importorskip('pyfftw')
+    import pyfftw
+    path = tmp_path / 'wisdom.npz'
+    mathops.save_wisdom(path)
+    with np.load(path, allow_pickle=False) as data:
+        saved = tuple(data[name].tobytes() for name in sorted(data.files))
+    assert saved == pyfftw.export_wisdom()
+    assert len(mathops.load_wisdom(path)) == 3
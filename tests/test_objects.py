@@ -0,0 +1,146 @@
+''' Tests for objects and images.
+'''
+import pytest
+
+import numpy as np
+
+from prysm import config, RGBImage, FringeZernike, PSF, RGBPSF
+from prysm import objects
+
+
+@pytest.fixture
+def rgb():
+    img = RGBImage(*np.random.rand(3, 64, 64), sample_spacing=1)
+    psfs = [PSF.from_pupil(FringeZernike(Z8=z, samples=32), efl=2) for z in (0.1, 0.2, 0.3)]
+    return img, RGBPSF(*psfs)
+
+
+@pytest.mark.parametrize('parallel', [True, False])
+def test_rgb_convpsf_batched_matches_per_channel(rgb, parallel):
+    img, psf = rgb
+    previous = config.parallel_rgb
+    config.set_parallel_rgb(parallel)
+    try:
+        ref = img.convpsf(psf)
+        batched = img.convpsf(psf, batched=True)
+    finally:
+        config.set_parallel_rgb(previous)
+    for chan in 'RGB':
+        assert np.allclose(getattr(batched, chan), getattr(ref, chan))
+
+
+def test_rgb_convpsf_batched_reuses_transfer_function(rgb, monkeypatch):
+    img, psf = rgb
+    first = img.convpsf(psf, batched=True)
+
+    def fail(*args, **kwargs):
+        raise AssertionError('transfer function was rebuilt')
+    monkeypatch.setattr(objects, 'TransferFunction', fail)
+    second = img.convpsf(psf, batched=True)
+    assert np.array_equal(first.R, second.R)
+
+
+def test_rgb_convpsf_batched_follows_changed_psf(rgb):
+    img, psf = rgb
+    img.convpsf(psf, batched=True)
+    psf.R *= psf.R
+    batched = img.convpsf(psf, batched=True)
+    ref = img.convpsf(RGBPSF(psf.r_psf, psf.g_psf, psf.b_psf), batched=True)
+    for chan in 'RGB':
+        assert np.allclose(getattr(batched, chan), getattr(ref, chan))
+
+
+def test_rgb_pool_is_reused_and_resized(rgb):
+    img, psf = rgb
+    previous = config.parallel_rgb
+    config.set_parallel_rgb(True)
+    img.convpsf(psf)
+    pool = objects._get_rgb_pool()
+    img.convpsf(psf)
+    assert objects._get_rgb_pool() is pool
+
+    config.set_rgb_workers(2)
+    try:
+        assert objects._get_rgb_pool()._max_workers == 2
+    finally:
+        config.set_rgb_workers(3)
+        config.set_parallel_rgb(previous)
+        objects.shutdown_rgb_pool()
+
+
+def test_transfer_function_matches_convpsf():
+    from prysm import Image, TransferFunction
+
+    psf = PSF.from_pupil(FringeZernike(Z8=0.2, samples=32), efl=2)
+    frames = np.random.rand(5, 64, 64)
+    tf = TransferFunction(psf, 64, 1)
+    for frame, blurred in zip(frames, tf.stream(iter(frames), batch_size=2)):
+        ref = Image(frame, 1).convpsf(psf)
+        assert np.allclose(blurred, ref.data)
+
+
+def test_transfer_function_conserves_total_without_renorm():
+    from prysm import TransferFunction
+
+    psf = PSF.from_pupil(FringeZernike(Z8=0.2, samples=32), efl=2)
+    frames = np.random.rand(3, 3, 32, 32)
+    tf = TransferFunction(RGBPSF(psf, psf, psf), (32, 32), 1, renorm=False)
+    out = tf.convolve(frames)
+    assert out.shape == frames.shape
+    assert np.allclose(out.sum(axis=(-2, -1)), frames.sum(axis=(-2, -1)), rtol=1e-2)
+
+
+@pytest.fixture
+def mono():
+    from prysm import Image
+
+    psf = PSF.from_pupil(FringeZernike(Z8=0.3, samples=32), efl=2)
+    return Image(np.random.rand(64, 48), 0.5), psf
+
+
+@pytest.mark.parametrize('executor', [None, 'thread'])
+def test_tiled_convpsf_matches_full_frame(mono, executor):
+    img, psf = mono
+    ref = img.convpsf(psf)
+    tiled = img.convpsf(psf, memory_budget=2**19, kernel_size=img.data.shape,
+                        executor=executor, workers=2)
+    assert np.allclose(tiled.data, ref.data)
+
+
+def test_tiled_convpsf_default_kernel_matches_and_writes_memmap(mono, tmp_path):
+    img, psf = mono
+    ref = img.convpsf(psf)
+    tiled = img.convpsf(psf, memory_budget=2**19, out=tmp_path / 'out.npy')
+    assert isinstance(tiled.data, np.memmap)
+    assert np.allclose(tiled.data, ref.data, atol=1e-12)
+    assert np.array_equal(np.load(tmp_path / 'out.npy'), tiled.data)
+
+
+def test_tiled_convpsf_kernel_is_compact():
+    from concurrent.futures import ThreadPoolExecutor
+    from prysm import Image
+
+    # the PSF spans 68 of 256 pixels; the budget is half of a full-frame FFT
+    psf = PSF.from_pupil(FringeZernike(Z6=0.5, Z8=0.3, samples=32), efl=2)
+    img = Image(np.random.rand(192, 256), 0.5)
+    ref = img.convpsf(psf)
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        tiled = img.convpsf(psf, memory_budget=2**21, executor=executor)
+    assert np.allclose(tiled.data, ref.data, atol=1e-12)
+
+
+def test_tiled_convpsf_rejects_too_small_budget(mono):
+    img, psf = mono
+    with pytest.raises(ValueError):
+        img.convpsf(psf, memory_budget=2**16)
+
+
+def test_tiled_convpsf_budgets_for_executor_size(mono):
+    from concurrent.futures import ThreadPoolExecutor
+
+    img, psf = mono
+    ref = img.convpsf(psf)
+    # enough for one worker's tiles, not for one per CPU
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        tiled = img.convpsf(psf, memory_budget=2**19, executor=executor)
+    assert np.allclose(tiled.data, ref.data, atol=1e-12)
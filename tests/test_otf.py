@@ -31,3 +31,69 @@ def test_mtf_plot_tan_sag_functions(mtf):
     assert ax
 
 
+def test_mtf_stack_matches_individual_mtfs():
+    from prysm import FringeZernike, FringeZernikeStack
+
+    coefs = np.random.rand(3, 9) * 0.1
+    stack = otf.MTFStack.from_pupil(FringeZernikeStack(coefs, samples=SAMPLES), 10)
+    for row, member in zip(coefs, stack):
+        ref = otf.MTF.from_pupil(FringeZernike(row, samples=SAMPLES), 10)
+        assert np.allclose(member.data, ref.data)
+        assert np.allclose(member.unit_x, ref.unit_x)
+
+
+def test_mtf_from_pupil_matrix_dft_has_requested_sampling():
+    from prysm import FringeZernike
+
+    mtf = otf.MTF.from_pupil(FringeZernike(samples=64), 10, sample_spacing=0.5, samples=128)
+    assert mtf.data.shape == (128, 128)
+    assert mtf.data[64, 64] == pytest.approx(1)
+
+
+def test_exact_polar_matches_pointwise_interpolation(mtf):
+    freqs = np.asarray([10, 20, 40, 80])
+    azimuths = np.asarray([0, 30, 45, 90])
+    result = mtf.exact_polar(freqs, azimuths)
+    assert type(result) is np.ndarray
+    for f, a, value in zip(freqs, azimuths, result):
+        x, y = f * np.cos(np.radians(a)), f * np.sin(np.radians(a))
+        assert value == pytest.approx(float(mtf.interpf((x, y), method='linear')))
+
+
+def test_exact_polar_scalar_returns_float(mtf):
+    assert type(mtf.exact_polar(10)) is float
+    assert mtf.exact_polar(10, 90) == pytest.approx(mtf.exact_xy(0, 10))
+
+
+def test_exact_polar_grid_shape(mtf):
+    freqs = [10, 20, 40]
+    result = mtf.exact_polar(freqs, (0, 90), grid=True)
+    assert result.shape == (2, 3)
+    assert np.allclose(result[0], mtf.exact_polar(freqs, 0))
+    assert np.allclose(result[1], mtf.exact_polar(freqs, 90))
+
+
+def test_exact_xy_broadcasts(mtf):
+    x = np.asarray([10, 20, 30])
+    assert np.allclose(mtf.exact_xy(x), mtf.exact_polar(x))
+    assert mtf.exact_xy(x, (0, 10), grid=True).shape == (2, 3)
+
+
+def test_mtf_at_matches_fft_on_grid():
+    from prysm import FringeZernike, PSF
+
+    psf = PSF.from_pupil(FringeZernike(Z5=0.2, Z8=0.1, samples=SAMPLES), 10)
+    ref = otf.MTF.from_psf(psf)
+    ix = ref.center_x + np.asarray([1, 3, 7])
+    freqs = ref.unit_x[ix]
+    assert np.allclose(otf.MTF.at(psf, freqs, 0), ref.data[ix, ref.center_y])
+    assert np.allclose(otf.MTF.at(psf, freqs, 90), ref.data[ref.center_x, ref.center_y + ix - ref.center_x])
+
+
+def test_mtf_at_shapes():
+    from prysm import FringeZernike, PSF
+
+    psf = PSF.from_pupil(FringeZernike(samples=SAMPLES), 10)
+    assert otf.MTF.at(psf, 0) == pytest.approx(1)
+    assert otf.MTF.at(psf, [10, 20, 30], (0, 45, 90)).shape == (3,)
+    assert otf.MTF.at(psf, [10, 20, 30], (0, 90), grid=True).shape == (2, 3)
@@ -0,0 +1,88 @@
+''' Tests verifying that single precision is preserved through the
+    pupil -> PSF -> MTF -> image chain.
+'''
+import pytest
+
+import numpy as np
+
+from prysm import config, FringeZernike, Seidel, FringeZernikeStack, PSF, MTF, PSFStack, MTFStack
+from prysm.psf import MultispectralPSF
+from prysm.detector import OLPF, PixelAperture
+from prysm.objects import Slit, SiemensStar, TiltedSquare
+from prysm.fttools import pad2d
+from prysm.mathops import fft2, ifft2
+
+SAMPLES = 32
+
+
+@pytest.fixture
+def single_precision():
+    config.set_precision(32)
+    yield
+    config.set_precision(64)
+
+
+@pytest.fixture
+def pupil(single_precision):
+    return FringeZernike(Z4=0.1, Z8=0.2, samples=SAMPLES)
+
+
+@pytest.fixture
+def psf(pupil):
+    return PSF.from_pupil(pupil, 10)
+
+
+def test_pupils_are_single_precision(single_precision):
+    for pupil in (FringeZernike(Z8=0.1, samples=SAMPLES), Seidel(W040=1, samples=SAMPLES)):
+        assert pupil.phase.dtype == np.float32
+        assert pupil.fcn.dtype == np.complex64
+
+
+def test_pad2d_and_ffts_preserve_single_precision(pupil):
+    padded = pad2d(pupil.fcn, 1)
+    assert padded.dtype == np.complex64
+    assert fft2(padded).dtype == np.complex64
+    assert ifft2(padded).dtype == np.complex64
+    assert fft2(pupil.phase).dtype == np.complex64
+
+
+def test_psf_is_single_precision(pupil, psf):
+    assert psf.data.dtype == np.float32
+    assert psf.unit_x.dtype == np.float32
+    mdft = PSF.from_pupil(pupil, 10, sample_spacing=0.5, samples=16)
+    assert mdft.data.dtype == np.float32
+
+
+def test_mtf_is_single_precision(psf):
+    mtf = MTF.from_psf(psf)
+    assert mtf.data.dtype == np.float32
+    assert mtf.unit_x.dtype == np.float32
+
+
+def test_stacks_are_single_precision(single_precision):
+    pupils = FringeZernikeStack(np.full((2, 9), 0.1), samples=SAMPLES)
+    assert pupils.fcn.dtype == np.complex64
+    assert PSFStack.from_pupil(pupils, 10).data.dtype == np.float32
+    assert MTFStack.from_pupil(pupils, 10).data.dtype == np.float32
+
+
+def test_multispectral_psf_is_single_precision(single_precision):
+    psfs = [PSF.from_pupil(FringeZernike(samples=SAMPLES, wavelength=wvl), 10) for wvl in (0.5, 0.6)]
+    assert MultispectralPSF(psfs).data.dtype == np.float32
+
+
+def test_detector_psfs_are_single_precision(single_precision):
+    assert OLPF(3).data.dtype == np.float32
+    assert PixelAperture(5).data.dtype == np.float32
+
+
+@pytest.mark.parametrize('obj', [Slit, SiemensStar, TiltedSquare])
+def test_images_are_single_precision(psf, obj):
+    if obj is Slit:
+        img = obj(1, sample_spacing=psf.sample_spacing, samples=psf.samples_x)
+    elif obj is SiemensStar:
+        img = obj(8, sample_spacing=psf.sample_spacing, samples=psf.samples_x)
+    else:
+        img = obj(sample_spacing=psf.sample_spacing, samples=psf.samples_x)
+    assert img.data.dtype == np.float32
+    assert img.convpsf(psf).data.dtype == np.float32
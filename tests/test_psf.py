@@ -36,3 +36,122 @@ def test_plot_encircled_energy_functions(tpsf):
     fig, ax = tpsf.plot_encircled_energy()
     assert fig
     assert ax
+
+
+def test_psf_stack_matches_individual_psfs():
+    from prysm import FringeZernike, FringeZernikeStack
+
+    coefs = np.random.rand(3, 9) * 0.1
+    stack = psf.PSFStack.from_pupil(FringeZernikeStack(coefs, samples=SAMPLES), 10)
+    assert stack.data.shape == (3, 3 * SAMPLES, 3 * SAMPLES)
+    for row, member in zip(coefs, stack):
+        ref = psf.PSF.from_pupil(FringeZernike(row, samples=SAMPLES), 10)
+        assert np.allclose(member.data, ref.data)
+        assert member.sample_spacing == ref.sample_spacing
+
+
+def test_psf_matrix_dft_matches_padded_fft():
+    from prysm import FringeZernike
+
+    pupil = FringeZernike(Z8=0.3, Z9=0.2, samples=SAMPLES)
+    ref = psf.PSF.from_pupil(pupil, 10, padding=1)
+    mdft = psf.PSF.from_pupil(pupil, 10, sample_spacing=ref.sample_spacing, samples=ref.samples_x)
+    assert mdft.data.shape == ref.data.shape
+    assert np.allclose(mdft.data, ref.data)
+
+
+def test_psf_matrix_dft_window_has_requested_sampling():
+    from prysm import FringeZernike
+
+    pupil = FringeZernike(samples=SAMPLES)
+    core = psf.PSF.from_pupil(pupil, 10, sample_spacing=0.1, samples=(32, 48))
+    assert core.data.shape == (32, 48)
+    assert core.sample_spacing == 0.1
+
+
+def test_psf_stack_matrix_dft_matches_individual_psfs():
+    from prysm import FringeZernike, FringeZernikeStack
+
+    coefs = np.random.rand(3, 9) * 0.1
+    stack = psf.PSFStack.from_pupil(FringeZernikeStack(coefs, samples=SAMPLES), 10,
+                                    sample_spacing=0.2, samples=40)
+    assert stack.data.shape == (3, 40, 40)
+    for row, member in zip(coefs, stack):
+        ref = psf.PSF.from_pupil(FringeZernike(row, samples=SAMPLES), 10,
+                                 sample_spacing=0.2, samples=40)
+        assert np.allclose(member.data, ref.data)
+
+
+def test_multispectral_from_pupils_matches_weighted_sum():
+    from prysm import FringeZernike
+
+    pupils = [FringeZernike(Z8=0.2, wavelength=wvl, samples=SAMPLES) for wvl in (0.45, 0.55, 0.65)]
+    weights = [0.5, 1, 0.75]
+    poly = psf.MultispectralPSF.from_pupils(pupils, 10, weights, sample_spacing=0.5, samples=48)
+
+    expected = sum(w * psf._propagate_pupil_mdft(p, 10, 0.5, 48) for p, w in zip(pupils, weights))
+    assert isinstance(poly, psf.MultispectralPSF)
+    assert poly.data.shape == (48, 48)
+    assert np.allclose(poly.data, expected / expected.max())
+
+
+def test_multispectral_from_pupils_defaults_to_shortest_wavelength_fft_grid():
+    from prysm import FringeZernike
+
+    pupils = [FringeZernike(wavelength=wvl, samples=SAMPLES) for wvl in (0.65, 0.45)]
+    poly = psf.MultispectralPSF.from_pupils(pupils, 10)
+    ref = psf.PSF.from_pupil(pupils[1], 10)
+    assert poly.sample_spacing == pytest.approx(ref.sample_spacing)
+    assert poly.data.shape == ref.data.shape
+
+
+def test_multispectral_from_spectrum_converges_with_few_wavelengths():
+    from prysm import FringeZernike
+
+    def pupil(wvl):
+        return FringeZernike(Z8=0.1, wavelength=wvl, samples=SAMPLES)
+
+    spectrum = {'wvl': np.array([500, 600]), 'values': np.array([1, 1])}
+    poly = psf.MultispectralPSF.from_spectrum(pupil, 10, spectrum, tol=1e-3,
+                                              sample_spacing=0.5, samples=48)
+    assert len(poly.wavelengths) < 64
+    assert np.all((poly.wavelengths > 0.5) & (poly.wavelengths < 0.6))
+
+    dense = np.linspace(0.5, 0.6, 201)
+    ref = psf.MultispectralPSF.from_pupils([pupil(w) for w in dense], 10,
+                                           sample_spacing=0.5, samples=48)
+    assert np.allclose(poly.data, ref.data, atol=5e-3)
+
+
+def test_multispectral_from_spectrum_weights_by_transmission():
+    from prysm import FringeZernike
+
+    def pupil(wvl):
+        return FringeZernike(Z8=0.1, wavelength=wvl, samples=SAMPLES)
+
+    spectrum = {'wvl': np.array([500, 600]), 'values': np.array([1, 1])}
+    qe = {'wvl': np.array([500, 600]), 'values': np.array([0, 1])}
+    poly = psf.MultispectralPSF.from_spectrum(pupil, 10, spectrum, transmission=qe,
+                                              tol=1e-3, sample_spacing=0.5, samples=48)
+
+    dense = np.linspace(0.5, 0.6, 201)
+    ref = psf.MultispectralPSF.from_pupils([pupil(w) for w in dense], 10, (dense - 0.5) / 0.1,
+                                           sample_spacing=0.5, samples=48)
+    flat = psf.MultispectralPSF.from_pupils([pupil(w) for w in dense], 10,
+                                            sample_spacing=0.5, samples=48)
+    assert np.allclose(poly.data, ref.data, atol=5e-3)
+    assert not np.allclose(poly.data, flat.data, atol=5e-3)
+
+
+def test_multispectral_from_spectrum_warns_when_not_converged():
+    from prysm import FringeZernike
+
+    def pupil(wvl):
+        return FringeZernike(Z8=0.1, wavelength=wvl, samples=SAMPLES)
+
+    spectrum = {'wvl': np.array([500, 600]), 'values': np.array([1, 1])}
+    with pytest.warns(UserWarning):
+        poly = psf.MultispectralPSF.from_spectrum(pupil, 10, spectrum, tol=1e-12, max_nodes=4,
+                                                  sample_spacing=0.5, samples=48)
+    assert len(poly.wavelengths) == 4
+    assert poly.error > 1e-12
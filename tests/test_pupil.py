@@ -4,7 +4,7 @@ import pytest
 
 import numpy as np
 
-from prysm import Pupil, Seidel
+from prysm import Pupil, Seidel, FringeZernike, FringeZernikeStack, StandardZernikeStack
 
 
 @pytest.fixture
@@ -85,3 +85,59 @@ def test_pupil_plot_slice_xy_functions(p):
     assert fig
     assert ax
 
+
+def test_fringe_stack_matches_individual_pupils():
+    coefs = np.random.rand(4, 9)
+    stack = FringeZernikeStack(coefs, samples=32, rms_norm=True)
+    assert stack.phase.shape == (4, 32, 32)
+    for row, pupil in zip(coefs, stack):
+        ref = FringeZernike(row, samples=32, rms_norm=True)
+        assert np.allclose(pupil.phase, ref.phase, equal_nan=True)
+        assert np.allclose(pupil.fcn, ref.fcn)
+
+
+def test_pupil_stack_rms_matches_pupils():
+    coefs = np.random.rand(3, 9)
+    stack = StandardZernikeStack(coefs, samples=32)
+    assert np.allclose(stack.rms, [p.rms for p in stack])
+    assert np.allclose(stack.pv, [p.pv for p in stack])
+
+
+@pytest.mark.parametrize('pupil', [
+    lambda: FringeZernike(Z4=0.3, Z9=0.2, Z11=-0.1, samples=256),
+    lambda: FringeZernike(Z4=0.3, Z9=0.2, rms_norm=True, samples=256),
+    lambda: Seidel(W020=-1, W040=1, W131=0.5, W222=0.3, field=0.7, samples=256),
+])
+def test_analytic_stats_match_numeric(pupil):
+    p = pupil()
+    analytic = p.rms, p.pv_estimate
+    p._analytic_stats = False
+    assert analytic[0] == pytest.approx(p.rms, rel=1e-2)
+    assert analytic[1] == pytest.approx(p.pv, rel=1e-2)
+
+
+def test_analytic_stats_cleared_when_phase_changes():
+    p = FringeZernike(Z4=1, samples=32)
+    assert p._analytic_stats
+    assert not p.clone()._analytic_stats
+    assert not p.merge(FringeZernike(Z9=1, samples=32))._analytic_stats
+    p.clip(0.5)
+    assert not p._analytic_stats
+
+
+@pytest.mark.parametrize('edit', [
+    lambda p: setattr(p, 'phase', p.phase * 2),
+    lambda p: p.mask(np.ones_like(p.phase)),
+])
+def test_stats_follow_edited_phase(edit):
+    p = FringeZernike(Z4=1, samples=64)
+    edit(p)
+    assert p.rms == pytest.approx(np.sqrt(np.nanmean(p.phase ** 2)))
+    assert p.pv_estimate == pytest.approx(np.nanmax(p.phase) - np.nanmin(p.phase))
+
+
+def test_stats_follow_in_place_addition():
+    p = FringeZernike(Z4=1, samples=64)
+    p.phase += p.phase
+    assert p.rms == pytest.approx(np.sqrt(np.nanmean(p.phase ** 2)))
+    assert p.pv == pytest.approx(np.nanmax(p.phase) - np.nanmin(p.phase))
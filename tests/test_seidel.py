@@ -30,3 +30,33 @@ def test_seidel_respects_field_dependence():
 def test_seidel_repr():
     p = Seidel()
     assert type(repr(p)) is str
+
+
+def test_seidel_phase_stack_matches_individual_pupils():
+    from prysm.seidel import seidel_phase_stack
+
+    aberrations = {'W040': 0.5, 'W131': 0.3, 'W222': 0.2}
+    fields = [0, 0.5, 1]
+    stack = seidel_phase_stack(aberrations, fields, 32)
+    assert stack.shape == (3, 32, 32)
+    for h, phase in zip(fields, stack):
+        p = Seidel(**aberrations, field=h, samples=32)
+        mask = np.isfinite(p.phase)
+        assert np.allclose(phase[mask], p.phase[mask])
+
+
+def test_seidel_phase_matches_explicit_expression():
+    aberrations = {'W020': -0.3, 'W040': 0.5, 'W131': 0.3, 'W331': 0.1, 'W222': 0.2, 'W060': 0.05}
+    p = Seidel(**aberrations, field=0.7, samples=64)
+    H, rho, phi = 0.7, p.rho, p.phi
+    ref = sum(coef * H ** int(key[1]) * rho ** int(key[2]) * np.cos(phi) ** int(key[3])
+              for key, coef in aberrations.items())
+    mask = np.isfinite(p.phase)
+    assert np.allclose(p.phase[mask], ref[mask])
+
+
+def test_seidel_phase_without_terms_is_zero():
+    from prysm.seidel import seidel_phase
+
+    rho, phi = np.ones((4, 4)), np.zeros((4, 4))
+    assert np.array_equal(seidel_phase([], [], rho, phi), np.zeros((4, 4)))
@@ -141,3 +141,33 @@ def test_share_fig_ax_produces_an_axis():
     fig = plt.figure()
     fig, ax = util.share_fig_ax(fig)
     assert ax is not None
+
+
+def _square(x):
+    return x * x
+
+
+@pytest.mark.parametrize('executor', [None, 'thread', 'process'])
+def test_parallel_map_preserves_order(executor):
+    items = list(range(10))
+    assert util.parallel_map(_square, items, executor=executor, workers=2) == [x * x for x in items]
+
+
+def test_parallel_map_accepts_executor():
+    from concurrent.futures import ThreadPoolExecutor
+
+    with ThreadPoolExecutor(2) as ex:
+        assert util.parallel_map(_square, range(8), executor=ex) == [x * x for x in range(8)]
+
+
+def test_parallel_map_rejects_bad_executor():
+    with pytest.raises(ValueError):
+        util.parallel_map(_square, range(8), executor='foo', workers=2)
+
+
+def test_parallel_map_runs_small_problems_serially():
+    from threading import current_thread, main_thread
+
+    items = range(util._PARALLEL_MIN_ITEMS - 1)
+    threads = util.parallel_map(lambda _: current_thread(), items, executor='thread', workers=2)
+    assert all(thread is main_thread() for thread in threads)
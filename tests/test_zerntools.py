@@ -0,0 +1,167 @@
+''' Unit tests for zernike tools.
+'''
+import pytest
+
+import numpy as np
+
+from prysm import FringeZernike, StandardZernike
+from prysm import fringezernike, standardzernike
+from prysm.coordinates import make_rho_phi_grid
+from prysm.zerntools import (
+    zcache,
+    fitcache,
+    basis_stack,
+    zernike_stack,
+    fringe_to_nm,
+    standard_to_nm,
+    zernike_rms,
+    zernike_pv,
+    ZernikeFitter,
+)
+
+SAMPLES = 32
+
+
+@pytest.mark.parametrize('module, to_nm', [
+    (fringezernike, fringe_to_nm),
+    (standardzernike, standard_to_nm)])
+def test_recurrence_matches_explicit_polynomials(module, to_nm):
+    rho, phi = make_rho_phi_grid(SAMPLES)
+    nms = [to_nm(i) for i in range(len(module.zernfcns))]
+    stack = zernike_stack(nms, rho, phi)
+    for idx, zern in enumerate(stack):
+        assert np.allclose(zern, module.zernfcns[idx](rho, phi))
+
+
+def test_recurrence_normalization_matches_fringe_table():
+    rho, phi = make_rho_phi_grid(SAMPLES)
+    stack = zernike_stack([fringe_to_nm(i) for i in range(49)], rho, phi, rms_norm=True)
+    for idx, zern in enumerate(stack):
+        assert np.allclose(zern, fringezernike._normalizations[idx] * fringezernike.zernfcns[idx](rho, phi))
+
+
+@pytest.mark.parametrize('n, m', [(30, 0), (40, 2), (61, 1)])
+def test_recurrence_is_stable_at_high_order(n, m):
+    # all radial polynomials are 1 at the edge of the pupil
+    rho = np.array([1.0])
+    phi = np.array([0.0])
+    assert zernike_stack([(n, m)], rho, phi)[0, 0] == pytest.approx(1)
+
+
+def test_recurrence_rejects_invalid_terms():
+    with pytest.raises(ValueError):
+        zernike_stack([(3, 0)], np.ones(1), np.ones(1))
+
+
+def test_pupils_support_high_order_terms():
+    p = StandardZernike(Z100=1, base=0, samples=SAMPLES)
+    assert len(p.coefs) == 101
+    assert np.isfinite(p.phase).any()
+    assert 'Z100' in repr(p)
+
+
+def test_cached_basis_matches_direct_evaluation():
+    coefs = np.random.rand(16)
+    p = FringeZernike(coefs, samples=SAMPLES, rms_norm=True)
+    ref = sum(c * fringezernike.zernwrapper(i, True, p.rho, p.phi) for i, c in enumerate(coefs))
+    ref[p.rho > 1] = np.nan
+    assert np.allclose(p.phase, ref, equal_nan=True)
+
+
+def test_standard_zernwrapper_keeps_positional_signature():
+    rho, phi = make_rho_phi_grid(SAMPLES)
+    assert np.allclose(standardzernike.zernwrapper(4, rho, phi), standardzernike.zernfcns[4](rho, phi))
+
+
+def test_basis_stack_is_reused():
+    stack1 = basis_stack('fringe', (1, 2, 3), SAMPLES)
+    hits = zcache.hits
+    stack2 = basis_stack('fringe', (1, 2, 3), SAMPLES)
+    assert stack1 is stack2
+    assert zcache.hits == hits + 1
+
+
+def test_basis_stack_is_read_only():
+    stack = basis_stack('fringe', (3,), SAMPLES)
+    with pytest.raises(ValueError):
+        stack[0, 0, 0] = 1
+
+
+def test_zcache_respects_size_bound():
+    maxbytes = zcache.maxbytes
+    try:
+        zcache.clear()
+        zcache.maxbytes = SAMPLES * SAMPLES * 8 * 2
+        basis_stack('fringe', (1, 2), SAMPLES)
+        basis_stack('fringe', (3, 4), SAMPLES)
+        assert len(zcache) == 1
+        assert zcache.nbytes <= zcache.maxbytes
+    finally:
+        zcache.maxbytes = maxbytes
+        zcache.clear()
+
+
+def test_zernike_rms_of_normalized_terms_is_root_sum_square():
+    coefs = [0, 0.1, -0.2, 0.3, 0, 0.05]
+    assert zernike_rms('fringe', coefs, rms_norm=True) == pytest.approx(np.sqrt(np.sum(np.square(coefs))))
+
+
+def test_zernike_pv_of_defocus():
+    # fringe Z3 (0-based) is 2rho^2 - 1, ranging from -1 to 1
+    assert zernike_pv('fringe', [0, 0, 0, 1]) == pytest.approx(2)
+
+
+@pytest.mark.parametrize('family, module', [
+    ('fringe', fringezernike),
+    ('standard', standardzernike)])
+def test_fitter_matches_lstsq(family, module):
+    truth = np.random.rand(9)
+    rho, phi = make_rho_phi_grid(SAMPLES)
+    data = np.tensordot(truth, basis_stack(family, range(9), SAMPLES), axes=1)
+    data[rho > 1] = np.nan
+    coefs = module.fit(data, num_terms=9)
+    assert np.allclose(coefs, truth, atol=1e-5)
+
+
+def test_fitter_stack_and_residual():
+    fitter = ZernikeFitter('fringe', num_terms=9, rms_norm=True)
+    truth = np.random.rand(3, 9)
+    stack = basis_stack('fringe', range(9), SAMPLES, rms_norm=True)
+    data = np.tensordot(truth, stack, axes=1)
+    data[1, :2] = np.nan
+    coefs, rms = fitter.fit(data, residual=True)
+    assert coefs.shape == (3, 9)
+    assert np.allclose(coefs, truth)
+    assert np.allclose(rms, 0, atol=1e-9)
+
+
+def test_fitter_weights_ignore_zero_weighted_points():
+    fitter = ZernikeFitter('standard', num_terms=4)
+    data = basis_stack('standard', [3], SAMPLES)[0].astype(np.float64)
+    weights = np.ones_like(data)
+    data[:, :4] += 10
+    weights[:, :4] = 0
+    coefs = fitter.fit(data, weights=weights)
+    assert coefs[3] == pytest.approx(1)
+
+
+def test_fitter_residual_matches_direct():
+    fitter = ZernikeFitter('fringe', num_terms=9)
+    data = np.random.rand(SAMPLES, SAMPLES)
+    coefs, rms = fitter.fit(data, residual=True)
+    fit = np.tensordot(coefs, basis_stack('fringe', range(9), SAMPLES), axes=1)
+    assert rms == pytest.approx(np.sqrt(np.mean((data - fit) ** 2)), rel=1e-6)
+
+
+def test_fitter_caches_1k_maps():
+    fitcache.clear()
+    fitter = ZernikeFitter('fringe', num_terms=16)
+    rho, phi = make_rho_phi_grid(1024)
+    data = np.random.rand(1024, 1024)
+    data[rho > 1] = np.nan
+    first = fitter.fit(data)
+    assert len(fitcache) == 1
+    hits = fitcache.hits
+    second = fitter.fit(data)
+    assert fitcache.hits == hits + 1
+    assert np.array_equal(first, second)